@@ -2,6 +2,10 @@
 ASGI config for pickup_sports project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn pickup_sports.asgi:application``)
+to hold the /events/ streams open without tying up a worker thread each.
+Set ASYNC_READ_VIEWS=1 to serve the public read endpoints with their
+native async versions.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pickup_sports.settings")
+os.environ.setdefault("DJANGO_SERVER_INTERFACE", "asgi")
 
 application = get_asgi_application()
@@ -37,6 +37,58 @@ AUTH_USER_MODEL = 'scheduler.CustomUser'
 
 CAS_BASE_URL = "https://secure6.its.yale.edu/cas"
 
+# CAS ticket validation (scheduler/cas.py): timeouts in seconds and pooled
+# connections per process. After CAS_BREAKER_FAILURES errors or timeouts
+# in a row, logins fail fast for CAS_BREAKER_RESET seconds. Validated
+# users and their tokens are cached for CAS_USER_CACHE_TIMEOUT seconds.
+CAS_CONNECT_TIMEOUT = 1
+CAS_READ_TIMEOUT = 3
+CAS_POOL_SIZE = 10
+CAS_BREAKER_FAILURES = 5
+CAS_BREAKER_RESET = 30
+CAS_USER_CACHE_TIMEOUT = 3600
+
+# API tokens expire this many days after they are issued (None: never).
+# scheduler.authentication caches up to TOKEN_AUTH_CACHE_SIZE tokens per
+# process, each for TOKEN_AUTH_CACHE_TTL seconds.
+TOKEN_EXPIRE_DAYS = 30
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 60
+
+# Cursor pagination for the game list endpoints (?cursor= / ?page_size=)
+GAME_PAGE_SIZE = 20
+GAME_PAGE_SIZE_MAX = 100
+
+# Upper bound for ?limit= on the game comments endpoint
+COMMENT_PAGE_SIZE_MAX = 100
+
+# Maximum number of results returned by the user search endpoint
+USER_SEARCH_LIMIT = 20
+
+# Maximum number of user ids accepted by the schedule endpoint
+SCHEDULE_MAX_USERS = 10
+
+# How many days ahead recurring game series are materialized into games
+SERIES_MATERIALIZE_DAYS = 56
+
+# Default and maximum ?radius= (km) for game_list?near=
+NEAR_DEFAULT_RADIUS_KM = 5
+NEAR_MAX_RADIUS_KM = 50
+
+# Personalized feed (scheduler/feed.py): candidate window, how many games
+# are scored and returned, the soonness decay, and how long a ranking is
+# cached. FEED_WEIGHTS may override the sport/skill/fill/time weights.
+FEED_HORIZON_DAYS = 14
+FEED_CANDIDATES = 2000
+FEED_SIZE = 50
+FEED_TIME_DECAY_HOURS = 48
+FEED_CACHE_TIMEOUT = 300
+
+# Games that ended this many days ago are moved to the archive tables by
+# manage.py archive_games, this many per transaction.
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH_SIZE = 2000
+
 
 # Application definition
 
@@ -61,14 +113,19 @@ AUTHENTICATION_BACKENDS = (
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'scheduler.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'scheduler.timing.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 MIDDLEWARE = [
+    "scheduler.timing.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -106,10 +163,17 @@ TEST_DB_NAME = os.environ.get('DJANGO_TEST_DB_NAME', 'test_pickupdatabase')
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 load_dotenv()
+
+# 'asgi' when served by pickup_sports/asgi.py, which sets it.
+SERVER_INTERFACE = os.environ.get('DJANGO_SERVER_INTERFACE', 'wsgi')
+
+# Under ASGI a request's ORM calls run on a thread created for that
+# request, so a persistent connection would never be reused; it would
+# just stay open until the thread went away.
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600,
+        conn_max_age=600 if SERVER_INTERFACE == 'wsgi' else 0,
         ssl_require=True
     )
 }
@@ -117,6 +181,50 @@ DATABASES = {
 if 'test' in sys.argv:
     DATABASES['default']['NAME'] = TEST_DB_NAME
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default. Set DJANGO_CACHE_BACKEND to the file-based or
+# database backend (with DJANGO_CACHE_LOCATION) to share the response cache
+# across worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'pickup-sports'),
+    }
+}
+
+# Seconds a cached read response may be served. Writes invalidate entries
+# immediately; the timeout only bounds how stale time-derived fields such
+# as current_state can get.
+RESPONSE_CACHE_TIMEOUT = 60
+
+# Broker behind the /events/ streams. InProcessBroker serves a single
+# worker process; use scheduler.events.PostgresBroker when running several.
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'scheduler.events.InProcessBroker')
+
+# Serve game_list, game_detail, game_comments, sport_list and
+# public_profile with their native async versions (see scheduler/urls.py).
+# Only meaningful under ASGI, and not faster for these CPU-bound endpoints
+# so far; compare with manage.py bench_asgi before turning it on.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
+# scheduler.timing.RequestTimingMiddleware logs requests over either
+# budget as warnings, with their SQL if the request was one of the sampled
+# fraction that keeps it.
+REQUEST_QUERY_BUDGET = 20
+REQUEST_TIME_BUDGET_MS = 500
+REQUEST_QUERY_SAMPLE_RATE = 0.01
+
+# Seconds between keepalive comments on an idle event stream
+EVENT_STREAM_HEARTBEAT = 15
+
+if 'test' in sys.argv:
+    # Test cases reset the database without bumping cache versions, so keep
+    # responses uncached unless a test opts in.
+    CACHES['default'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
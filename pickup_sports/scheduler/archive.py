@@ -0,0 +1,123 @@
+"""
+Moving finished games out of the hot Game table.
+
+Game only needs recent and upcoming games, but without archiving it keeps
+every game ever played, and every upcoming-games query and index grows
+with history. Games that ended more than ARCHIVE_AFTER_DAYS ago are moved,
+with their participants and comments, into ArchivedGame,
+ArchivedParticipant and ArchivedComment, keeping their ids.
+
+Each batch is its own transaction: lock the oldest finished games, copy
+them and their rows with one INSERT ... SELECT per table, then delete the
+originals, so no row passes through Python. Endpoints that show history
+read GameHistory and friends, views over the live and archived tables
+(see models.py), so a game looks the same before and after it is moved.
+
+Run ``manage.py archive_games`` periodically, e.g. nightly from cron. The
+first run on a large table frees most of it; on Postgres a one-off
+VACUUM FULL (or pg_repack) of scheduler_game gives that space back, after
+which new games reuse what each nightly run frees.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .models import (ArchivedComment, ArchivedGame, ArchivedParticipant, Comment, Game,
+                     Participant)
+
+GAME_FIELDS = [
+    'id', 'name', 'creator_id', 'location', 'latitude', 'longitude', 'start_time',
+    'end_time', 'status', 'skill_level', 'sport_id', 'capacity', 'participant_count',
+    'comment_count', 'series_id', 'occurrence_date', 'updated_at',
+]
+PARTICIPANT_FIELDS = ['id', 'user_id', 'game_id']
+COMMENT_FIELDS = ['id', 'game_id', 'author_id', 'text', 'created']
+
+
+def archive_cutoff(now=None):
+    """
+    Games that ended before this are archived.
+    """
+    days = getattr(settings, 'ARCHIVE_AFTER_DAYS', 30)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def _copy(source, target, fields, **filters):
+    """
+    INSERT INTO target (fields) SELECT fields FROM source WHERE filters.
+    The archive columns are named like the source attributes.
+    """
+    select, params = source.objects.filter(**filters).order_by() \
+        .values_list(*fields).query.sql_with_params()
+    columns = ', '.join(connection.ops.quote_name(f) for f in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(target._meta.db_table)} ({columns}) {select}",
+            params)
+
+
+def delete_rows(queryset):
+    """
+    DELETE FROM the queryset's table WHERE pk IN (its SELECT): one
+    statement that, unlike QuerySet.delete(), loads no rows, follows no
+    relations and sends no signals. Returns the number of rows deleted.
+    """
+    model = queryset.model
+    select, params = queryset.order_by().values_list('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)} "
+            f"WHERE {connection.ops.quote_name(model._meta.pk.column)} IN ({select})",
+            params)
+        return cursor.rowcount
+
+
+def _delete(model, **filters):
+    # A plain DELETE: the copies already exist, so the per-row receivers
+    # (counters, updated_at, events) have nothing to do, and loading every
+    # row for them is most of the cost of QuerySet.delete().
+    delete_rows(model.objects.filter(**filters))
+
+
+def archive_batch(before, batch_size):
+    """
+    Move up to ``batch_size`` of the games that ended before ``before``.
+    Returns how many were moved.
+    """
+    with transaction.atomic():
+        # The lock keeps a concurrent edit from landing between the copy
+        # and the delete.
+        ids = list(
+            Game.objects.select_for_update().filter(end_time__lt=before)
+            .order_by('end_time', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        _copy(Game, ArchivedGame, GAME_FIELDS, pk__in=ids)
+        _copy(Participant, ArchivedParticipant, PARTICIPANT_FIELDS, game_id__in=ids)
+        _copy(Comment, ArchivedComment, COMMENT_FIELDS, game_id__in=ids)
+        _delete(Participant, game_id__in=ids)
+        _delete(Comment, game_id__in=ids)
+        _delete(Game, pk__in=ids)
+        # Clients see the same games as before, so there are no events;
+        # cached lists and details are refreshed once for the batch.
+        bump_on_commit('games', *(f'game:{pk}' for pk in ids))
+    return len(ids)
+
+
+def archive_games(before=None, batch_size=None):
+    """
+    Archive every game that ended before ``before`` (archive_cutoff() by
+    default), ARCHIVE_BATCH_SIZE games per transaction. Returns the total.
+    """
+    before = before or archive_cutoff()
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 2000)
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
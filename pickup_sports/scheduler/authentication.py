@@ -0,0 +1,196 @@
+"""
+Token authentication without a query per request.
+
+DRF's TokenAuthentication joins Token and the user table on every
+authenticated request. CachedTokenAuthentication keeps what it loaded in
+token_cache, an in-process LRU of at most TOKEN_AUTH_CACHE_SIZE tokens,
+each trusted for TOKEN_AUTH_CACHE_TTL seconds and shared by the worker's
+threads. Views get a copy of the cached user, so changes they make to
+request.user never leak into other requests.
+
+Entries are dropped as soon as a token is rotated or deleted, or its user
+is saved (which covers deactivation) or deleted; see scheduler/signals.py.
+Those signals fire in the process that made the change; other worker
+processes notice within the TTL.
+
+Tokens also expire TOKEN_EXPIRE_DAYS after they were created, which is
+checked against the cached creation time, and rotate_token() replaces a
+user's token with a new one.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class LRUCache:
+    """
+    A thread-safe mapping of at most ``maxsize`` entries that drops the
+    least recently used one when full, and any entry older than ``ttl``
+    seconds when it is next read.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.clock() - stored_at < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard_where(self, predicate):
+        """
+        Drop every entry whose value matches ``predicate``.
+        """
+        with self.lock:
+            for key in [k for k, (_, v) in self.entries.items() if predicate(v)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+token_cache = LRUCache(
+    getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10_000),
+    getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60),
+)
+
+
+def token_expires(token):
+    """
+    When ``token`` stops being accepted, or None if tokens don't expire.
+    """
+    days = getattr(settings, 'TOKEN_EXPIRE_DAYS', None)
+    if days is None:
+        return None
+    return token.created + timedelta(days=days)
+
+
+def token_expired(token, now=None):
+    expires = token_expires(token)
+    return expires is not None and expires <= (now or timezone.now())
+
+
+def rotate_token(user):
+    """
+    Replace ``user``'s token with a new one and return it.
+    """
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+def forget_token_on_commit(key):
+    transaction.on_commit(lambda: token_cache.discard(key))
+
+
+def forget_user_on_commit(user_id):
+    transaction.on_commit(
+        lambda: token_cache.discard_where(lambda token: token.user_id == user_id))
+
+
+def load_token(key):
+    """
+    Look ``key`` up with its user and add it to token_cache. Raises
+    Token.DoesNotExist.
+    """
+    token = Token.objects.select_related('user').get(key=key)
+    token_cache.set(key, token)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication backed by token_cache, with token expiry.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            try:
+                token = load_token(key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+        return self.check(token)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views. Only a token_cache miss leaves the
+        event loop. A malformed header fails; the sync path has the
+        detailed messages.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            _keyword, key = auth
+            key = key.decode()
+        except (ValueError, UnicodeError):
+            raise AuthenticationFailed(_('Invalid token header.'))
+
+        token = token_cache.get(key)
+        if token is None:
+            try:
+                token = await sync_to_async(load_token)(key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+        return self.check(token)
+
+    def check(self, token):
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        if token_expired(token):
+            raise AuthenticationFailed(_('Token has expired.'))
+
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return (token.user, token)
@@ -0,0 +1,108 @@
+"""
+Bulk roster changes: add or remove many users across one or more games in
+a single transaction.
+
+The work is done per game, not per participant: the games are locked in
+one query, the users and existing participations are read in one query
+each, all new rows go in through bulk_create and all removals through one
+DELETE. Then each affected game gets one UPDATE for its counter and
+updated_at.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .events import publish_game_event
+from .models import Game, Participant
+from .signals import bulk_participant_changes
+
+ADD, REMOVE = 'add', 'remove'
+
+
+def apply_participant_operations(actor, operations):
+    """
+    Apply [{'game': id, 'action': 'add'|'remove', 'users': [ids]}, ...] on
+    behalf of ``actor``, who must have created each game. Returns one
+    {'game', 'user', 'action', 'result'} dict per requested change.
+    """
+    game_ids = {op['game'] for op in operations}
+    user_ids = {u for op in operations for u in op['users']}
+    results = []
+
+    with transaction.atomic():
+        # Lock in pk order so two bulk requests can't deadlock each other.
+        games = {g.pk: g for g in Game.objects.select_for_update()
+                 .filter(pk__in=game_ids).order_by('pk')}
+        known_users = set(get_user_model().objects
+                          .filter(pk__in=user_ids).values_list('pk', flat=True))
+        initial = {}
+        for game_id, user_id in Participant.objects.filter(
+                game_id__in=list(games), user_id__in=user_ids).values_list('game_id', 'user_id'):
+            initial.setdefault(game_id, set()).add(user_id)
+        members = {pk: set(initial.get(pk, ())) for pk in games}
+        counts = {pk: g.participant_count for pk, g in games.items()}
+
+        for op in operations:
+            game = games.get(op['game'])
+            for user_id in dict.fromkeys(op['users']):
+                results.append({
+                    'game': op['game'],
+                    'user': user_id,
+                    'action': op['action'],
+                    'result': _apply(actor, game, op['action'], user_id,
+                                     known_users, members, counts),
+                })
+
+        added = [(pk, u) for pk in games for u in members[pk] - initial.get(pk, set())]
+        removed = [(pk, u) for pk in games for u in initial.get(pk, set()) - members[pk]]
+        with bulk_participant_changes():
+            Participant.objects.bulk_create(
+                Participant(game_id=pk, user_id=u) for pk, u in added)
+            if removed:
+                condition = Q()
+                for pk in {pk for pk, _ in removed}:
+                    condition |= Q(game_id=pk, user_id__in=[u for g, u in removed if g == pk])
+                Participant.objects.filter(condition).delete()
+
+        now = timezone.now()
+        for pk in {pk for pk, _ in added + removed}:
+            delta = counts[pk] - games[pk].participant_count
+            Game.objects.filter(pk=pk).update(
+                participant_count=F('participant_count') + delta, updated_at=now)
+            bump_on_commit('games', f'game:{pk}')
+            if any(g == pk for g, _ in added):
+                transaction.on_commit(
+                    lambda pk=pk: publish_game_event('participant.joined', pk))
+            if any(g == pk for g, _ in removed):
+                transaction.on_commit(
+                    lambda pk=pk: publish_game_event('participant.left', pk))
+    return results
+
+
+def _apply(actor, game, action, user_id, known_users, members, counts):
+    if game is None:
+        return 'game_not_found'
+    if game.creator_id != actor.pk:
+        return 'forbidden'
+    if user_id not in known_users:
+        return 'user_not_found'
+    if user_id == game.creator_id:
+        return 'creator'
+
+    roster = members[game.pk]
+    if action == ADD:
+        if user_id in roster:
+            return 'already_joined'
+        if game.capacity and counts[game.pk] >= game.capacity:
+            return 'full'
+        roster.add(user_id)
+        counts[game.pk] += 1
+        return 'joined'
+
+    if user_id not in roster:
+        return 'not_joined'
+    roster.remove(user_id)
+    counts[game.pk] -= 1
+    return 'left'
@@ -0,0 +1,156 @@
+"""
+Response caching for the public read endpoints.
+
+Cached entries are keyed by the view, the request URL and the current
+version of every namespace the response depends on ('games', 'game:<pk>',
+'sports', 'users'). Writes never delete entries; they bump the version of
+the namespaces they touch (see scheduler/signals.py), so stale entries
+simply stop being addressed and age out. Only the version counters need to
+be shared between worker processes, which any Django cache backend does.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+VERSION_KEY = 'respver:{}'
+
+
+def _fresh_version():
+    # Seeding from the clock means a version key that was evicted never
+    # comes back with a value some old entry was stored under.
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(namespaces):
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _fresh_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    """
+    Invalidate every cached response that depends on one of ``namespaces``.
+    """
+    for ns in namespaces:
+        key = VERSION_KEY.format(ns)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def bump_on_commit(*namespaces):
+    """
+    Bump after the surrounding transaction commits, so a concurrent reader
+    can't re-cache the old state between the bump and the commit.
+    """
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+def response_key(name, request, versions):
+    raw = '|'.join([
+        request.get_host(),
+        request.get_full_path(),
+        ','.join(str(v) for v in versions),
+        # Set by game_conditional; it changes with the game's state too.
+        getattr(request, 'game_etag', ''),
+    ])
+    return f"resp:{name}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+# Headers stored with a cached body. The rest (DRF's Allow, the ETag and
+# Last-Modified of game_conditional) are added again on every hit.
+CACHED_HEADERS = ('Content-Type', 'Vary')
+
+
+def cache_entry(response):
+    """
+    What the cache keeps of a rendered response: its body and headers.
+    """
+    return response.content, {
+        name: response[name] for name in CACHED_HEADERS if name in response}
+
+
+def cached_response(entry):
+    content, headers = entry
+    return HttpResponse(content, headers=headers)
+
+
+def cache_response(*namespaces):
+    """
+    Cache successful GET responses of a DRF function view.
+
+    ``namespaces`` may reference the view's URL kwargs, e.g. 'game:{pk}'.
+    Goes under @api_view/@permission_classes so authentication and
+    permissions still run on every request. The rendered JSON is cached,
+    so a hit is byte-identical to a miss and skips serializing and
+    rendering; the browsable API is never cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method != 'GET' or not isinstance(request.accepted_renderer, JSONRenderer):
+                return view(request, *args, **kwargs)
+
+            versions = get_versions([ns.format(**kwargs) for ns in namespaces])
+            key = response_key(view.__name__, request, versions)
+            hit = cache.get(key)
+            if hit is not None:
+                return cached_response(hit)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                # DRF renders the response after the view returns.
+                def store(rendered):
+                    cache.set(key, cache_entry(rendered),
+                              timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60))
+                response.add_post_render_callback(store)
+            return response
+        return wrapped
+    return decorator
+
+
+def acache_response(*namespaces):
+    """
+    cache_response for the async read views in scheduler/views.py, which
+    only answer JSON. Entries are stored as cache_response stores them.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await view(request, *args, **kwargs)
+
+            versions = await aget_versions([ns.format(**kwargs) for ns in namespaces])
+            key = response_key(view.__name__, request, versions)
+            hit = await cache.aget(key)
+            if hit is not None:
+                return cached_response(hit)
+
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(key, cache_entry(response),
+                                 timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60))
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,201 @@
+"""
+CAS ticket validation for cas_login.
+
+Every login used to open a fresh connection to CAS, hold a worker for up
+to five seconds waiting on it, and then look the user and their API token
+up again. Instead:
+
+- each process keeps one pooled requests.Session, so logins reuse open
+  connections to CAS, with short connect and read timeouts;
+- a circuit breaker counts consecutive failures (connection errors,
+  timeouts, 5xx and unreadable answers). After CAS_BREAKER_FAILURES of
+  them, logins fail fast with CASUnavailable for CAS_BREAKER_RESET
+  seconds; then one trial request decides whether CAS is back;
+- avalidate() makes the request on a worker thread, so under ASGI a slow
+  CAS holds neither the event loop nor a request thread;
+- login_user() caches the user and their token by username under the
+  'user:<pk>' cache version (see scheduler/cache.py), so repeat logins
+  skip both lookups until the user or their token changes.
+"""
+import hashlib
+import math
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import get_random_string
+from requests.adapters import HTTPAdapter
+from rest_framework.authtoken.models import Token
+
+from .authentication import rotate_token, token_expired
+from .cache import get_versions
+
+CAS_NS = {'cas': 'http://www.yale.edu/tp/cas'}
+
+
+class CASError(Exception):
+    """
+    CAS answered, but not with a ticket validation response.
+    """
+
+
+class CASUnavailable(Exception):
+    """
+    CAS could not be reached in time. ``retry_after`` is set, in seconds,
+    when the circuit breaker refused the call without trying.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed until ``max_failures`` calls in a row fail, then open (every
+    call fails fast) for ``reset_after`` seconds. After that a single trial
+    call goes through; its outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, max_failures, reset_after, clock=time.monotonic):
+        self.max_failures = max_failures
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            waited = self.clock() - self.opened_at
+            if waited < self.reset_after:
+                raise CASUnavailable(
+                    "CAS is unavailable.", retry_after=math.ceil(self.reset_after - waited))
+            # Let this caller through and keep failing the others until
+            # it reports back.
+            self.opened_at = self.clock()
+
+    def succeeded(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.opened_at = self.clock()
+
+
+def parse_validation(text):
+    """
+    The username in a serviceValidate response ('' if CAS left it out),
+    or None when CAS rejected the ticket.
+    """
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError as exc:
+        raise CASError("Invalid response from CAS server.") from exc
+    success = root.find('cas:authenticationSuccess', CAS_NS)
+    if success is None:
+        return None
+    user = success.find('cas:user', CAS_NS)
+    return (user.text or '').strip() if user is not None else ''
+
+
+class CASClient:
+    def __init__(self, base_url, timeout, pool_size, breaker):
+        self.validate_url = f"{base_url.rstrip('/')}/serviceValidate"
+        self.timeout = timeout
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def validate(self, ticket, service):
+        """
+        See parse_validation. Raises CASUnavailable or CASError.
+        """
+        self.breaker.before_call()
+        try:
+            response = self.session.get(
+                self.validate_url, params={'ticket': ticket, 'service': service},
+                timeout=self.timeout)
+            response.raise_for_status()
+            username = parse_validation(response.text)
+        except requests.RequestException as exc:
+            self.breaker.failed()
+            raise CASUnavailable("Error contacting CAS server.") from exc
+        except CASError:
+            self.breaker.failed()
+            raise
+        self.breaker.succeeded()
+        return username
+
+    async def avalidate(self, ticket, service):
+        return await sync_to_async(self.validate, thread_sensitive=False)(ticket, service)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = CASClient(
+                settings.CAS_BASE_URL,
+                timeout=(getattr(settings, 'CAS_CONNECT_TIMEOUT', 1),
+                         getattr(settings, 'CAS_READ_TIMEOUT', 3)),
+                pool_size=getattr(settings, 'CAS_POOL_SIZE', 10),
+                breaker=CircuitBreaker(getattr(settings, 'CAS_BREAKER_FAILURES', 5),
+                                       getattr(settings, 'CAS_BREAKER_RESET', 30)),
+            )
+        return _client
+
+
+@receiver(setting_changed)
+def cas_settings_changed(setting, **kwargs):
+    global _client
+    if setting.startswith('CAS_'):
+        with _client_lock:
+            _client = None
+
+
+def login_user(username):
+    """
+    Return (user, token key, created) for a username CAS vouched for,
+    creating the user and their token on first login and replacing an
+    expired token.
+    """
+    key = f"cas:user:{hashlib.md5(username.encode()).hexdigest()}"
+    entry = cache.get(key)
+    if entry is not None:
+        user, token, version = entry
+        if get_versions([f'user:{user.pk}'])[0] == version and not token_expired(token):
+            return user, token.key, False
+
+    user, created = get_user_model().objects.get_or_create(
+        username=username,
+        defaults={'email': '', 'password': get_random_string(32)},
+    )
+    # Read the version before the token, so a token change from here on
+    # leaves this entry stale rather than cached as current.
+    version, = get_versions([f'user:{user.pk}'])
+    token, _ = Token.objects.get_or_create(user=user)
+    if token_expired(token):
+        token = rotate_token(user)
+    cache.set(key, (user, token, version),
+              timeout=getattr(settings, 'CAS_USER_CACHE_TIMEOUT', 3600))
+    return user, token.key, created
@@ -0,0 +1,93 @@
+"""
+Conditional GET (ETag / Last-Modified) for endpoints that render one game.
+"""
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .models import GameHistory
+
+
+def game_validators(request, game, now):
+    """
+    The ETag and Last-Modified timestamp of a game-scoped response.
+    ``game`` needs updated_at, status, start_time and end_time.
+    """
+    # The ETag covers the path and query string, so the detail and
+    # comments endpoints (and different pages) never share one. It is
+    # built from the database alone, so every worker agrees on it; edits
+    # to the users and sport a game shows move its updated_at (see
+    # scheduler/signals.py). The game's state changes as it starts and
+    # ends without any write, so the state at ``now`` goes in too, and
+    # Last-Modified moves to the start or end once it has passed.
+    state = game.current_state(now)
+    raw = f"{request.get_full_path()}|{game.updated_at.isoformat()}|{state}"
+    moments = [] if game.status == 'cancelled' else [game.start_time, game.end_time]
+    last_modified = max([game.updated_at, *(moment for moment in moments if moment <= now)])
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest()), int(last_modified.timestamp())
+
+
+def validator_fields(pk):
+    return GameHistory.objects.filter(pk=pk).order_by() \
+        .only('updated_at', 'status', 'start_time', 'end_time')
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def game_conditional(view):
+    """
+    Answer If-None-Match / If-Modified-Since for a game-scoped GET with a
+    single primary-key lookup of the game, live or archived (archived rows
+    keep their updated_at), returning 304 before the view (and its
+    serializer) runs. The game pk comes from the URL kwarg ``pk`` or
+    ``game_pk``. Goes above @api_view.
+    """
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        game = validator_fields(kwargs.get('pk', kwargs.get('game_pk'))).first()
+        if game is None:
+            # Let the view produce its usual 404.
+            return view(request, *args, **kwargs)
+
+        etag, last_modified = game_validators(request, game, timezone.now())
+        # cache_response keys on it, so a cached body never outlives the
+        # state it was rendered in.
+        request.game_etag = etag
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = set_validators(view(request, *args, **kwargs), etag, last_modified)
+        return response
+    return wrapped
+
+
+def agame_conditional(view):
+    """
+    game_conditional for the async read views in scheduler/views.py, which
+    only see GET and HEAD.
+    """
+    @functools.wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        game = await validator_fields(kwargs.get('pk', kwargs.get('game_pk'))).afirst()
+        if game is None:
+            return await view(request, *args, **kwargs)
+
+        etag, last_modified = game_validators(request, game, timezone.now())
+        request.game_etag = etag
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = set_validators(await view(request, *args, **kwargs), etag, last_modified)
+        return response
+    return wrapped
@@ -0,0 +1,174 @@
+"""
+Change events for the server-sent event streams.
+
+Writes publish small events ({"type": ..., "game": pk}) on the 'games'
+channel and on the game's own 'game-<pk>' channel (see scheduler/signals.py);
+the stream views in scheduler/views.py subscribe to them. Clients refetch
+what changed, using ETags, instead of polling on a timer.
+
+The broker class is chosen by settings.EVENT_BROKER:
+
+- InProcessBroker fans events out to subscribers in the same process. It is
+  enough for a single ASGI worker.
+- PostgresBroker sends events through Postgres NOTIFY so every worker
+  process sees every event, then fans out locally like InProcessBroker.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def game_channel(pk):
+    return f'game-{pk}'
+
+
+FEED_CHANNEL = 'games'
+
+
+class Subscription:
+    """
+    A subscriber's queue, bound to the event loop that created it. Events
+    may be offered from any thread.
+    """
+
+    def __init__(self, broker, channels, maxsize=100):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop has shut down.
+            self.close()
+
+    def _put(self, event):
+        if self.queue.full():
+            # A slow reader loses its oldest events rather than stalling
+            # publishers or growing without bound.
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """
+        Return the next event, or None if nothing arrives within timeout.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, *channels):
+        """
+        Subscribe to ``channels``. Must be called from a running event loop.
+        """
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Carries events between worker processes over one Postgres NOTIFY
+    channel. Each process keeps one LISTEN connection, opened when its first
+    subscriber arrives, and hands what it hears to its local subscribers.
+
+    Notifications sent inside a transaction are only delivered if it
+    commits, in commit order.
+    """
+    pg_channel = 'pickup_events'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, channel, event):
+        payload = json.dumps({'channel': channel, 'event': event})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.pg_channel, payload])
+
+    def subscribe(self, *channels):
+        subscription = super().subscribe(*channels)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import psycopg
+
+        db = settings.DATABASES['default']
+        conninfo = psycopg.conninfo.make_conninfo(
+            dbname=db.get('NAME'), user=db.get('USER'), password=db.get('PASSWORD'),
+            host=db.get('HOST'), port=db.get('PORT'), **db.get('OPTIONS', {}),
+        )
+        try:
+            async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {self.pg_channel}")
+                async for notify in conn.notifies():
+                    message = json.loads(notify.payload)
+                    self.deliver(message['channel'], message['event'])
+        except Exception:
+            logger.exception("Event listener stopped; it restarts on the next subscribe.")
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            path = getattr(settings, 'EVENT_BROKER', 'scheduler.events.InProcessBroker')
+            _broker = import_string(path)()
+        return _broker
+
+
+def publish_game_event(event_type, game_id):
+    """
+    Publish a change to one game on its own channel and on the feed.
+    """
+    event = {'type': event_type, 'game': game_id}
+    broker = get_broker()
+    broker.publish(game_channel(game_id), event)
+    broker.publish(FEED_CHANNEL, event)
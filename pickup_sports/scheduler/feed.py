@@ -0,0 +1,126 @@
+"""
+The personalized "for you" game feed.
+
+Candidates are the soonest joinable games (open, below capacity, not yet
+over) within FEED_HORIZON_DAYS, read as plain columns in one query. Every
+candidate is scored in a single vectorized NumPy pass on four signals,
+each scaled to [0, 1]:
+
+- sport: the game's sport is one of the user's favorite_sports;
+- skill: how often the user has played at the game's skill level before
+  ('all' games suit everyone reasonably well);
+- fill: how full the game already is, since games with players are more
+  likely to happen;
+- time: how soon it starts, decaying over FEED_TIME_DECAY_HOURS.
+
+They are combined with the FEED_WEIGHTS weights. Games the user created
+or already joined are left out.
+
+The ranked ids are cached per user under the 'games' and 'user:<pk>'
+cache versions (see scheduler/cache.py), so any game change or a change
+to the user's profile recomputes the feed on the next read; the cache
+timeout bounds how stale the time signal can get.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .cache import get_versions
+from .models import JOINABLE, Game, ParticipantHistory
+from .schedule import user_game_ids
+
+SKILL_LEVELS = [level for level, _ in Game.SKILL_LEVEL_CHOICES]
+DEFAULT_WEIGHTS = {'sport': 3.0, 'skill': 1.5, 'fill': 1.0, 'time': 2.0}
+# Skill score of an 'all levels' game, and of any game for a user with no
+# history yet.
+OPEN_LEVEL_SCORE = 0.75
+
+
+def feed_key(user_id):
+    versions = get_versions(['games', f'user:{user_id}'])
+    return f"feed:{user_id}:{versions[0]}:{versions[1]}"
+
+
+def skill_profile(user_id):
+    """
+    Share of the user's past games at each level, in SKILL_LEVELS order,
+    or None without history. Archived games count too.
+    """
+    counts = dict(
+        ParticipantHistory.objects.filter(user_id=user_id).order_by()
+        .values_list('game__skill_level').annotate(n=Count('pk'))
+    )
+    total = sum(counts.values())
+    if not total:
+        return None
+    return np.array([counts.get(level, 0) / total for level in SKILL_LEVELS])
+
+
+def score_games(rows, favorite_sports, skills, now, weights):
+    """
+    Scores for ``rows`` of (sport_id, skill_level, participant_count,
+    capacity, start_time), computed column-wise.
+    """
+    sport_ids, levels, counts, capacities, starts = zip(*rows)
+    sport = np.isin(np.array(sport_ids), np.array(list(favorite_sports), dtype=int))
+
+    level_index = np.array([SKILL_LEVELS.index(level) for level in levels])
+    if skills is None:
+        skill = np.full(len(rows), OPEN_LEVEL_SCORE)
+    else:
+        skill = skills[level_index]
+        skill[level_index == SKILL_LEVELS.index('all')] = OPEN_LEVEL_SCORE
+
+    counts = np.array(counts, dtype=float)
+    capacity = np.array([c or 0 for c in capacities], dtype=float)
+    # Unlimited games count as full-ish once ten players are in.
+    fill = np.where(capacity > 0, counts / np.maximum(capacity, 1), np.minimum(counts / 10, 1))
+
+    hours = np.array([(start - now).total_seconds() / 3600 for start in starts])
+    decay = getattr(settings, 'FEED_TIME_DECAY_HOURS', 48)
+    time = np.exp(-np.maximum(hours, 0) / decay)
+
+    return (weights['sport'] * sport + weights['skill'] * skill +
+            weights['fill'] * fill + weights['time'] * time)
+
+
+def rank_feed(user, now):
+    """
+    Ids of the games to show ``user``, best first.
+    """
+    horizon = now + timedelta(days=getattr(settings, 'FEED_HORIZON_DAYS', 14))
+    limit = getattr(settings, 'FEED_CANDIDATES', 2000)
+    rows = list(
+        Game.objects.filter(JOINABLE, end_time__gte=now, start_time__lte=horizon)
+        .exclude(pk__in=user_game_ids(user.pk))
+        .order_by('start_time', 'id')
+        .values_list('id', 'sport_id', 'skill_level', 'participant_count', 'capacity',
+                     'start_time')[:limit]
+    )
+    if not rows:
+        return []
+
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'FEED_WEIGHTS', {})}
+    favorites = set(user.favorite_sports.values_list('pk', flat=True))
+    scores = score_games([row[1:] for row in rows], favorites, skill_profile(user.pk), now,
+                         weights)
+    ids = np.array([row[0] for row in rows])
+    # Stable sort on -score keeps start order among equal scores.
+    order = np.argsort(-scores, kind='stable')[:getattr(settings, 'FEED_SIZE', 50)]
+    return ids[order].tolist()
+
+
+def get_feed(user, now):
+    """
+    The user's ranked game ids, from the cache when nothing they depend on
+    has changed.
+    """
+    key = feed_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = rank_feed(user, now)
+        cache.set(key, ids, timeout=getattr(settings, 'FEED_CACHE_TIMEOUT', 300))
+    return ids
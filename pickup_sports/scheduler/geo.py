@@ -0,0 +1,143 @@
+"""
+Proximity search without PostGIS.
+
+Games with coordinates also store their geohash, a base-32 string where
+every extra character narrows the cell the point lies in and nearby points
+share prefixes. A "within r km of (lat, lng)" query becomes:
+
+1. a few geohash cells, at the finest precision where at most MAX_CELLS of
+   them cover the circle's bounding box, each read as a range scan on the
+   geohash index;
+2. the bounding box itself on latitude/longitude;
+3. the exact great-circle distance, computed by the database, for the
+   handful of rows left.
+
+Prefixes are matched as ranges ([prefix + '0'..., prefix + 'z'...]) rather
+than with LIKE, so the same plain b-tree index serves Postgres and SQLite.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Stored precision: cells of about 4.8m x 4.8m.
+GEOHASH_PRECISION = 9
+MAX_CELLS = 16
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, interval = (lng, lng_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if target >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geohash_for(lat, lng):
+    """
+    The stored geohash for a game's coordinates, or None without them.
+    """
+    if lat is None or lng is None:
+        return None
+    return encode(lat, lng)
+
+
+def cell_size(precision):
+    """
+    (height, width) of a geohash cell in degrees.
+    """
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    (min_lat, max_lat, min_lng, max_lng) around the circle. The longitude
+    bounds are None when the box wraps the antimeridian or reaches a pole.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return min_lat, max_lat, None, None
+    dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+    if lng - dlng < -180.0 or lng + dlng > 180.0:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def covering_cells(lat, lng, radius_km, max_cells=MAX_CELLS):
+    """
+    Geohash prefixes whose cells together cover the circle's bounding box.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    if min_lng is None:
+        min_lng, max_lng = -180.0, 180.0
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = range(
+            int((min_lat + 90) // height),
+            min(int((max_lat + 90) // height), round(180 / height) - 1) + 1)
+        cols = range(
+            int((min_lng + 180) // width),
+            min(int((max_lng + 180) // width), round(360 / width) - 1) + 1)
+        if len(rows) * len(cols) <= max_cells:
+            return sorted({
+                encode(-90 + (row + 0.5) * height, -180 + (col + 0.5) * width, precision)
+                for row in rows for col in cols
+            })
+    return ['']
+
+
+def prefix_condition(prefixes, field='geohash'):
+    """
+    OR of one index range per prefix.
+    """
+    pad = GEOHASH_PRECISION
+    condition = Q(pk__in=[])
+    for prefix in prefixes:
+        condition |= Q(**{
+            f'{field}__gte': prefix.ljust(pad, BASE32[0]),
+            f'{field}__lte': prefix.ljust(pad, BASE32[-1]),
+        })
+    return condition
+
+
+def distance_km(lat, lng):
+    """
+    Haversine distance in km from (lat, lng) to each row's coordinates.
+    """
+    half_dlat = Radians(F('latitude') - Value(lat)) / 2
+    half_dlng = Radians(F('longitude') - Value(lng)) / 2
+    a = Power(Sin(half_dlat), 2) + (
+        Value(math.cos(math.radians(lat))) * Cos(Radians(F('latitude'))) *
+        Power(Sin(half_dlng), 2)
+    )
+    # Rounding can push ``a`` a hair past 1 for antipodal points.
+    return Value(2 * EARTH_RADIUS_KM) * ASin(
+        Sqrt(Least(a, Value(1.0))), output_field=FloatField())
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in km, in Python, for checking results.
+    """
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
@@ -0,0 +1,31 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduler.archive import archive_games
+
+
+class Command(BaseCommand):
+    help = (
+        "Move games that ended more than ARCHIVE_AFTER_DAYS ago, with their "
+        "participants and comments, into the archive tables. Run it nightly, "
+        "e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Archive games that ended this many days ago instead of ARCHIVE_AFTER_DAYS.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Games moved per transaction instead of ARCHIVE_BATCH_SIZE.",
+        )
+
+    def handle(self, *args, **options):
+        before = None
+        if options['days'] is not None:
+            before = timezone.now() - datetime.timedelta(days=options['days'])
+        moved = archive_games(before, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} game(s)."))
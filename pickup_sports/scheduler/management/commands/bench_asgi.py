@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from scheduler import seeding
+from scheduler.models import Game
+
+PREFIX = "bench-asgi"
+
+# How each mode is served: the DRF views under WSGI, the same views under
+# ASGI, and the native async read views under ASGI.
+MODES = {
+    'wsgi': {'DJANGO_SERVER_INTERFACE': 'wsgi', 'ASYNC_READ_VIEWS': False},
+    'asgi-sync': {'DJANGO_SERVER_INTERFACE': 'asgi', 'ASYNC_READ_VIEWS': False},
+    'asgi': {'DJANGO_SERVER_INTERFACE': 'asgi', 'ASYNC_READ_VIEWS': True},
+}
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway games (deleted afterwards) and compare throughput and "
+        "latency of the public read endpoints served through Django's WSGI "
+        "handler on a fixed thread pool and through its ASGI handler, with "
+        "the DRF views and with their async versions. Each mode runs in a "
+        "fresh process; requests go straight to the handler, so no server "
+        "or socket is involved."
+    )
+    # The URLconf must not be imported before a worker picks its views.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=3000)
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help="Clients with a request in flight at any time.")
+        parser.add_argument('--threads', type=int, default=16,
+                            help="WSGI server threads.")
+        parser.add_argument('--cache', action='store_true',
+                            help="Keep the response cache on (off by default, to time the reads).")
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--worker', choices=MODES, help="Internal: run one mode.")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.work(options)
+
+        self.seed(options['games'])
+        try:
+            results = {mode: self.spawn(mode, options) for mode in options['modes']}
+        finally:
+            self.clean_up()
+
+        self.stdout.write(f"{options['requests']} requests, {options['concurrency']} clients, "
+                          f"{options['threads']} WSGI threads, "
+                          f"cache {'on' if options['cache'] else 'off'}")
+        self.stdout.write(f"{'mode':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'p99 ms':>8} {'errors':>6}")
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<10} {result['throughput']:>8.0f} {result['p50']:>8.1f} "
+                f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['errors']:>6}")
+
+    def seed(self, count):
+        started = time.perf_counter()
+        seeding.seed(users=200, games=count, prefix=PREFIX, past_days=0, future_days=30)
+        self.stdout.write(f"Seeded {count} games in {time.perf_counter() - started:.1f}s")
+
+    def clean_up(self):
+        # Plain DELETEs, without an event and a cache bump for every row.
+        seeding.unseed(PREFIX)
+
+    def spawn(self, mode, options):
+        args = [sys.executable, '-m', 'django', 'bench_asgi', '--worker', mode,
+                '--requests', str(options['requests']),
+                '--concurrency', str(options['concurrency']),
+                '--threads', str(options['threads'])]
+        if options['cache']:
+            args.append('--cache')
+        env = {**os.environ, 'DJANGO_SERVER_INTERFACE': MODES[mode]['DJANGO_SERVER_INTERFACE']}
+        done = subprocess.run(args, env=env, cwd=settings.BASE_DIR,
+                              capture_output=True, text=True)
+        if done.returncode:
+            raise CommandError(f"{mode} failed:\n{done.stderr}")
+        return json.loads(done.stdout.splitlines()[-1])
+
+    def work(self, options):
+        games = list(Game.objects.filter(creator__username__startswith=f"{PREFIX}-")
+                     .values_list('pk', flat=True))
+        users = list(get_user_model().objects.filter(username__startswith=f"{PREFIX}-")
+                     .values_list('pk', flat=True))
+        if not games:
+            raise CommandError("Nothing seeded; run without --worker.")
+        paths = self.paths(games, users, options['requests'])
+
+        overrides = {'ASYNC_READ_VIEWS': MODES[options['worker']]['ASYNC_READ_VIEWS']}
+        if not options['cache']:
+            overrides['CACHES'] = NO_CACHE
+        with override_settings(**overrides):
+            if options['worker'] == 'wsgi':
+                run = self.run_wsgi(paths, options['concurrency'], options['threads'])
+            else:
+                run = asyncio.run(self.run_asgi(paths, options['concurrency']))
+        elapsed, timings, statuses = run
+
+        timings = sorted(timings)
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(json.dumps({
+            'throughput': len(timings) / elapsed,
+            'p50': quantiles[49] * 1000,
+            'p95': quantiles[94] * 1000,
+            'p99': quantiles[98] * 1000,
+            'errors': sum(1 for code in statuses if code >= 400),
+        }))
+
+    def paths(self, games, users, count):
+        """
+        The same mix of read requests for every mode.
+        """
+        rng = random.Random(1)
+        choices = [
+            lambda: "/api/games/?view=summary&page_size=20",
+            lambda: "/api/games/?page_size=20",
+            lambda: f"/api/games/{rng.choice(games)}/",
+            lambda: f"/api/games/{rng.choice(games)}/comments/",
+            lambda: "/api/sports/",
+            lambda: f"/api/profile/{rng.choice(users)}/",
+        ]
+        return [rng.choice(choices)() for _ in range(count)]
+
+    def run_wsgi(self, paths, concurrency, threads):
+        handler = WSGIHandler()
+        server = ThreadPoolExecutor(threads)
+
+        def serve(path):
+            url = urlsplit(path)
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+                'SCRIPT_NAME': '', 'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            started = []
+            body = handler(environ, lambda status, headers: started.append(status))
+            try:
+                b''.join(body)
+            finally:
+                body.close()
+            return int(started[0][:3])
+
+        def client(path):
+            started = time.perf_counter()
+            status = server.submit(serve, path).result()
+            return time.perf_counter() - started, status
+
+        for path in paths[:concurrency]:
+            client(path)   # warm up
+        with ThreadPoolExecutor(concurrency) as clients:
+            started = time.perf_counter()
+            results = list(clients.map(client, paths))
+            elapsed = time.perf_counter() - started
+        server.shutdown()
+        return elapsed, [t for t, _ in results], [s for _, s in results]
+
+    async def run_asgi(self, paths, concurrency):
+        handler = ASGIHandler()
+
+        async def serve(path):
+            url = urlsplit(path)
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+                'query_string': url.query.encode(), 'root_path': '',
+                'headers': [(b'host', b'localhost')],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            requested = False
+            status = []
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client never disconnects; Django cancels this wait.
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            started = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - started, status[0]
+
+        for path in paths[:concurrency]:
+            await serve(path)   # warm up
+        queue = iter(paths)
+        results = []
+
+        async def client():
+            for path in queue:
+                results.append(await serve(path))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        return elapsed, [t for t, _ in results], [s for _, s in results]
@@ -0,0 +1,476 @@
+import json
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import time as clock, timedelta
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from scheduler import seeding, urls
+from scheduler.models import Game, Participant, Sport
+from scheduler.recurrence import create_series
+
+PREFIX = "bench-endpoints"
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# Endpoints in scheduler/urls.py that are not benchmarked, and why.
+SKIPPED = {
+    'games_feed_events': "server-sent event stream; the response never ends",
+    'game_events': "server-sent event stream; the response never ends",
+}
+
+# A median latency more than TOLERANCE over the baseline's is a
+# regression, as is a mean of more than QUERY_SLACK queries per request
+# over it. The tail percentiles of a short run are too noisy to compare.
+TOLERANCE = 0.5
+QUERY_SLACK = 0.5
+
+# Game lists are only paginated on request; clients ask for pages.
+PAGE = '?page_size=20'
+
+Call = namedtuple('Call', 'path body user')
+
+
+class Targets:
+    """
+    The seeded rows the requests point at, and tokens for their users.
+    Endpoints that use something up (deleting a game, leaving it, rotating
+    a token) get a distinct one per request.
+    """
+
+    def __init__(self, rng, requests):
+        self.rng = rng
+        User = get_user_model()
+        self.users = list(User.objects.filter(username__startswith=f"{PREFIX}-")
+                          .order_by('pk').values_list('pk', flat=True))
+        self.tokens = {token.user_id: token.key for token in Token.objects.bulk_create(
+            Token(key=Token.generate_key(), user_id=pk) for pk in self.users)}
+        self.staff = self.users[0]
+        User.objects.filter(pk=self.staff).update(is_staff=True)
+        self.sports = list(Sport.objects.filter(name__startswith=f"{PREFIX}-")
+                           .values_list('pk', flat=True))
+
+        now = timezone.now()
+        games = Game.objects.filter(sport__in=self.sports)
+        self.upcoming = list(
+            games.filter(start_time__gt=now, status='open').order_by('pk').values(
+                'pk', 'creator_id', 'sport_id', 'name', 'location', 'start_time',
+                'end_time', 'capacity', 'skill_level'))
+        rng.shuffle(self.upcoming)
+        self.games = list(games.values_list('pk', flat=True))
+        self.archivists = list(games.filter(end_time__lte=now)
+                               .values_list('creator_id', flat=True).distinct())
+        self.members = list(Participant.objects.filter(
+            game__in=[game['pk'] for game in self.upcoming]).values_list('user_id', 'game_id'))
+        rng.shuffle(self.members)
+
+        # Games only deleted, and uncapped games only joined, by the benchmark.
+        start = now + timedelta(days=1)
+        self.disposable = list(Game.objects.bulk_create(
+            Game(name=f"Disposable {i}", creator_id=rng.choice(self.users),
+                 sport_id=rng.choice(self.sports), location="Bench Park",
+                 start_time=start, end_time=start + timedelta(hours=1))
+            for i in range(requests)))
+        joiners = self.users[1:]
+        per_game = min(10, len(joiners))
+        open_runs = Game.objects.bulk_create(
+            Game(name=f"Open run {i}", creator_id=self.staff,
+                 sport_id=rng.choice(self.sports), location="Bench Gym",
+                 start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1))
+            for i in range(-(-requests // per_game)))
+        self.joins = [(joiners[i // len(open_runs)], open_runs[i % len(open_runs)].pk)
+                      for i in range(requests)]
+
+        today = timezone.localdate()
+        self.series = [
+            create_series(
+                creator_id=self.users[i + 1], sport_id=self.sports[i % len(self.sports)],
+                name=f"Weekly {i}", location="Bench Field", weekdays=0b0010101,
+                start_time=clock(18), duration=timedelta(minutes=90),
+                starts_on=today, until=today + timedelta(weeks=8))
+            for i in range(min(5, len(self.users) - 1))
+        ]
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def game(self):
+        return self.rng.choice(self.games)
+
+    def hosted(self):
+        return self.rng.choice(self.upcoming)
+
+    def game_body(self, game):
+        return {
+            'name': game['name'], 'sport_id': game['sport_id'], 'location': game['location'],
+            'start_time': game['start_time'].isoformat(), 'end_time': game['end_time'].isoformat(),
+            'capacity': game['capacity'], 'skill_level': game['skill_level'],
+        }
+
+
+def one_each(items, i, from_end=False):
+    """
+    The i-th item, so each is used once, or None when they have run out.
+    """
+    if i >= len(items):
+        return None
+    return items[-1 - i] if from_end else items[i]
+
+
+def game_create(t, i):
+    start = timezone.now() + timedelta(days=t.rng.randint(1, 30), hours=t.rng.randint(0, 23))
+    body = {'name': f"New game {i}", 'sport_id': t.rng.choice(t.sports), 'location': "Bench Park",
+            'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=2)).isoformat(),
+            'capacity': 10, 'latitude': 40.71, 'longitude': -74.0}
+    return Call(reverse('game_create'), body, t.user())
+
+
+def game_update(t, i):
+    game = t.hosted()
+    return Call(reverse('game_update', kwargs={'pk': game['pk']}),
+                {**t.game_body(game), 'name': f"Renamed {i}"}, game['creator_id'])
+
+
+def cancel_game(t, i):
+    game = one_each(t.upcoming, i)
+    return game and Call(reverse('cancel_game', kwargs={'pk': game['pk']}), None,
+                         game['creator_id'])
+
+
+def game_delete(t, i):
+    game = one_each(t.disposable, i)
+    return game and Call(reverse('game_delete', kwargs={'pk': game.pk}), None, game.creator_id)
+
+
+def join_game(t, i):
+    pair = one_each(t.joins, i)
+    return pair and Call(reverse('join_game', kwargs={'pk': pair[1]}), None, pair[0])
+
+
+def leave_game(t, i):
+    # From the other end of the list than post_comment.
+    pair = one_each(t.members, i, from_end=True)
+    return pair and Call(reverse('leave-game', kwargs={'pk': pair[1]}), None, pair[0])
+
+
+def post_comment(t, i):
+    user, game = t.rng.choice(t.members)
+    return Call(reverse('game-comments', kwargs={'game_pk': game}), {'text': f"Comment {i}"}, user)
+
+
+def bulk_participants(t, i):
+    game = t.hosted()
+    operations = [{'game': game['pk'], 'action': 'add', 'users': t.rng.sample(t.users, 3)}]
+    return Call(reverse('bulk_participants'), {'operations': operations}, game['creator_id'])
+
+
+def series_create(t, i):
+    today = timezone.localdate()
+    body = {'name': f"New series {i}", 'sport_id': t.rng.choice(t.sports),
+            'location': "Bench Field", 'weekdays': [1, 3], 'start_time': "19:00",
+            'duration': "01:30:00", 'starts_on': today.isoformat(),
+            'until': (today + timedelta(weeks=4)).isoformat(), 'capacity': 12}
+    return Call(reverse('series_create'), body, t.user())
+
+
+def series_update(t, i):
+    series = t.rng.choice(t.series)
+    return Call(reverse('series_update', kwargs={'pk': series.pk}),
+                {'name': f"Renamed {i}", 'scope': 'all'}, series.creator_id)
+
+
+def series_cancel(t, i):
+    series = t.rng.choice(t.series)
+    return Call(reverse('series_cancel', kwargs={'pk': series.pk}), {'scope': 'all'},
+                series.creator_id)
+
+
+def token_rotate(t, i):
+    # Rotating invalidates the user's token, so nothing runs after this.
+    user = one_each(t.users, i, from_end=True)
+    return user and Call(reverse('token_rotate'), None, user)
+
+
+def game_list(t, i):
+    query = t.rng.choice([
+        '', '&view=summary', f'&sport_id={t.rng.choice(t.sports)}',
+        '&state=Open&has_space=true', '&near=40.72,-74.0&radius=5',
+    ])
+    return Call(reverse('game_list') + PAGE + query, None, t.user())
+
+
+# (method, URL name, request i -> Call, or None once there is nothing
+# left to use up), in the order they run: reads, then writes, then what
+# uses things up.
+SCENARIOS = [
+    ('GET', 'sport_list', lambda t, i: Call(reverse('sport_list'), None, t.user())),
+    ('GET', 'game_list', game_list),
+    ('GET', 'game_detail',
+     lambda t, i: Call(reverse('game_detail', kwargs={'pk': t.game()}), None, t.user())),
+    ('GET', 'game-comments',
+     lambda t, i: Call(reverse('game-comments', kwargs={'game_pk': t.game()}), None, t.user())),
+    ('GET', 'game_feed', lambda t, i: Call(reverse('game_feed'), None, t.user())),
+    ('GET', 'my_archived_games',
+     lambda t, i: Call(reverse('my_archived_games') + PAGE, None, t.rng.choice(t.archivists))),
+    ('GET', 'profile_detail', lambda t, i: Call(reverse('profile_detail'), None, t.user())),
+    ('GET', 'profile_conflicts', lambda t, i: Call(reverse('profile_conflicts'), None, t.user())),
+    ('GET', 'public_profile',
+     lambda t, i: Call(reverse('public_profile', kwargs={'id': t.user()}), None, t.user())),
+    ('GET', 'user-list',
+     lambda t, i: Call(reverse('user-list') + f'?search={t.rng.choice(seeding.FIRST_NAMES)[:3]}',
+                       None, t.user())),
+    ('GET', 'user-games',
+     lambda t, i: Call(reverse('user-games', kwargs={'user_id': t.user()}) + PAGE, None,
+                       t.user())),
+    ('GET', 'user-schedule',
+     lambda t, i: Call(reverse('user-schedule') + '?user_ids='
+                       + ','.join(str(pk) for pk in t.rng.sample(t.users, 3)), None, t.user())),
+    ('GET', 'series_detail',
+     lambda t, i: Call(reverse('series_detail', kwargs={'pk': t.rng.choice(t.series).pk}),
+                       None, t.user())),
+    ('GET', 'token_cache_stats', lambda t, i: Call(reverse('token_cache_stats'), None, t.staff)),
+    ('PATCH', 'profile_update',
+     lambda t, i: Call(reverse('profile_update'), {'bio': f"Bio {i}"}, t.user())),
+    ('POST', 'game_create', game_create),
+    ('PUT', 'game_update', game_update),
+    ('POST', 'game-comments', post_comment),
+    ('POST', 'bulk_participants', bulk_participants),
+    ('POST', 'join_game', join_game),
+    ('POST', 'series_create', series_create),
+    ('PATCH', 'series_update', series_update),
+    ('POST', 'series_cancel', series_cancel),
+    ('POST', 'leave-game', leave_game),
+    ('POST', 'cancel_game', cancel_game),
+    ('DELETE', 'game_delete', game_delete),
+    ('POST', 'token_rotate', token_rotate),
+]
+
+
+def unbenchmarked():
+    """
+    Names in scheduler/urls.py with neither a scenario nor a reason to skip.
+    """
+    covered = {name for _, name, _ in SCENARIOS} | set(SKIPPED)
+    return sorted(p.name for p in urls.urlpatterns if p.name not in covered)
+
+
+def server_timing(value):
+    """
+    (queries, db ms) from the Server-Timing header; see scheduler/timing.py.
+    """
+    db = value.split(', ')[0]
+    _, duration, desc = db.split(';')
+    return int(desc.split('"')[1].split()[0]), float(duration.split('=')[1])
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway dataset (deleted afterwards) and drive every "
+        "endpoint in scheduler/urls.py through Django's WSGI handler from "
+        "concurrent client threads. Reports latency percentiles, throughput "
+        "and queries per request for each endpoint, optionally saves them "
+        "as JSON, and compares them with a saved baseline. Meant for "
+        "Postgres; SQLite serializes the concurrent writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--games', type=int, default=5000)
+        parser.add_argument('--participants', type=int, default=8,
+                            help="Average participants per game.")
+        parser.add_argument('--comments', type=int, default=3,
+                            help="Average comments per game.")
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Client threads, each with one request in flight.")
+        parser.add_argument('--endpoints', nargs='+', metavar='NAME',
+                            help="Only these URL names.")
+        parser.add_argument('--cache', action='store_true',
+                            help="Keep the response cache on (off by default, to time the views).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', metavar='FILE', help="Save the results as JSON.")
+        parser.add_argument('--baseline', metavar='FILE',
+                            help="Compare with results saved by an earlier --output; "
+                                 "fails if an endpoint regressed.")
+        parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                            help="Allowed p50 increase over the baseline, as a fraction.")
+
+    def handle(self, *args, **options):
+        missing = unbenchmarked()
+        if missing:
+            raise CommandError(f"No benchmark scenario for: {', '.join(missing)}")
+        scenarios = [s for s in SCENARIOS
+                     if not options['endpoints'] or s[1] in options['endpoints']]
+        if not scenarios:
+            raise CommandError("No endpoints match --endpoints.")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        # The numbers are in the report; the middleware's own log would
+        # repeat them for every slow request.
+        timing_log = logging.getLogger('scheduler.timing')
+        level = timing_log.level
+        timing_log.setLevel(logging.ERROR)
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        dataset = seeding.seed(users=options['users'], games=options['games'],
+                               participants=options['participants'],
+                               comments=options['comments'], prefix=PREFIX,
+                               seed=options['seed'])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(f"Seeded {dataset} in {time.perf_counter() - started:.1f}s")
+        try:
+            targets = Targets(rng, options['requests'])
+            with override_settings(**({} if options['cache'] else {'CACHES': NO_CACHE})):
+                handler = WSGIHandler()
+                self.send(handler, Call(reverse('sport_list'), None, None), {}, 'GET')   # warm up
+                results = {}
+                for method, name, scenario in scenarios:
+                    calls = [call for call in (scenario(targets, i)
+                                               for i in range(options['requests'])) if call]
+                    results[f"{method} {name}"] = self.run(
+                        handler, method, calls, targets.tokens, options['concurrency'])
+        finally:
+            connections.close_all()
+            seeding.unseed(PREFIX)
+            timing_log.setLevel(level)
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'cache': options['cache'],
+            'endpoints': results,
+        }
+        self.show(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Saved to {options['output']}")
+        if baseline:
+            regressions = self.compare(baseline['endpoints'], results, options['tolerance'])
+            if regressions:
+                raise CommandError(f"Regressed against {options['baseline']}: "
+                                   f"{', '.join(regressions)}")
+
+    def run(self, handler, method, calls, tokens, concurrency):
+        pending = deque(calls)
+        samples = []
+
+        def client():
+            try:
+                while True:
+                    try:
+                        call = pending.popleft()
+                    except IndexError:
+                        return
+                    samples.append(self.send(handler, call, tokens, method))
+            finally:
+                connections.close_all()
+
+        clients = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _, _, _ in samples)
+        queries = [count for _, _, count, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, code, _, _ in samples if code >= 400),
+            'throughput': len(samples) / elapsed if elapsed else 0,
+            'p50': percentile(latencies, 0.50) * 1000 if samples else 0,
+            'p95': percentile(latencies, 0.95) * 1000 if samples else 0,
+            'p99': percentile(latencies, 0.99) * 1000 if samples else 0,
+            'queries': statistics.fmean(queries) if samples else 0,
+            'max_queries': max(queries, default=0),
+            'db_ms': statistics.fmean(db for _, _, _, db in samples) if samples else 0,
+        }
+
+    def send(self, handler, call, tokens, method):
+        """
+        Returns (seconds, status, queries, db ms) for one request.
+        """
+        url = urlsplit(call.path)
+        body = json.dumps(call.body).encode() if call.body is not None else b''
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+            'SCRIPT_NAME': '', 'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        if call.user is not None:
+            environ['HTTP_AUTHORIZATION'] = f"Token {tokens[call.user]}"
+        started = time.perf_counter()
+        response = handler(environ, lambda status, headers: None)
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        elapsed = time.perf_counter() - started
+        queries, db = server_timing(response['Server-Timing'])
+        return elapsed, response.status_code, queries, db
+
+    def show(self, results):
+        self.stdout.write(f"{'endpoint':<28} {'req':>5} {'err':>4} {'req/s':>7} {'p50 ms':>8} "
+                          f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+        for key, r in results.items():
+            self.stdout.write(
+                f"{key:<28} {r['requests']:>5} {r['errors']:>4} {r['throughput']:>7.0f} "
+                f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['queries']:>8.1f}")
+
+    def compare(self, baseline, results, tolerance):
+        """
+        Print each endpoint's latency and queries against the baseline's;
+        return the endpoints that regressed.
+        """
+        regressions = []
+        self.stdout.write(f"\n{'endpoint':<28} {'p50 before':>10} {'after':>8} {'change':>7} "
+                          f"{'p95 change':>10} {'queries before':>14} {'after':>6}")
+        for key, r in results.items():
+            before = baseline.get(key)
+            if before is None:
+                self.stdout.write(f"{key:<28} (not in baseline)")
+                continue
+            change = r['p50'] / before['p50'] - 1 if before['p50'] else 0
+            tail = r['p95'] / before['p95'] - 1 if before['p95'] else 0
+            regressed = (change > tolerance
+                         or r['queries'] > before['queries'] + QUERY_SLACK)
+            if regressed:
+                regressions.append(key)
+            self.stdout.write(
+                f"{key:<28} {before['p50']:>10.1f} {r['p50']:>8.1f} {change:>+7.0%} "
+                f"{tail:>+10.0%} {before['queries']:>14.1f} {r['queries']:>6.1f}"
+                + ("  REGRESSED" if regressed else ""))
+        return regressions
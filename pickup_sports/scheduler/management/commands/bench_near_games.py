@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from scheduler import seeding
+from scheduler.geo import distance_km
+from scheduler.models import Game
+
+# Query around the centers seeding.seed() clusters games about.
+CITIES = [center for center, _ in seeding.CITIES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway games with coordinates (rolled back afterwards) and "
+        "time game_list?near= against a full-table distance scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--radii', type=float, nargs='+', default=[1, 5, 25])
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['games'])
+            self.run(options['radii'], options['repeat'], options['verbosity'])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        start = time.perf_counter()
+        seeding.seed(users=max(count // 100, 10), games=count, participants=0, comments=0,
+                     prefix="bench-near")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(f"Seeded {count} games in {time.perf_counter() - start:.1f}s")
+
+    def run(self, radii, repeat, verbosity):
+        for lat, lng in CITIES[:3]:
+            for radius in radii:
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    found = set(Game.objects.near(lat, lng, radius).values_list('pk', flat=True))
+                    timings.append((time.perf_counter() - started) * 1000)
+                scan, expected = self.time_scan(lat, lng, radius, repeat)
+                if found != expected:
+                    raise CommandError(
+                        f"near({lat}, {lng}, {radius}) found {len(found)} games, "
+                        f"the full scan {len(expected)}")
+                self.stdout.write(
+                    f"({lat:.2f}, {lng:.2f}) r={radius:g}km: {len(found):>5} games, "
+                    f"median {statistics.median(timings):.2f} ms, "
+                    f"max {max(timings):.2f} ms (full scan: {scan:.2f} ms)")
+        if verbosity > 1:
+            lat, lng = CITIES[0]
+            self.stdout.write(Game.objects.near(lat, lng, radii[0]).explain())
+
+    def time_scan(self, lat, lng, radius, repeat):
+        """
+        Median time and result of computing the distance to every game.
+        """
+        timings = []
+        for _ in range(max(repeat // 4, 1)):
+            started = time.perf_counter()
+            found = set(
+                Game.objects.filter(latitude__isnull=False)
+                .annotate(distance_km=distance_km(lat, lng))
+                .filter(distance_km__lte=radius)
+                .values_list('pk', flat=True))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), found
@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from scheduler import seeding
+from scheduler.models import UserSearchToken
+from scheduler.search import search_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway users (rolled back afterwards) and time the user "
+        "search against them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--queries', nargs='+',
+            default=['ad', 'ada', 'cleo w', 'zz', 'example.', 'bench-4242'],
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['users'])
+            self.run(options['queries'], options['repeat'], options['verbosity'])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        start = time.perf_counter()
+        seeding.seed(users=count, games=0, prefix="bench")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(
+            f"Seeded {count} users in {time.perf_counter() - start:.1f}s")
+
+    def run(self, queries, repeat, verbosity):
+        User = get_user_model()
+        base = User.objects.prefetch_related('favorite_sports')
+        for query in queries:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = search_users(base, query, 20)
+                timings.append((time.perf_counter() - start) * 1000)
+            legacy = self.time_legacy(query, repeat)
+            self.stdout.write(
+                f"{query!r:>14}: {len(results):>2} results, "
+                f"median {statistics.median(timings):.2f} ms, "
+                f"max {max(timings):.2f} ms "
+                f"(triple icontains: {legacy:.2f} ms)")
+        if verbosity > 1:
+            first = queries[0].split()[0]
+            self.stdout.write(
+                UserSearchToken.objects.filter(token__startswith=first).explain())
+
+    def time_legacy(self, query, repeat):
+        """
+        Median time of the old unbounded username/email/name icontains query.
+        """
+        User = get_user_model()
+        timings = []
+        for _ in range(max(repeat // 4, 1)):
+            start = time.perf_counter()
+            list(User.objects.filter(
+                Q(username__icontains=query) |
+                Q(email__icontains=query) |
+                Q(name__icontains=query)
+            ).prefetch_related('favorite_sports'))
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,105 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from scheduler import seeding
+from scheduler.archive import archive_games
+from scheduler.models import (JOINABLE, ArchivedGame, ArchivedParticipant, Game, GameHistory,
+                              Participant)
+from scheduler.schedule import conflicting_games, user_game_ids
+
+
+# Plan lines that mean a table is read front to back.
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+    # "SCAN t" is a full table scan; "SCAN t USING INDEX" is not.
+    'sqlite': re.compile(r'\bSCAN (?P<table>\w+)(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the querysets behind the game views and fail if any of them "
+        "falls back to a sequential scan of a scheduler table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help="Seed this many throwaway games first (rolled back afterwards) "
+                 "so the planner has realistic statistics.",
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Don't know how to read {connection.vendor} plans.")
+
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            failures = self.check_plans(pattern, options['verbosity'])
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                "Sequential scans found in: " + ", ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All game queries use an index."))
+
+    def seed(self, count):
+        # Mostly history, with a thin slice of upcoming games.
+        seeding.seed(users=max(count // 10, 10), games=count, participants=3,
+                     prefix="explain", past_days=365, future_days=14)
+        # Archive the older history, leaving a few months in the live table.
+        archive_games(timezone.now() - timedelta(days=90), batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def view_querysets(self):
+        now = timezone.now()
+        game = Game.objects.order_by('pk').first()
+        user = get_user_model().objects.order_by('pk').first()
+        sport_id = game.sport_id if game else 0
+        game_id = game.pk if game else 0
+        user_id = user.pk if user else 0
+        return [
+            ('game_list', Game.objects.filter(end_time__gte=now)),
+            ('game_list?sport_id', Game.objects.filter(
+                end_time__gte=now, sport_id=sport_id)),
+            ('game_list?start_date', Game.objects.filter(
+                end_time__gte=now, start_time__gte=now + timedelta(days=1))),
+            ('game_list?state=in_progress', Game.objects.filter(
+                end_time__gte=now).in_states(['In_progress'], now)),
+            ('game_list?has_space=true', Game.objects.filter(
+                JOINABLE, end_time__gte=now)),
+            ('game_list?near', Game.objects.filter(
+                end_time__gte=now).near(41.3083, -72.9279, 5)),
+            ('my_archived_games', GameHistory.objects.filter(
+                creator_id=user_id, end_time__lte=now)),
+            ('join_game', Participant.objects.filter(game_id=game_id, user_id=user_id)),
+            ('join_game conflicts', conflicting_games(
+                user_id, now, now + timedelta(hours=2))),
+            ('user_games', GameHistory.objects.filter(
+                pk__in=user_game_ids(user_id, history=True))),
+        ]
+
+    def check_plans(self, pattern, verbosity):
+        tables = {model._meta.db_table for model in (
+            Game, Participant, ArchivedGame, ArchivedParticipant)}
+        failures = []
+        for label, queryset in self.view_querysets():
+            plan = queryset.explain()
+            scanned = {m.group('table') for m in pattern.finditer(plan)} & tables
+            if scanned:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(
+                    f"{label}: sequential scan on {', '.join(sorted(scanned))}"))
+            else:
+                self.stdout.write(f"{label}: ok")
+            if verbosity > 1 or scanned:
+                self.stdout.write(plan)
+        return failures
@@ -0,0 +1,28 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduler.recurrence import due_series, materialize
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the upcoming games of every recurring series, keeping the "
+        "materialized window rolling. Run it daily, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Materialize this many days ahead instead of SERIES_MATERIALIZE_DAYS.",
+        )
+
+    def handle(self, *args, **options):
+        until = None
+        if options['days'] is not None:
+            until = timezone.localdate() + datetime.timedelta(days=options['days'])
+        series = list(due_series(until))
+        created = materialize(series, until)
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {created} game(s) for {len(series)} series."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from scheduler.models import Game
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Game.participant_count and Game.comment_count from the "
+        "participant and comment tables and fix any rows that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report drifted games without fixing them.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = Game.objects.with_actual_counts().filter(
+                ~Q(participant_count=F('actual_participant_count')) |
+                ~Q(comment_count=F('actual_comment_count'))
+            )
+            if options['dry_run']:
+                for game in drifted.order_by('pk'):
+                    self.stdout.write(
+                        f"game {game.pk}: participants {game.participant_count} -> "
+                        f"{game.actual_participant_count}, comments "
+                        f"{game.comment_count} -> {game.actual_comment_count}")
+                return
+
+            repaired = Game.objects.filter(pk__in=drifted.values('pk')).sync_counts()
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} game(s)."))
@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from scheduler import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset: users, sports and games with "
+        "participants and comments, shaped like real use (see "
+        "scheduler/seeding.py). The same --seed gives the same data. Every "
+        "row is named after --prefix; --remove deletes them again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--games', type=int, default=150_000)
+        parser.add_argument('--participants', type=int, default=8,
+                            help="Average participants per game, capacity allowing.")
+        parser.add_argument('--comments', type=int, default=3,
+                            help="Average comments per game.")
+        parser.add_argument('--past-days', type=int, default=30,
+                            help="Games start up to this many days ago...")
+        parser.add_argument('--future-days', type=int, default=30,
+                            help="...and up to this many days ahead.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default=seeding.PREFIX)
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help="Games generated, and rows inserted, at a time.")
+        parser.add_argument('--replace', action='store_true',
+                            help="Remove an earlier dataset with this prefix first.")
+        parser.add_argument('--remove', action='store_true',
+                            help="Only remove the dataset with this prefix.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['remove'] or options['replace']:
+            seeding.unseed(prefix)
+            self.stdout.write(f"Removed the '{prefix}' dataset.")
+            if options['remove']:
+                return
+        elif get_user_model().objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"There is already a '{prefix}' dataset; "
+                               f"pass --replace, or another --prefix.")
+
+        started = time.perf_counter()
+        counts = seeding.seed(
+            users=options['users'], games=options['games'],
+            participants=options['participants'], comments=options['comments'],
+            prefix=prefix, seed=options['seed'], past_days=options['past_days'],
+            future_days=options['future_days'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        # Fresh statistics, or the planner still sees the tables as they were.
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        rows = sum(counts.values())
+        self.stdout.write(', '.join(f"{count} {table}" for table, count in counts.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)."))
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0006_game_capacity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['end_time', 'start_time'], name='game_end_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['sport', 'end_time', 'start_time'], name='game_sport_end_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['creator', 'end_time'], name='game_creator_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['start_time', 'id'], name='game_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['end_time', 'start_time'], name='game_open_end_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['game', 'user'], name='participant_game_user_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Game = apps.get_model('scheduler', 'Game')
+    Participant = apps.get_model('scheduler', 'Participant')
+    Comment = apps.get_model('scheduler', 'Comment')
+    participants = Participant.objects.filter(game=OuterRef('pk')) \
+        .order_by().values('game').annotate(n=Count('pk')).values('n')
+    comments = Comment.objects.filter(game=OuterRef('pk')) \
+        .order_by().values('game').annotate(n=Count('pk')).values('n')
+    Game.objects.update(
+        participant_count=Coalesce(Subquery(participants), 0),
+        comment_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0007_game_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0009_game_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['game', 'created', 'id'], name='comment_game_created_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_existing_users(apps, schema_editor):
+    from scheduler.search import user_tokens
+
+    User = apps.get_model('scheduler', 'CustomUser')
+    UserSearchToken = apps.get_model('scheduler', 'UserSearchToken')
+    batch = []
+    for user in User.objects.only('username', 'name', 'email').iterator(chunk_size=2000):
+        for token, weight in user_tokens(user.username, user.name, user.email).items():
+            batch.append(UserSearchToken(user_id=user.pk, token=token, weight=weight))
+        if len(batch) >= 5000:
+            UserSearchToken.objects.bulk_create(batch)
+            batch = []
+    UserSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0010_comment_game_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=254)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token'], name='user_search_token_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
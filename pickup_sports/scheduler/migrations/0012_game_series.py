@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0011_user_search_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='detached',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='occurrence_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GameSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('location', models.CharField(max_length=100)),
+                ('skill_level', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced'), ('all', 'All Levels')], default='all', max_length=20)),
+                ('capacity', models.PositiveIntegerField(blank=True, null=True)),
+                ('weekdays', models.PositiveSmallIntegerField()),
+                ('start_time', models.TimeField()),
+                ('duration', models.DurationField()),
+                ('timezone', models.CharField(default='UTC', max_length=64)),
+                ('starts_on', models.DateField()),
+                ('until', models.DateField(blank=True, null=True)),
+                ('materialized_until', models.DateField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_series', to=settings.AUTH_USER_MODEL)),
+                ('sport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='scheduler.sport')),
+            ],
+            options={
+                'verbose_name_plural': 'Game series',
+            },
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='scheduler.gameseries'),
+        ),
+        migrations.AddConstraint(
+            model_name='game',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence_date'), name='game_series_occurrence_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0012_game_series'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('status', 'open'), models.Q(('capacity__isnull', True), ('capacity', 0), ('participant_count__lt', models.F('capacity')), _connector='OR')), fields=['end_time', 'start_time'], name='game_open_space_end_start_idx'),
+        ),
+    ]
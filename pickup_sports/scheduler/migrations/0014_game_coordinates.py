@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0013_game_open_space_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gameseries',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gameseries',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['geohash'], name='game_geohash_idx'),
+        ),
+    ]
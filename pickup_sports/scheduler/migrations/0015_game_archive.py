@@ -0,0 +1,145 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:40
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+GAME_COLUMNS = (
+    "id, name, creator_id, location, latitude, longitude, start_time, end_time, "
+    "status, skill_level, sport_id, capacity, participant_count, comment_count, "
+    "series_id, occurrence_date, updated_at"
+)
+
+HISTORY_VIEWS = [
+    ('scheduler_game_history', GAME_COLUMNS,
+     'scheduler_game', 'scheduler_archivedgame'),
+    ('scheduler_participant_history', "id, user_id, game_id",
+     'scheduler_participant', 'scheduler_archivedparticipant'),
+    ('scheduler_comment_history', "id, game_id, author_id, text, created",
+     'scheduler_comment', 'scheduler_archivedcomment'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0014_game_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField()),
+                ('created', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'scheduler_comment_history',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='GameHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('location', models.CharField(max_length=100)),
+                ('latitude', models.FloatField(null=True)),
+                ('longitude', models.FloatField(null=True)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('status', models.CharField(max_length=20)),
+                ('skill_level', models.CharField(max_length=20)),
+                ('capacity', models.PositiveIntegerField(null=True)),
+                ('participant_count', models.PositiveIntegerField()),
+                ('comment_count', models.PositiveIntegerField()),
+                ('occurrence_date', models.DateField(null=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'scheduler_game_history',
+                'ordering': ['start_time'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ParticipantHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'db_table': 'scheduler_participant_history',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedGame',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('location', models.CharField(max_length=100)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('skill_level', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced'), ('all', 'All Levels')], max_length=20)),
+                ('capacity', models.PositiveIntegerField(blank=True, null=True)),
+                ('participant_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('occurrence_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_games', to=settings.AUTH_USER_MODEL)),
+                ('series', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_occurrences', to='scheduler.gameseries')),
+                ('sport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_games', to='scheduler.sport')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField()),
+                ('created', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='scheduler.archivedgame')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedParticipant',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participant_set', to='scheduler.archivedgame')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_participations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedgame',
+            index=models.Index(fields=['creator', 'end_time'], name='archgame_creator_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedgame',
+            index=models.Index(fields=['start_time', 'id'], name='archgame_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['game', 'created', 'id'], name='archcomment_game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedparticipant',
+            index=models.Index(fields=['user', 'game'], name='archpart_user_game_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedparticipant',
+            index=models.Index(fields=['game', 'user'], name='archpart_game_user_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f"CREATE VIEW {view} AS SELECT {columns} FROM {live} "
+            f"UNION ALL SELECT {columns} FROM {archive}",
+            f"DROP VIEW {view}",
+        )
+        for view, columns, live, archive in HISTORY_VIEWS
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import connections, models
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Coalesce, Now
+
+from . import geo
 
 
 #User Table
@@ -27,6 +30,115 @@ class Sport(models.Model):
         return self.name
 
 
+class GameQuerySet(models.QuerySet):
+    def with_related(self, comments=True):
+        """
+        Fetch everything GameSerializer touches up front, so listing games
+        costs a fixed number of queries regardless of how many rows come back.
+        Pass comments=False when the serializer leaves comments out.
+        """
+        prefetches = [
+            models.Prefetch(
+                'participant_set',
+                queryset=Participant.objects.select_related('user').order_by('id'),
+            ),
+        ]
+        if comments:
+            prefetches.append(models.Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related('author').order_by('created', 'id'),
+            ))
+        return self.select_related('creator', 'sport').prefetch_related(*prefetches)
+
+    def with_actual_counts(self):
+        """
+        Annotate the real participant and comment counts as correlated
+        subqueries, for checking the stored counters against.
+        """
+        return self.annotate(
+            actual_participant_count=_count_for_game(Participant),
+            actual_comment_count=_count_for_game(Comment),
+        )
+
+    def with_state(self, now):
+        """
+        Annotate ``state``, the value current_state() returns, computed by
+        the database against a single ``now``.
+        """
+        return self.annotate(state=models.Case(
+            models.When(status='cancelled', then=models.Value('cancelled')),
+            models.When(start_time__gt=now, then=models.Value('Open')),
+            models.When(end_time__gte=now, then=models.Value('In_progress')),
+            default=models.Value('Completed'),
+            output_field=models.CharField(),
+        ))
+
+    def in_states(self, states, now):
+        """
+        Games whose current_state() at ``now`` is one of ``states``. Uses
+        plain range conditions rather than the annotation, so the filter
+        can be answered from the (partial) start/end time indexes.
+        """
+        conditions = {
+            'cancelled': models.Q(status='cancelled'),
+            'Open': models.Q(status='open', start_time__gt=now),
+            'In_progress': models.Q(status='open', start_time__lte=now, end_time__gte=now),
+            'Completed': models.Q(status='open', end_time__lt=now),
+        }
+        condition = models.Q(pk__in=[])
+        for state in states:
+            condition |= conditions[state]
+        return self.filter(condition)
+
+    def with_space(self):
+        """
+        Games below capacity, going by the stored participant_count.
+        """
+        return self.filter(HAS_SPACE)
+
+    def near(self, lat, lng, radius_km):
+        """
+        Games within ``radius_km`` of (lat, lng), annotated with
+        ``distance_km``. See scheduler/geo.py for how the index is used.
+        """
+        min_lat, max_lat, min_lng, max_lng = geo.bounding_box(lat, lng, radius_km)
+        in_cells = geo.prefix_condition(geo.covering_cells(lat, lng, radius_km))
+        if connections[self.db].vendor == 'sqlite':
+            # SQLite would rather walk the start_time index to skip the
+            # sort than OR the cell ranges together; a subquery keeps it on
+            # the geohash index. (Postgres plans the plain filter better.)
+            in_cells = models.Q(pk__in=Game.objects.filter(in_cells).values('pk'))
+        games = self.filter(in_cells, latitude__gte=min_lat, latitude__lte=max_lat)
+        if min_lng is not None:
+            games = games.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+        return games.annotate(distance_km=geo.distance_km(lat, lng)) \
+            .filter(distance_km__lte=radius_km)
+
+    def sync_counts(self):
+        """
+        Overwrite the stored counters with the real counts in one UPDATE.
+        """
+        return self.update(
+            participant_count=_count_for_game(Participant),
+            comment_count=_count_for_game(Comment),
+        )
+
+
+# Matches join_game's capacity check; a blank or zero capacity is unlimited.
+HAS_SPACE = (
+    models.Q(capacity__isnull=True) | models.Q(capacity=0) |
+    models.Q(participant_count__lt=models.F('capacity'))
+)
+# Games another player could join right now.
+JOINABLE = models.Q(status='open') & HAS_SPACE
+
+
+def _count_for_game(model):
+    rows = model.objects.filter(game=models.OuterRef('pk')) \
+        .order_by().values('game').annotate(n=models.Count('pk')).values('n')
+    return Coalesce(models.Subquery(rows), 0)
+
+
 #game Table
 class Game(models.Model):
     STATUS_CHOICES = [
@@ -47,16 +159,35 @@ class Game(models.Model):
         help_text="Maximum number of participants; leave blank for unlimited"
     )
 
+    # Denormalized counters, kept in step by join_game, leave_game and
+    # game_comments, and on other deletes by scheduler/signals.py.
+    # manage.py repair_game_counts fixes any drift. Only those UPDATEs
+    # write them once the row exists; see save().
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    COUNTERS = ('participant_count', 'comment_count')
+
+    # Bumped on every save and whenever a participant or comment changes
+    # (see scheduler/signals.py); the validator behind ETag/Last-Modified.
+    updated_at = models.DateTimeField(auto_now=True)
+
     @property
     def is_full(self):
-        if self.capacity is None:
+        # Like HAS_SPACE, a blank or zero capacity means unlimited.
+        if not self.capacity:
             return False
-        return self.participants.count() >= self.capacity
+        return self.participant_count >= self.capacity
 
     name = models.CharField(max_length=200, blank=True)
     creator = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_games')
     location = models.CharField(max_length=100)
+    # Optional coordinates for "near me" search. geohash is derived from
+    # them on save (scheduler/signals.py) and indexed; see scheduler/geo.py.
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(
+        max_length=geo.GEOHASH_PRECISION, null=True, blank=True, editable=False)
 
     participants = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
@@ -73,11 +204,35 @@ class Game(models.Model):
     sport = models.ForeignKey(
         Sport, on_delete=models.CASCADE, related_name='games')
 
+    # Set on games materialized from a GameSeries. occurrence_date is the
+    # series date this row stands for, even if the game was moved since;
+    # detached games were edited on their own and series edits skip them.
+    series = models.ForeignKey(
+        'GameSeries', null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='occurrences')
+    occurrence_date = models.DateField(null=True, blank=True)
+    detached = models.BooleanField(default=False)
+
+    objects = GameQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.sport} at {self.location} on {self.start_time.strftime('%Y-%m-%d %H:%M')}"
 
-    def current_state(self):
-        now = timezone.now()
+    def save(self, *args, **kwargs):
+        # A full-row save would write back the counters as they were when
+        # this instance was loaded, undoing any join or comment since.
+        if not (self._state.adding or kwargs.get('force_insert')) \
+                and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTERS]
+        super().save(*args, **kwargs)
+
+    # Values of current_state() and of the ``state`` annotation
+    STATES = ('Open', 'In_progress', 'Completed', 'cancelled')
+
+    def current_state(self, now=None):
+        now = now or timezone.now()
         if self.status == "cancelled":
             if now < self.end_time:
                 return "cancelled"
@@ -94,6 +249,78 @@ class Game(models.Model):
     class Meta:
         verbose_name_plural = "Games"
         ordering = ['start_time']
+        indexes = [
+            # game_list: end_time >= now [AND start_time >= ...] ORDER BY start_time
+            models.Index(fields=['end_time', 'start_time'], name='game_end_start_idx'),
+            # game_list?sport_id=
+            models.Index(fields=['sport', 'end_time', 'start_time'], name='game_sport_end_start_idx'),
+            # my_archived_games: creator = me AND end_time <= now
+            models.Index(fields=['creator', 'end_time'], name='game_creator_end_idx'),
+            # keyset pagination order
+            models.Index(fields=['start_time', 'id'], name='game_start_id_idx'),
+            # game_list?near=: geohash cell ranges
+            models.Index(fields=['geohash'], name='game_geohash_idx'),
+            # upcoming games that are still open (not cancelled)
+            models.Index(
+                fields=['end_time', 'start_time'],
+                condition=models.Q(status='open'),
+                name='game_open_end_start_idx',
+            ),
+            # game_list?has_space=true: open games with room left
+            models.Index(
+                fields=['end_time', 'start_time'],
+                condition=JOINABLE,
+                name='game_open_space_end_start_idx',
+            ),
+        ]
+        constraints = [
+            # One row per series date, so materializing twice is a no-op.
+            models.UniqueConstraint(
+                fields=['series', 'occurrence_date'], name='game_series_occurrence_uniq'),
+        ]
+
+
+#game series Table
+class GameSeries(models.Model):
+    """
+    A recurring game: the same sport, place and time on some weekdays from
+    starts_on until an optional end date. scheduler/recurrence.py turns it
+    into concrete Game rows a rolling window ahead.
+    """
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='game_series')
+    sport = models.ForeignKey(
+        Sport, on_delete=models.CASCADE, related_name='series')
+    name = models.CharField(max_length=200, blank=True)
+    location = models.CharField(max_length=100)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    skill_level = models.CharField(
+        max_length=20, choices=Game.SKILL_LEVEL_CHOICES, default='all')
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+
+    # Bit n set means the game runs on weekday n (Monday = 0).
+    weekdays = models.PositiveSmallIntegerField()
+    # Local wall-clock start in ``timezone``, so games keep their time
+    # across daylight saving changes.
+    start_time = models.TimeField()
+    duration = models.DurationField()
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE)
+    starts_on = models.DateField()
+    until = models.DateField(null=True, blank=True)
+
+    # Occurrences exist up to and including this date.
+    materialized_until = models.DateField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sport} at {self.location} ({self.weekday_list()})"
+
+    def weekday_list(self):
+        return [day for day in range(7) if self.weekdays & (1 << day)]
+
+    class Meta:
+        verbose_name_plural = "Game series"
 
 
 #comment Table
@@ -108,6 +335,12 @@ class Comment(models.Model):
     def __str__(self):
         return f"{self.author.username} on {self.game.id}"
 
+    class Meta:
+        indexes = [
+            # game_comments: game = ? [AND id > ?] ORDER BY created, id
+            models.Index(fields=['game', 'created', 'id'], name='comment_game_created_idx'),
+        ]
+
 
 #Participant Table
 class Participant(models.Model):
@@ -126,3 +359,187 @@ class Participant(models.Model):
 
     class Meta:
         unique_together = ('user', 'game')
+        indexes = [
+            models.Index(fields=['game', 'user'], name='participant_game_user_idx'),
+        ]
+
+
+#user search token Table
+class UserSearchToken(models.Model):
+    """
+    Normalized words of a user's username, name and email, maintained by
+    scheduler/signals.py. user_list matches search terms against these by
+    indexed prefix lookups instead of scanning the users table.
+    """
+    USERNAME, NAME, EMAIL = 0, 1, 2
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    token = models.CharField(max_length=254)
+    # Which field the token came from; lower ranks higher.
+    weight = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.token} -> {self.user_id}"
+
+    class Meta:
+        indexes = [
+            # token LIKE 'prefix%' (the opclass only applies on Postgres)
+            models.Index(fields=['token'], name='user_search_token_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
+
+
+#archive Tables
+class ArchivedGame(models.Model):
+    """
+    A completed game moved out of the Game table by scheduler/archive.py,
+    keeping its id. Reads that cover history go through GameHistory.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200, blank=True)
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_games')
+    location = models.CharField(max_length=100)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Game.STATUS_CHOICES)
+    skill_level = models.CharField(max_length=20, choices=Game.SKILL_LEVEL_CHOICES)
+    sport = models.ForeignKey(
+        Sport, on_delete=models.CASCADE, related_name='archived_games')
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    participant_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    series = models.ForeignKey(
+        GameSeries, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='archived_occurrences')
+    occurrence_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField()
+    # A database default, since archive.py copies rows with INSERT ... SELECT.
+    archived_at = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.sport} at {self.location} on {self.start_time.strftime('%Y-%m-%d %H:%M')}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['creator', 'end_time'], name='archgame_creator_end_idx'),
+            models.Index(fields=['start_time', 'id'], name='archgame_start_id_idx'),
+        ]
+
+
+class ArchivedParticipant(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='archived_participations')
+    game = models.ForeignKey(
+        ArchivedGame, on_delete=models.CASCADE, related_name='participant_set')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'game'], name='archpart_user_game_idx'),
+            models.Index(fields=['game', 'user'], name='archpart_game_user_idx'),
+        ]
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    game = models.ForeignKey(
+        ArchivedGame, on_delete=models.CASCADE, related_name='comments')
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    text = models.TextField()
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['game', 'created', 'id'], name='archcomment_game_created_idx'),
+        ]
+
+
+# Live and archived rows together, as UNION ALL database views (created in
+# migration 0015; recreate them there when a copied column changes). Game
+# ids are kept on archiving, so a game is in exactly one of the two.
+# Read-only: write to Game and friends.
+class GameHistoryQuerySet(models.QuerySet):
+    with_state = GameQuerySet.with_state
+
+    def with_related(self, comments=True):
+        """
+        GameQuerySet.with_related, for history rows.
+        """
+        prefetches = [
+            models.Prefetch(
+                'participant_set',
+                queryset=ParticipantHistory.objects.select_related('user').order_by('id'),
+            ),
+        ]
+        if comments:
+            prefetches.append(models.Prefetch(
+                'comments',
+                queryset=CommentHistory.objects.select_related('author').order_by('created', 'id'),
+            ))
+        return self.select_related('creator', 'sport').prefetch_related(*prefetches)
+
+
+class GameHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+')
+    location = models.CharField(max_length=100)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    status = models.CharField(max_length=20)
+    skill_level = models.CharField(max_length=20)
+    sport = models.ForeignKey(Sport, on_delete=models.DO_NOTHING, related_name='+')
+    capacity = models.PositiveIntegerField(null=True)
+    participant_count = models.PositiveIntegerField()
+    comment_count = models.PositiveIntegerField()
+    series = models.ForeignKey(
+        GameSeries, null=True, on_delete=models.DO_NOTHING, related_name='+')
+    occurrence_date = models.DateField(null=True)
+    updated_at = models.DateTimeField()
+
+    objects = GameHistoryQuerySet.as_manager()
+
+    current_state = Game.current_state
+
+    class Meta:
+        managed = False
+        db_table = 'scheduler_game_history'
+        ordering = ['start_time']
+
+
+class ParticipantHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+')
+    game = models.ForeignKey(
+        GameHistory, on_delete=models.DO_NOTHING, related_name='participant_set')
+
+    class Meta:
+        managed = False
+        db_table = 'scheduler_participant_history'
+
+
+class CommentHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    game = models.ForeignKey(
+        GameHistory, on_delete=models.DO_NOTHING, related_name='comments')
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+')
+    text = models.TextField()
+    created = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'scheduler_comment_history'
@@ -0,0 +1,148 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class GameCursorPagination:
+    """
+    Keyset pagination over games ordered by (start_time, id).
+
+    Each page is fetched with a range condition on the last row seen rather
+    than an OFFSET, so page 500 costs the same as page 1. Cursors are opaque
+    to the client.
+
+    Pagination is opt-in: a request without ``cursor`` or ``page_size`` gets
+    ``None`` back from ``paginate_queryset`` and the view returns the plain
+    list, which is what existing clients expect.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'GAME_PAGE_SIZE', 20)
+        self.max_page_size = getattr(settings, 'GAME_PAGE_SIZE_MAX', 100)
+
+    def paginate_queryset(self, queryset, request):
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        paginate_queryset() for the async read views.
+        """
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page([game async for game in queryset])
+
+    def page_queryset(self, queryset, request):
+        """
+        The page's rows, plus one to tell whether there is another page, or
+        None when the request isn't paginated.
+        """
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = cursor
+
+        if reverse:
+            queryset = queryset.order_by('-start_time', '-id')
+            if position is not None:
+                start_time, pk = position
+                queryset = queryset.filter(
+                    Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=pk))
+        else:
+            queryset = queryset.order_by('start_time', 'id')
+            if position is not None:
+                start_time, pk = position
+                queryset = queryset.filter(
+                    Q(start_time__gt=start_time) | Q(start_time=start_time, id__gt=pk))
+
+        self.reverse, self.position = reverse, position
+        # Fetch one extra row to find out whether there is a further page.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, self.position is not None
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            start_time = parse_datetime(payload['t'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if start_time is None:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, (start_time, pk)
+
+    def encode_cursor(self, game, reverse):
+        payload = {'t': game.start_time.isoformat(), 'i': game.pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,278 @@
+"""
+Recurring game series.
+
+A GameSeries describes a weekly pattern; the games players actually see and
+join are ordinary Game rows, materialized up to
+settings.SERIES_MATERIALIZE_DAYS ahead (manage.py materialize_series keeps
+the window rolling). Materializing is set-based: the new rows for every due
+series go in through bulk_create and the series' progress through one
+bulk_update, so a year of occurrences for hundreds of series is a few
+batched statements rather than a save per game. The (series,
+occurrence_date) constraint makes re-running it harmless.
+
+Edits and cancellations apply to one occurrence, to an occurrence and the
+ones after it (which splits the series in two), or to every upcoming
+occurrence. Occurrences are updated with set-based UPDATEs, which skip
+model signals, so the cache versions and change events that the signals
+would have produced are issued here, once per affected game. Newly
+materialized games only bump the game list version; they are weeks out and
+nobody is watching them yet.
+"""
+import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .geo import geohash_for
+from .models import Game, GameSeries
+from .signals import touched_on_commit
+
+ONE, FOLLOWING, ALL = 'one', 'following', 'all'
+SCOPES = (ONE, FOLLOWING, ALL)
+
+# Series fields copied onto their occurrences as they are.
+PLAIN_FIELDS = ('name', 'location', 'latitude', 'longitude', 'skill_level', 'capacity',
+                'sport_id')
+# Series fields that decide which dates and times occurrences have.
+TIMING_FIELDS = ('weekdays', 'start_time', 'duration', 'timezone', 'starts_on', 'until')
+
+
+def window_end(today=None):
+    days = getattr(settings, 'SERIES_MATERIALIZE_DAYS', 56)
+    return (today or timezone.localdate()) + datetime.timedelta(days=days)
+
+
+def runs_on(series, day):
+    return (series.starts_on <= day and (series.until is None or day <= series.until)
+            and series.weekdays & (1 << day.weekday()))
+
+
+def occurrence_dates(series, first, last):
+    """
+    Dates between ``first`` and ``last`` (inclusive) that the series runs on.
+    """
+    day = max(first, series.starts_on)
+    if series.until is not None:
+        last = min(last, series.until)
+    while day <= last:
+        if runs_on(series, day):
+            yield day
+        day += datetime.timedelta(days=1)
+
+
+def occurrence_times(series, day):
+    """
+    Aware (start, end) datetimes of the series' game on ``day``.
+    """
+    start = datetime.datetime.combine(day, series.start_time, tzinfo=ZoneInfo(series.timezone))
+    return start, start + series.duration
+
+
+def build_occurrence(series, day):
+    start, end = occurrence_times(series, day)
+    return Game(
+        series=series, occurrence_date=day, creator_id=series.creator_id,
+        sport_id=series.sport_id, name=series.name, location=series.location,
+        latitude=series.latitude, longitude=series.longitude,
+        geohash=geohash_for(series.latitude, series.longitude),
+        skill_level=series.skill_level, capacity=series.capacity,
+        start_time=start, end_time=end,
+    )
+
+
+def materialize(series_list, until=None, today=None):
+    """
+    Create the missing occurrences of ``series_list`` up to ``until``
+    (default: the rolling window). Returns the number of games built.
+    """
+    today = today or timezone.localdate()
+    until = until or window_end(today)
+    games, advanced = [], []
+    for series in series_list:
+        first = today
+        if series.materialized_until is not None:
+            first = max(first, series.materialized_until + datetime.timedelta(days=1))
+        games.extend(build_occurrence(series, day) for day in occurrence_dates(series, first, until))
+        if series.materialized_until is None or series.materialized_until < until:
+            series.materialized_until = until
+            advanced.append(series)
+
+    with transaction.atomic():
+        Game.objects.bulk_create(games, batch_size=1000, ignore_conflicts=True)
+        GameSeries.objects.bulk_update(advanced, ['materialized_until'], batch_size=1000)
+        if games:
+            bump_on_commit('games')
+    return len(games)
+
+
+def due_series(until=None):
+    """
+    Series whose materialized window ends before ``until`` and that still
+    have dates left to produce.
+    """
+    until = until or window_end()
+    return GameSeries.objects.filter(
+        Q(materialized_until__isnull=True) | Q(materialized_until__lt=until),
+        Q(until__isnull=True) | Q(materialized_until__isnull=True) |
+        Q(until__gt=F('materialized_until')),
+    )
+
+
+def create_series(**fields):
+    with transaction.atomic():
+        series = GameSeries.objects.create(**fields)
+        materialize([series])
+    return series
+
+
+def _apply_to_occurrences(series, occurrences, changed, since):
+    """
+    Copy the ``changed`` series fields onto ``occurrences`` (a queryset of
+    its games) and fill in dates from ``since`` that a new weekday pattern
+    adds.
+    """
+    plain = {name: getattr(series, name) for name in PLAIN_FIELDS if name in changed}
+    timing = any(name in changed for name in TIMING_FIELDS)
+    if not plain and not timing:
+        return
+
+    now = timezone.now()
+    occurrences = occurrences.filter(detached=False).order_by()
+    ids = list(occurrences.values_list('pk', flat=True))
+    if 'latitude' in plain or 'longitude' in plain:
+        plain.update(latitude=series.latitude, longitude=series.longitude,
+                     geohash=geohash_for(series.latitude, series.longitude))
+    if plain and ids:
+        Game.objects.filter(pk__in=ids).update(updated_at=now, **plain)
+
+    if timing:
+        moved, dropped = [], []
+        for game in Game.objects.filter(pk__in=ids).only('pk', 'occurrence_date'):
+            if runs_on(series, game.occurrence_date):
+                game.start_time, game.end_time = occurrence_times(series, game.occurrence_date)
+                game.updated_at = now
+                moved.append(game)
+            else:
+                dropped.append(game.pk)
+        Game.objects.bulk_update(moved, ['start_time', 'end_time', 'updated_at'], batch_size=1000)
+        # Games on dates the series no longer runs are cancelled rather
+        # than deleted, so anyone who joined can see what happened.
+        Game.objects.filter(pk__in=dropped).update(status='cancelled', updated_at=now)
+        if series.materialized_until is not None:
+            Game.objects.bulk_create(
+                [build_occurrence(series, day) for day in occurrence_dates(
+                    series, max(since, timezone.localdate()), series.materialized_until)],
+                batch_size=1000, ignore_conflicts=True,
+            )
+            bump_on_commit('games')
+    touched_on_commit(ids)
+
+
+def _set_fields(instance, changes):
+    """
+    Set the ``changes`` that differ on ``instance``; return their names.
+    """
+    changed = []
+    for name, value in changes.items():
+        if name == 'sport':
+            name, value = 'sport_id', value.pk
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def update_series(series, changes, scope=ALL, occurrence=None):
+    """
+    Apply ``changes`` (validated series fields) to one occurrence, to
+    ``occurrence`` and the ones after it, or to every upcoming occurrence.
+    Returns the series that now holds the edited occurrences.
+    """
+    with transaction.atomic():
+        if scope == ONE:
+            _set_fields(occurrence, {
+                name: value for name, value in changes.items()
+                if name in PLAIN_FIELDS or name == 'sport'})
+            if any(name in changes for name in ('start_time', 'duration', 'timezone')):
+                moved = GameSeries(**{
+                    name: changes.get(name, getattr(series, name))
+                    for name in ('start_time', 'duration', 'timezone')})
+                occurrence.start_time, occurrence.end_time = occurrence_times(
+                    moved, occurrence.occurrence_date)
+            occurrence.detached = True
+            occurrence.save()
+            return series
+
+        if scope == FOLLOWING:
+            # The later half of a split series starts at the split.
+            changes = {name: value for name, value in changes.items() if name != 'starts_on'}
+        changed = _set_fields(series, changes)
+        if not changed:
+            return series
+
+        if scope == FOLLOWING and series.occurrences.filter(
+                occurrence_date__lt=occurrence.occurrence_date).exists():
+            series = _split(series, occurrence.occurrence_date)
+            _set_fields(series, changes)
+            series.save()
+            _apply_to_occurrences(series, series.occurrences.all(), changed, series.starts_on)
+            return series
+
+        series.save()
+        if scope == FOLLOWING:
+            since = occurrence.occurrence_date
+            occurrences = series.occurrences.filter(occurrence_date__gte=since)
+        else:
+            since = timezone.localdate()
+            occurrences = series.occurrences.filter(start_time__gte=timezone.now())
+        _apply_to_occurrences(series, occurrences, changed, since)
+        return series
+
+
+def _split(series, day):
+    """
+    End ``series`` the day before ``day`` and move its occurrences from
+    ``day`` on to a copy (of its stored row) starting on ``day``.
+    """
+    tail = GameSeries.objects.get(pk=series.pk)
+    tail.pk = None
+    tail._state.adding = True
+    tail.starts_on = day
+    tail.save()
+
+    series.until = day - datetime.timedelta(days=1)
+    series.save(update_fields=['until'])
+    series.occurrences.filter(occurrence_date__gte=day).update(series=tail)
+    return tail
+
+
+def cancel_series(series, scope=ALL, occurrence=None):
+    """
+    Cancel one occurrence, an occurrence and the ones after it, or every
+    upcoming occurrence; the series stops producing games past that point.
+    Returns the number of games cancelled.
+    """
+    with transaction.atomic():
+        if scope == ONE:
+            occurrence.status = 'cancelled'
+            occurrence.save()
+            return 1
+
+        if scope == FOLLOWING:
+            last = occurrence.occurrence_date - datetime.timedelta(days=1)
+            cancelled = series.occurrences.filter(occurrence_date__gt=last)
+        else:
+            last = timezone.localdate() - datetime.timedelta(days=1)
+            cancelled = series.occurrences.filter(start_time__gte=timezone.now())
+        if series.until is None or series.until > last:
+            series.until = last
+            series.save(update_fields=['until'])
+
+        ids = list(cancelled.exclude(status='cancelled').order_by().values_list('pk', flat=True))
+        Game.objects.filter(pk__in=ids).update(status='cancelled', updated_at=timezone.now())
+        touched_on_commit(ids)
+        return len(ids)
@@ -0,0 +1,131 @@
+"""
+Per-user schedules: the games a user created or joined.
+
+Both sources are read with their own index (games by creator, participants
+by user) and combined with UNION, which also removes the duplicate when a
+user is on both sides. This avoids the OR across a Participant join plus
+DISTINCT over whole game rows.
+
+Past games may have been archived (scheduler/archive.py), so anything that
+reaches into the past reads GameHistory and ParticipantHistory, which
+cover both the live and the archive tables.
+"""
+import base64
+import heapq
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Game, GameHistory, Participant, ParticipantHistory
+
+UPCOMING, PAST = 'upcoming', 'past'
+
+
+def user_game_ids(user_id, history=False):
+    """
+    Subquery of the ids of every game ``user_id`` created or joined,
+    including archived ones with ``history``.
+    """
+    games, participants = (GameHistory, ParticipantHistory) if history else (Game, Participant)
+    created = games.objects.filter(creator_id=user_id).order_by().values('id')
+    joined = participants.objects.filter(user_id=user_id).order_by().values('game_id')
+    return created.union(joined)
+
+
+def conflicting_games(user_id, start_time, end_time, exclude=None):
+    """
+    The user's open games (created or joined) whose time overlaps
+    [start_time, end_time). Games that merely touch (one ends as the
+    other starts) don't conflict. One query: each side of the union is a
+    range scan on its own per-user index.
+    """
+    created = Game.objects.filter(
+        creator_id=user_id, end_time__gt=start_time, start_time__lt=end_time,
+    ).order_by().values('id')
+    joined = Participant.objects.filter(
+        user_id=user_id, game__end_time__gt=start_time, game__start_time__lt=end_time,
+    ).order_by().values('game_id')
+    games = Game.objects.filter(pk__in=created.union(joined)).exclude(status='cancelled')
+    if exclude is not None:
+        games = games.exclude(pk=exclude)
+    return games
+
+
+def find_overlaps(intervals):
+    """
+    Yield (a, b, overlap_start, overlap_end) for every pair of overlapping
+    (key, start, end) intervals, a having started first.
+
+    Sort-and-sweep: intervals are visited in start order while a heap
+    holds the ones still running, keyed by end. Each interval is only
+    compared with those it actually overlaps, so the cost is
+    O(n log n + number of overlaps) rather than O(n^2).
+    """
+    running = []
+    for key, start, end in sorted(intervals, key=lambda i: (i[1], i[2])):
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        for other_end, other_key in sorted(running):
+            yield other_key, key, start, min(end, other_end)
+        heapq.heappush(running, (end, key))
+
+
+def encode_cursor(start_time, pk):
+    payload = json.dumps({'t': start_time.isoformat(), 'i': pk})
+    return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Return (start_time, pk) for a cursor, or raise ValueError.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        start_time = parse_datetime(payload['t'])
+        pk = int(payload['i'])
+    except (TypeError, KeyError, UnicodeEncodeError) as exc:
+        raise ValueError(str(exc))
+    if start_time is None:
+        raise ValueError("bad timestamp")
+    return start_time, pk
+
+
+def schedule_page(user_id, when, now, limit, position=None):
+    """
+    Return ([game ids], next cursor or None) for one page of a user's
+    upcoming games (soonest first) or past games (most recent first).
+    ``position`` is a decoded cursor to continue after.
+    """
+    if when == UPCOMING:
+        games, participants = Game, Participant
+    else:
+        games, participants = GameHistory, ParticipantHistory
+    created = games.objects.filter(creator_id=user_id).order_by()
+    joined = participants.objects.filter(user_id=user_id).order_by()
+
+    if when == UPCOMING:
+        created = created.filter(end_time__gte=now)
+        joined = joined.filter(game__end_time__gte=now)
+        after, order = 'gt', ('start_time', 'id')
+    else:
+        created = created.filter(end_time__lt=now)
+        joined = joined.filter(game__end_time__lt=now)
+        after, order = 'lt', ('-start_time', '-id')
+
+    if position is not None:
+        start_time, pk = position
+        created = created.filter(
+            Q(**{f'start_time__{after}': start_time}) |
+            Q(start_time=start_time, **{f'id__{after}': pk}))
+        joined = joined.filter(
+            Q(**{f'game__start_time__{after}': start_time}) |
+            Q(game__start_time=start_time, **{f'game_id__{after}': pk}))
+
+    rows = list(
+        created.values_list('start_time', 'id')
+        .union(joined.values_list('game__start_time', 'game_id'))
+        .order_by(*order)[:limit + 1]
+    )
+    next_cursor = encode_cursor(*rows[limit - 1]) if len(rows) > limit else None
+    return [pk for _, pk in rows[:limit]], next_cursor
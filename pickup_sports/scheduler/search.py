@@ -0,0 +1,71 @@
+"""
+People search for user_list.
+
+Each user is indexed as a handful of lowercase word tokens (see
+UserSearchToken). A query matches a user when every one of its terms is a
+prefix of one of the user's tokens; results are ranked by the best match
+of the first term: exact before prefix, username before name before email.
+"""
+import re
+
+from django.db.models import Case, F, Min, When
+
+from .models import UserSearchToken
+
+SPLIT_WORDS = re.compile(r'[\s._\-+@]+')
+
+
+def user_tokens(username, name, email):
+    """
+    Return {token: weight} for a user's searchable fields.
+    """
+    tokens = {}
+
+    def add(text, weight):
+        text = text.strip().lower()[:254]
+        if text and weight < tokens.get(text, weight + 1):
+            tokens[text] = weight
+
+    for word in [username or ''] + SPLIT_WORDS.split(username or ''):
+        add(word, UserSearchToken.USERNAME)
+    for word in SPLIT_WORDS.split(name or ''):
+        add(word, UserSearchToken.NAME)
+    add(email or '', UserSearchToken.EMAIL)
+    return tokens
+
+
+def index_user(user):
+    """
+    Replace a user's search tokens with ones built from their current fields.
+    """
+    UserSearchToken.objects.filter(user=user).delete()
+    UserSearchToken.objects.bulk_create(
+        UserSearchToken(user=user, token=token, weight=weight)
+        for token, weight in user_tokens(user.username, user.name, user.email).items()
+    )
+
+
+def search_users(queryset, query, limit):
+    """
+    Return up to ``limit`` users from ``queryset`` matching ``query``, best
+    match first.
+    """
+    terms = [t for t in query.lower().split() if t]
+    if not terms:
+        return []
+    first, rest = terms[0], terms[1:]
+
+    matches = UserSearchToken.objects.filter(token__startswith=first)
+    for term in rest:
+        matches = matches.filter(user__in=UserSearchToken.objects
+                                 .filter(token__startswith=term).values('user'))
+    ranked = matches.values('user').annotate(
+        rank=Min(Case(
+            When(token=first, then=F('weight') * 2),
+            default=F('weight') * 2 + 1,
+        ))
+    ).order_by('rank', 'user')[:limit]
+    order = [row['user'] for row in ranked]
+
+    users = queryset.filter(pk__in=order).in_bulk()
+    return [users[pk] for pk in order if pk in users]
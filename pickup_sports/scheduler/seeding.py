@@ -0,0 +1,372 @@
+"""
+Synthetic users, sports, games, participants and comments for benchmarks.
+
+seed() bulk-inserts a dataset shaped like real use: a few sports get most
+of the games, a few users create most of them, games start in the evening
+on weekdays and during the day on weekends, and rosters fill a varying
+share of each game's capacity, some all of it. The same ``seed`` gives the
+same dataset.
+
+Every user and sport is named after ``prefix`` and every game belongs to
+them, so unseed() can find and remove the whole dataset again.
+
+Rows are inserted without the model signals, so seed() fills in what
+they would have: geohashes, participant and comment counts and the user
+search index. On Postgres they go in with COPY (see insert()); a million
+participants, with their 150,000 games, take under a minute. Run it as
+``manage.py seed``.
+"""
+import io
+import random
+from bisect import bisect
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import geo
+from .archive import delete_rows
+from .cache import bump_on_commit
+from .models import (
+    ArchivedComment, ArchivedGame, ArchivedParticipant, Comment, Game, GameSeries,
+    Participant, Sport, UserSearchToken,
+)
+from .search import user_tokens
+
+PREFIX = "seed"
+
+# (sport, share of games)
+SPORTS = [
+    ("Soccer", 30), ("Basketball", 25), ("Volleyball", 12), ("Tennis", 10),
+    ("Ultimate Frisbee", 6), ("Pickleball", 6), ("Softball", 4), ("Badminton", 3),
+    ("Flag Football", 2), ("Hockey", 2),
+]
+# ((latitude, longitude), share of games); games scatter ~10 km around.
+CITIES = [
+    ((40.7128, -74.0060), 5), ((34.0522, -118.2437), 3),
+    ((41.8781, -87.6298), 2), ((47.6062, -122.3321), 1),
+]
+# Share of games without coordinates.
+NO_COORDINATES = 0.2
+# {hour: share of games starting then}
+WEEKDAY_HOURS = {6: 1, 7: 2, 12: 2, 17: 5, 18: 8, 19: 8, 20: 5, 21: 2}
+WEEKEND_HOURS = {8: 2, 9: 4, 10: 6, 11: 6, 12: 4, 13: 4, 14: 4, 15: 3, 16: 3, 17: 2, 18: 2}
+# (minutes, share)
+DURATIONS = [(60, 3), (90, 4), (120, 3), (180, 1)]
+# (capacity, share); None is uncapped.
+CAPACITIES = [(None, 2), (4, 1), (6, 2), (10, 4), (12, 3), (14, 2), (22, 2)]
+SKILL_LEVELS = [('all', 5), ('beginner', 2), ('intermediate', 3), ('advanced', 1)]
+CANCELLED = 0.05
+
+FIRST_NAMES = [
+    "Ada", "Ben", "Cleo", "Dev", "Eli", "Fay", "Gus", "Hana", "Ivan", "Jo",
+    "Kay", "Lena", "Milo", "Nia", "Omar", "Pia", "Quinn", "Rosa", "Sam", "Tara",
+]
+LAST_NAMES = [
+    "Adams", "Baker", "Chen", "Diaz", "Evans", "Fox", "Garcia", "Hill", "Ito", "Jones",
+    "Khan", "Lopez", "Moore", "Nguyen", "Okafor", "Park", "Reyes", "Smith", "Tan", "Wu",
+]
+PLACES = ["Park", "Field", "Courts", "Rec Center", "Gym", "Pier", "Commons", "Green"]
+COMMENTS = [
+    "See you there!", "Bringing an extra ball.", "Running 10 minutes late.",
+    "Anyone need a ride?", "Is it still on if it rains?", "Great game last time.",
+    "I can bring pinnies.", "Where exactly do we meet?",
+]
+
+
+def weighted(rng, choices):
+    """
+    A function that picks from [(value, weight), ...] with ``rng``.
+    """
+    values = [value for value, _ in choices]
+    cum_weights = list(accumulate(weight for _, weight in choices))
+    total = cum_weights[-1]
+    return lambda: values[bisect(cum_weights, rng.random() * total)]
+
+
+def skewed(rng, items, exponent=1.0):
+    """
+    A function that picks from ``items``, the i-th 1/(i+1)**exponent as often
+    as the first.
+    """
+    return weighted(rng, [(item, 1 / (i + 1) ** exponent) for i, item in enumerate(items)])
+
+
+class Generator:
+    """
+    Draws games, rosters and comment threads from the distributions above.
+    """
+
+    def __init__(self, rng, sports, user_ids, now, past_days, future_days):
+        self.rng = rng
+        self.user_ids = user_ids
+        self.now = now
+        self.days = (-past_days, future_days)
+        self.names = {pk: name for pk, (name, _) in zip(sports, SPORTS)}
+        self.sport = weighted(rng, [(pk, share) for pk, (_, share) in zip(sports, SPORTS)])
+        self.creator = skewed(rng, user_ids, exponent=0.8)
+        self.city = weighted(rng, CITIES)
+        self.weekday_hour = weighted(rng, list(WEEKDAY_HOURS.items()))
+        self.weekend_hour = weighted(rng, list(WEEKEND_HOURS.items()))
+        self.duration = weighted(rng, DURATIONS)
+        self.capacity = weighted(rng, CAPACITIES)
+        self.skill_level = weighted(rng, SKILL_LEVELS)
+
+    def game(self, number):
+        """
+        A Game row, as {attname: value}.
+        """
+        rng = self.rng
+        day = (self.now + timedelta(days=rng.randint(*self.days))).date()
+        hour = self.weekend_hour() if day.weekday() >= 5 else self.weekday_hour()
+        start = timezone.make_aware(
+            datetime.combine(day, time(hour, rng.choice([0, 0, 15, 30, 30, 45]))))
+        sport = self.sport()
+        if rng.random() < NO_COORDINATES:
+            latitude = longitude = geohash = None
+        else:
+            lat, lng = self.city()
+            latitude, longitude = lat + rng.uniform(-0.09, 0.09), lng + rng.uniform(-0.12, 0.12)
+            geohash = geo.geohash_for(latitude, longitude)
+        return {
+            'name': f"{self.names[sport]} #{number}", 'creator_id': self.creator(),
+            'sport_id': sport, 'location': f"{rng.choice(LAST_NAMES)} {rng.choice(PLACES)}",
+            'latitude': latitude, 'longitude': longitude, 'geohash': geohash,
+            'start_time': start, 'end_time': start + timedelta(minutes=self.duration()),
+            'capacity': self.capacity(), 'skill_level': self.skill_level(),
+            'status': 'cancelled' if rng.random() < CANCELLED else 'open',
+        }
+
+    def roster(self, game, mean):
+        """
+        Participant ids for ``game``: ``mean`` on average, never over
+        capacity and never the creator.
+        """
+        size = round(self.rng.gammavariate(2, mean / 2)) if mean else 0
+        size = min(size, game['capacity'] or size, len(self.user_ids) - 1)
+        members = self.rng.sample(self.user_ids, size + 1)
+        if game['creator_id'] in members:
+            members.remove(game['creator_id'])
+        return members[:size]
+
+    def thread(self, game, members, mean):
+        """
+        [(author id, text), ...] for ``game``, by its creator and participants.
+        """
+        count = round(self.rng.expovariate(1 / mean)) if mean else 0
+        authors = [game['creator_id'], *members]
+        return [(self.rng.choice(authors), self.rng.choice(COMMENTS)) for _ in range(count)]
+
+
+def reserve_ids(model, count):
+    """
+    Take ``count`` ids from the sequence behind ``model``'s primary key
+    (Postgres only).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [connection.ops.quote_name(model._meta.db_table), model._meta.pk.column, count])
+        return [pk for pk, in cursor.fetchall()]
+
+
+def copy_text(value):
+    """
+    ``value`` in COPY's text format.
+    """
+    if type(value) is int:
+        return str(value)
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return (value.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def defaults(model, now):
+    """
+    {attname: value} for the columns a seeded row leaves out.
+    """
+    values = {}
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            values[field.attname] = now
+        else:
+            values[field.attname] = field.get_default()
+    return values
+
+
+def copy(model, fields, rows, fill):
+    """
+    COPY ``rows`` ({attname: value}) into ``model``'s table.
+    """
+    names = [f.attname for f in fields]
+    data = ''.join(
+        '\t'.join(copy_text(row[name] if name in row else fill[name]) for name in names) + '\n'
+        for row in rows)
+    quote = connection.ops.quote_name
+    sql = (f"COPY {quote(model._meta.db_table)} "
+           f"({', '.join(quote(f.column) for f in fields)}) FROM STDIN")
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy'):   # psycopg 3
+            with raw.copy(sql) as stream:
+                stream.write(data)
+        else:   # psycopg2
+            raw.copy_expert(sql, io.StringIO(data))
+
+
+def insert(model, rows, batch_size, ids=False):
+    """
+    Insert ``rows``, dicts of {attname: value}, into ``model``'s table,
+    ``batch_size`` per statement. Columns a row leaves out get the field's
+    default, or the current time for auto_now(_add) fields. With ``ids``,
+    returns the new rows' primary keys in order.
+
+    On Postgres the rows go in with COPY, straight from the dicts, without
+    the model instances and per-field conversions of bulk_create; that is
+    several times faster. Primary keys then come from reserve_ids().
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    if connection.vendor != 'postgresql':
+        objs = model.objects.bulk_create((model(**row) for row in rows), batch_size=batch_size)
+        return [obj.pk for obj in objs] if ids else []
+
+    fields = model._meta.concrete_fields
+    if ids:
+        pks = reserve_ids(model, len(rows))
+        for row, pk in zip(rows, pks):
+            row[model._meta.pk.attname] = pk
+    else:
+        fields = [f for f in fields if not f.primary_key]
+    fill = defaults(model, timezone.now())
+    for start in range(0, len(rows), batch_size):
+        copy(model, fields, rows[start:start + batch_size], fill)
+    return pks if ids else []
+
+
+def skip_foreign_key_checks():
+    """
+    Turn off foreign key checks for the rest of the transaction, if the
+    database allows it. seed() builds every reference from ids it has just
+    inserted, so checking them, one deferred trigger per reference at
+    commit, is wasted work: about 40% of a large load on Postgres. As with
+    pg_restore --disable-triggers, that takes a superuser; for anyone else
+    the checks stay on.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL session_replication_role = replica")
+    except DatabaseError:
+        pass
+
+
+def seed(users=1000, games=10000, participants=8, comments=3, prefix=PREFIX,
+         seed=0, past_days=30, future_days=30, batch_size=10000, now=None):
+    """
+    Insert ``users`` users, the sports in SPORTS and ``games`` games with on
+    average ``participants`` participants (capacity allowing) and
+    ``comments`` comments each, starting between ``past_days`` ago and
+    ``future_days`` from now. Games are generated and inserted
+    ``batch_size`` at a time, with their participants and comments.
+    Returns {table: rows inserted}.
+    """
+    User = get_user_model()
+    rng = random.Random(seed)
+    counts = {}
+
+    with transaction.atomic():
+        skip_foreign_key_checks()
+        sports = insert(Sport, ({'name': f"{prefix}-{name}"} for name, _ in SPORTS),
+                        batch_size, ids=True)
+        counts['sports'] = len(sports)
+
+        people = []
+        for i in range(users):
+            people.append({'username': f"{prefix}-{i}", 'email': f"{prefix}-{i}@example.com",
+                           'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                           'password': '!'})
+        user_ids = insert(User, people, batch_size, ids=True)
+        counts['users'] = len(user_ids)
+        insert(UserSearchToken,
+               ({'user_id': pk, 'token': token, 'weight': weight}
+                for pk, user in zip(user_ids, people)
+                for token, weight in user_tokens(
+                    user['username'], user['name'], user['email']).items()),
+               batch_size)
+
+        generate = Generator(rng, sports, user_ids, now or timezone.now(),
+                             past_days, future_days)
+        insert(User.favorite_sports.through,
+               ({'customuser_id': pk, 'sport_id': sport}
+                for pk in user_ids
+                for sport in {generate.sport() for _ in range(rng.randint(1, 3))}),
+               batch_size)
+
+        counts.update(games=0, participants=0, comments=0)
+        for start in range(0, games, batch_size):
+            batch = [generate.game(start + i) for i in range(min(batch_size, games - start))]
+            rosters = [generate.roster(game, participants) for game in batch]
+            threads = [generate.thread(game, members, comments)
+                       for game, members in zip(batch, rosters)]
+            for game, members, texts in zip(batch, rosters, threads):
+                game['participant_count'] = len(members)
+                game['comment_count'] = len(texts)
+            game_ids = insert(Game, batch, batch_size, ids=True)
+            insert(Participant,
+                   ({'game_id': pk, 'user_id': user}
+                    for pk, members in zip(game_ids, rosters) for user in members),
+                   batch_size)
+            insert(Comment,
+                   ({'game_id': pk, 'author_id': author, 'text': text}
+                    for pk, texts in zip(game_ids, threads) for author, text in texts),
+                   batch_size)
+            counts['games'] += len(batch)
+            counts['participants'] += sum(len(members) for members in rosters)
+            counts['comments'] += sum(len(texts) for texts in threads)
+        bump_on_commit('games', 'users', 'sports')
+    return counts
+
+
+def unseed(prefix=PREFIX):
+    """
+    Delete everything seed() inserted under ``prefix``, along with what
+    those users did since: their tokens, series, games, comments and
+    participations, archived or not.
+    """
+    User = get_user_model()
+    users = User.objects.filter(username__startswith=f"{prefix}-")
+    sports = Sport.objects.filter(name__startswith=f"{prefix}-")
+    games = Game.objects.filter(Q(creator__in=users) | Q(sport__in=sports))
+    archived = ArchivedGame.objects.filter(Q(creator__in=users) | Q(sport__in=sports))
+    with transaction.atomic():
+        # Plain DELETEs, as in archive.py: the per-row receivers would
+        # publish an event and bump a cache version for every row.
+        for queryset in [
+            Comment.objects.filter(Q(game__in=games) | Q(author__in=users)),
+            Participant.objects.filter(Q(game__in=games) | Q(user__in=users)),
+            ArchivedComment.objects.filter(Q(game__in=archived) | Q(author__in=users)),
+            ArchivedParticipant.objects.filter(Q(game__in=archived) | Q(user__in=users)),
+            games, archived,
+            GameSeries.objects.filter(Q(creator__in=users) | Q(sport__in=sports)),
+            Token.objects.filter(user__in=users),
+            UserSearchToken.objects.filter(user__in=users),
+            User.favorite_sports.through.objects.filter(
+                Q(customuser__in=users) | Q(sport__in=sports)),
+            users, sports,
+        ]:
+            delete_rows(queryset)
+        bump_on_commit('games', 'users', 'sports')
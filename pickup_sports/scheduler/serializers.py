@@ -1,23 +1,27 @@
 from rest_framework import serializers
-from .models import CustomUser, Sport, Game, Participant, Comment
+import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .models import CustomUser, Sport, Game, GameSeries, Participant, Comment
+from .timing import TimedSerializerMixin
 from django.conf import settings
 
 # Serializer for CustomUser
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'name', 'email']
         read_only_fields = ['id']
 
 # Serializer for Sport
-class SportSerializer(serializers.ModelSerializer):
+class SportSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Sport
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 # Serializer for updating user profiles
-class CustomUserProfileUpdateSerializer(serializers.ModelSerializer):
+class CustomUserProfileUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     favorite_sports = serializers.PrimaryKeyRelatedField(
         queryset=Sport.objects.all(),
         many=True,
@@ -31,7 +35,7 @@ class CustomUserProfileUpdateSerializer(serializers.ModelSerializer):
 
 
 # Serializer for User Profile
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     favorite_sports = SportSerializer(many=True, read_only=True)
 
     class Meta:
@@ -40,7 +44,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
 
 # Serializer for Participant (junction table)
-class ParticipantSerializer(serializers.ModelSerializer):
+class ParticipantSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = CustomUserSerializer(read_only=True) 
 
     class Meta:
@@ -50,7 +54,7 @@ class ParticipantSerializer(serializers.ModelSerializer):
 
 
 # serializer for comments section
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
     author_name     = serializers.ReadOnlyField(source='author.name')
 
@@ -60,8 +64,30 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author_username', 'created']
         
 
+# Range checks for the optional latitude/longitude fields
+COORDINATE_KWARGS = {
+    'latitude': {'min_value': -90, 'max_value': 90},
+    'longitude': {'min_value': -180, 'max_value': 180},
+}
+
+
+def validate_coordinates(attrs, instance):
+    lat = attrs.get('latitude', getattr(instance, 'latitude', None))
+    lng = attrs.get('longitude', getattr(instance, 'longitude', None))
+    if (lat is None) != (lng is None):
+        raise serializers.ValidationError(
+            {'latitude': "Give both latitude and longitude, or neither."})
+
+
+def game_state(game):
+    # List and detail views annotate the state in the database (see
+    # GameQuerySet.with_state); other callers fall back to the model method.
+    state = getattr(game, 'state', None)
+    return state if state is not None else game.current_state()
+
+
 # Serializer for Game
-class GameSerializer(serializers.ModelSerializer):
+class GameSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     creator = CustomUserSerializer(read_only=True)
     sport    = SportSerializer(read_only=True)
     participants = ParticipantSerializer(source='participant_set', many=True, read_only=True)
@@ -83,6 +109,8 @@ class GameSerializer(serializers.ModelSerializer):
             'name',             
             'creator',
             'location',
+            'latitude',
+            'longitude',
             'participants',
             'start_time',
             'end_time',
@@ -93,9 +121,152 @@ class GameSerializer(serializers.ModelSerializer):
             'current_state',  
             'comments',
             'capacity',
+            'participant_count',
+            'comment_count',
+            'series',
+            'occurrence_date',
+        ]
+        read_only_fields = ['id', 'creator', 'participants', 'sport', 'current_state','comments',
+                            'participant_count', 'comment_count', 'series', 'occurrence_date']
+        extra_kwargs = COORDINATE_KWARGS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('include_comments', True):
+            self.fields.pop('comments')
+
+    def get_current_state(self, obj):
+        return game_state(obj)
+
+    def validate(self, attrs):
+        validate_coordinates(attrs, self.instance)
+        return attrs
+
+
+
+# Lightweight serializer for game list views: counts instead of nested rows.
+class GameSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    creator = CustomUserSerializer(read_only=True)
+    sport = SportSerializer(read_only=True)
+    current_state = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Game
+        fields = [
+            'id',
+            'name',
+            'creator',
+            'location',
+            'latitude',
+            'longitude',
+            'start_time',
+            'end_time',
+            'status',
+            'skill_level',
+            'sport',
+            'current_state',
+            'capacity',
+            'participant_count',
+            'comment_count',
+            'series',
+            'occurrence_date',
         ]
-        read_only_fields = ['id', 'creator', 'participants', 'sport', 'current_state','comments']
+        read_only_fields = fields
 
     def get_current_state(self, obj):
-        return obj.current_state()
+        return game_state(obj)
+
+
+# Serializers for the bulk participants endpoint
+class BulkParticipantOperationSerializer(serializers.Serializer):
+    game = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=['add', 'remove'])
+    users = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=500)
+
+
+class BulkParticipantsSerializer(serializers.Serializer):
+    operations = BulkParticipantOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if sum(len(op['users']) for op in operations) > 1000:
+            raise serializers.ValidationError("At most 1000 changes per request.")
+        return operations
+
+
+# Weekdays as a list of numbers (Monday = 0), stored as a bitmask
+class WeekdaysField(serializers.Field):
+    default_error_messages = {
+        'invalid': 'Expected a non-empty list of weekdays from 0 (Monday) to 6 (Sunday).',
+    }
+
+    def to_representation(self, value):
+        return [day for day in range(7) if value & (1 << day)]
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            self.fail('invalid')
+        mask = 0
+        for day in data:
+            if isinstance(day, bool) or not isinstance(day, int) or not 0 <= day <= 6:
+                self.fail('invalid')
+            mask |= 1 << day
+        return mask
+
+
+# Serializer for GameSeries
+class GameSeriesSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    creator = CustomUserSerializer(read_only=True)
+    sport = SportSerializer(read_only=True)
+    sport_id = serializers.PrimaryKeyRelatedField(
+        queryset=Sport.objects.all(), source='sport', write_only=True
+    )
+    weekdays = WeekdaysField()
+    capacity = serializers.IntegerField(
+      min_value=1, allow_null=True, required=False,
+      error_messages={'min_value': 'Capacity must be at least 1.'}
+    )
+
+    class Meta:
+        model = GameSeries
+        fields = [
+            'id',
+            'name',
+            'creator',
+            'sport',
+            'sport_id',
+            'location',
+            'latitude',
+            'longitude',
+            'skill_level',
+            'capacity',
+            'weekdays',
+            'start_time',
+            'duration',
+            'timezone',
+            'starts_on',
+            'until',
+            'materialized_until',
+        ]
+        read_only_fields = ['id', 'creator', 'sport', 'materialized_until']
+        extra_kwargs = COORDINATE_KWARGS
+
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Unknown time zone.")
+        return value
+
+    def validate_duration(self, value):
+        if not datetime.timedelta(0) < value <= datetime.timedelta(days=1):
+            raise serializers.ValidationError("Duration must be between 0 and 24 hours.")
+        return value
 
+    def validate(self, attrs):
+        starts_on = attrs.get('starts_on', getattr(self.instance, 'starts_on', None))
+        until = attrs.get('until', getattr(self.instance, 'until', None))
+        if starts_on and until and until < starts_on:
+            raise serializers.ValidationError({'until': "Must not be before starts_on."})
+        validate_coordinates(attrs, self.instance)
+        return attrs
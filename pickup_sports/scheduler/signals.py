@@ -0,0 +1,172 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_token_on_commit, forget_user_on_commit
+from .cache import bump_on_commit
+from .events import publish_game_event
+from .geo import geohash_for
+from .models import (ArchivedComment, ArchivedGame, ArchivedParticipant, Comment, CustomUser,
+                     Game, Participant, Sport)
+from .search import index_user
+from .timing import install_query_timer
+
+# Event type published for each (model, signal) pair; 'created' saves get
+# their own name.
+EVENT_TYPES = {
+    (Game, 'created'): 'game.created',
+    (Game, post_save): 'game.updated',
+    (Game, post_delete): 'game.deleted',
+    (Participant, 'created'): 'participant.joined',
+    (Participant, post_delete): 'participant.left',
+    (Comment, 'created'): 'comment.created',
+    (Comment, post_delete): 'comment.deleted',
+}
+
+
+# The Game counter each child model is counted in.
+COUNTERS = {
+    Participant: 'participant_count',
+    Comment: 'comment_count',
+}
+
+_local = threading.local()
+
+
+@contextmanager
+def bulk_participant_changes():
+    """
+    Silence the per-row Participant and Comment receivers inside the block.
+    Bulk writers use this and do the per-game bookkeeping (updated_at,
+    cache versions, events) once per game themselves.
+    """
+    _local.muted = getattr(_local, 'muted', 0) + 1
+    try:
+        yield
+    finally:
+        _local.muted -= 1
+
+
+def publish_on_commit(sender, signal, created, game_id):
+    event_type = EVENT_TYPES.get((sender, 'created' if created else signal))
+    if event_type is not None:
+        transaction.on_commit(lambda: publish_game_event(event_type, game_id))
+
+
+def touched_on_commit(game_ids, event_type='game.updated'):
+    """
+    Do what the Game signals would have done for rows changed in bulk, or
+    by a muted writer: bump their cache versions and publish ``event_type``
+    once the transaction commits.
+    """
+    if not game_ids:
+        return
+    bump_on_commit('games', *(f'game:{pk}' for pk in game_ids))
+    transaction.on_commit(
+        lambda: [publish_game_event(event_type, pk) for pk in game_ids])
+
+
+@receiver(pre_save, sender=Game)
+def game_located(sender, instance, **kwargs):
+    instance.geohash = geohash_for(instance.latitude, instance.longitude)
+
+
+@receiver([post_save, post_delete], sender=Game)
+def game_changed(sender, instance, signal, created=False, **kwargs):
+    bump_on_commit('games', f'game:{instance.pk}')
+    publish_on_commit(sender, signal, created, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Participant)
+@receiver([post_save, post_delete], sender=Comment)
+def game_child_changed(sender, instance, signal, created=False, origin=None, **kwargs):
+    if getattr(_local, 'muted', 0):
+        return
+    bump_on_commit('games', f'game:{instance.game_id}')
+    # Nothing to touch or announce when the game itself is being deleted;
+    # its own game.deleted event covers it.
+    if isinstance(origin, Game) or getattr(origin, 'model', None) is Game:
+        return
+    changes = {'updated_at': timezone.now()}
+    if signal is post_delete:
+        # The views keep the counters themselves (muted); this covers other
+        # deletes, such as the cascade from deleting a user.
+        counter = COUNTERS[sender]
+        changes[counter] = Case(When(**{f'{counter}__gt': 0}, then=F(counter) - 1),
+                                default=F(counter), output_field=PositiveIntegerField())
+    Game.objects.filter(pk=instance.game_id).update(**changes)
+    publish_on_commit(sender, signal, created, instance.game_id)
+
+
+@receiver([post_save, post_delete], sender=Sport)
+def sport_changed(sender, instance, signal, created=False, **kwargs):
+    # Games embed their sport's name; game_detail is cached under 'sports'
+    # too, and its validators follow updated_at.
+    bump_on_commit('sports', 'games')
+    if signal is post_save and not created:
+        now = timezone.now()
+        Game.objects.filter(sport=instance).update(updated_at=now)
+        ArchivedGame.objects.filter(sport=instance).update(updated_at=now)
+
+
+def touch_games_showing(user_id):
+    """
+    Move updated_at on every game, live or archived, that shows the user
+    as its creator, a participant or a comment author, so the games'
+    ETag and Last-Modified change with the user's name and email.
+    """
+    now = timezone.now()
+    for games, participants, comments in (
+            (Game.objects, Participant.objects, Comment.objects),
+            (ArchivedGame.objects, ArchivedParticipant.objects, ArchivedComment.objects)):
+        games.filter(
+            Q(creator_id=user_id)
+            | Q(pk__in=participants.filter(user_id=user_id).values('game_id'))
+            | Q(pk__in=comments.filter(author_id=user_id).values('game_id'))
+        ).update(updated_at=now)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, signal, created=False, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no cached response shows.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_on_commit('users', f'user:{instance.pk}')
+    # Covers deactivation, which must end the user's cached token too.
+    forget_user_on_commit(instance.pk)
+    if signal is post_save:
+        if not created:
+            touch_games_showing(instance.pk)
+        index_user(instance)
+
+
+@receiver(m2m_changed, sender=CustomUser.favorite_sports.through)
+def favorite_sports_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # A sport's favorite_users changed.
+        user_ids = pk_set or ()
+    else:
+        user_ids = [instance.pk]
+    bump_on_commit('users', *(f'user:{pk}' for pk in user_ids))
+
+
+@receiver([post_save, post_delete], sender=Token)
+def token_changed(sender, instance, **kwargs):
+    # Cached CAS logins hold the user's token key (see scheduler/cas.py).
+    bump_on_commit(f'user:{instance.user_id}')
+    forget_token_on_commit(instance.key)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
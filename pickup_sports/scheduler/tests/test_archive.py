@@ -0,0 +1,156 @@
+# scheduler/tests/test_archive.py
+
+import json
+from datetime import timedelta
+from io import StringIO
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import views
+from ..archive import archive_games
+from ..feed import skill_profile
+from ..models import (ArchivedComment, ArchivedGame, ArchivedParticipant, Comment, Game,
+                      GameHistory, Participant, Sport)
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    """
+    Tests for moving finished games to the archive tables.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.host = User.objects.create_user(
+            username="host", email="host@example.com", password="pw")
+        self.player = User.objects.create_user(
+            username="player", email="player@example.com", password="pw")
+        self.sport = Sport.objects.create(name="Tennis")
+        now = timezone.now()
+
+        def game(days, name):
+            start = now + timedelta(days=days)
+            game = Game.objects.create(
+                name=name, creator=self.host, sport=self.sport, location="Courts",
+                start_time=start, end_time=start + timedelta(hours=1))
+            Participant.objects.create(game=game, user=self.player)
+            Comment.objects.create(game=game, author=self.player, text=f"on {name}")
+            return game
+
+        self.old = [game(-90, "old"), game(-60, "older")]
+        self.recent = game(-2, "recent")
+        self.upcoming = game(3, "upcoming")
+        Game.objects.sync_counts()
+
+    def snapshot(self):
+        """
+        What the history endpoints show.
+        """
+        self.client.force_authenticate(self.host)
+        data = {
+            'archived': self.client.get(reverse('my_archived_games')).data,
+            'user_games': self.client.get(
+                reverse('user-games', kwargs={'user_id': self.player.pk})).data,
+            'schedule': self.client.get(
+                reverse('user-schedule'), {'user_ids': self.player.pk}).data,
+            'detail': self.client.get(
+                reverse('game_detail', kwargs={'pk': self.old[0].pk})).data,
+            'comments': self.client.get(
+                reverse('game-comments', kwargs={'game_pk': self.old[0].pk})).data,
+            'page': self.client.get(reverse('my_archived_games'), {'page_size': 1}).data,
+        }
+        self.client.force_authenticate(None)
+        return data
+
+    def test_moves_old_games_with_their_rows(self):
+        self.assertEqual(archive_games(batch_size=1), 2)
+        old_ids = {g.pk for g in self.old}
+        self.assertEqual(set(Game.objects.values_list('pk', flat=True)),
+                         {self.recent.pk, self.upcoming.pk})
+        self.assertEqual(set(ArchivedGame.objects.values_list('pk', flat=True)), old_ids)
+        self.assertEqual(
+            set(ArchivedParticipant.objects.values_list('game_id', 'user_id')),
+            {(pk, self.player.pk) for pk in old_ids})
+        self.assertEqual(ArchivedComment.objects.filter(game_id__in=old_ids).count(), 2)
+        self.assertFalse(Participant.objects.filter(game_id__in=old_ids).exists())
+        self.assertFalse(Comment.objects.filter(game_id__in=old_ids).exists())
+        self.assertEqual(archive_games(), 0)
+
+    def test_history_reads_look_the_same(self):
+        before = self.snapshot()
+        call_command('archive_games', stdout=StringIO())
+        self.assertEqual(ArchivedGame.objects.count(), 2)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual([g['name'] for g in before['archived']], ["old", "older", "recent"])
+        self.assertEqual(before['detail']['participants'][0]['user']['id'], self.player.pk)
+        self.assertEqual(before['detail']['comments'][0]['text'], "on old")
+
+    def test_archived_games_answer_conditional_gets(self):
+        urls = [reverse('game_detail', kwargs={'pk': self.old[0].pk}),
+                reverse('game-comments', kwargs={'game_pk': self.old[0].pk})]
+        before = [self.client.get(url)['ETag'] for url in urls]
+        archive_games()
+        factory = AsyncRequestFactory()
+        async_views = [(views.agame_detail, {'pk': self.old[0].pk}),
+                       (views.agame_comments, {'game_pk': self.old[0].pk})]
+        for url, etag, (view, kwargs) in zip(urls, before, async_views):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['ETag'], etag)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            response = async_to_sync(view)(
+                factory.get(url, headers={'If-None-Match': etag}), **kwargs)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = async_to_sync(views.agame_comments)(
+            factory.get(urls[1]), game_pk=self.old[0].pk)
+        self.assertEqual([c['text'] for c in json.loads(response.content)], ["on old"])
+
+    def test_skills_and_past_conflicts_cover_the_archive(self):
+        clash = Game.objects.create(
+            name="clash", creator=self.host, sport=self.sport, location="Courts",
+            start_time=self.old[0].start_time, end_time=self.old[0].end_time,
+            skill_level='advanced')
+        Participant.objects.create(game=clash, user=self.player)
+        skills = skill_profile(self.player.pk)
+        archive_games()
+        self.assertTrue(ArchivedGame.objects.filter(pk=clash.pk).exists())
+        np.testing.assert_array_equal(skill_profile(self.player.pk), skills)
+
+        self.client.force_authenticate(self.player)
+        response = self.client.get(reverse('profile_conflicts'), {'include_past': 'true'})
+        self.assertEqual([sorted(c['games']) for c in response.data['conflicts']],
+                         [sorted([self.old[0].pk, clash.pk])])
+        self.assertEqual({g['id'] for g in response.data['games']}, {self.old[0].pk, clash.pk})
+        response = self.client.get(reverse('profile_conflicts'))
+        self.assertEqual(response.data['conflicts'], [])
+
+    def test_history_query_budget(self):
+        archive_games()
+        self.assertEqual(GameHistory.objects.count(), 4)
+        self.client.force_authenticate(self.host)
+        # games, participants and comments, from both tables at once
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('my_archived_games'))
+        self.assertEqual(len(response.data), 3)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_upcoming_list_reads_the_live_table_only(self):
+        archive_games()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('game_list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([g['name'] for g in response.data], ["upcoming"])
+        self.assertFalse(any('archived' in q['sql'] or '_history' in q['sql']
+                             for q in ctx.captured_queries))
@@ -0,0 +1,124 @@
+# scheduler/tests/test_async_views.py
+
+import json
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .. import views
+from ..authentication import token_cache
+from ..models import Comment, Game, Participant, Sport
+
+User = get_user_model()
+
+
+class AsyncReadViewTests(TestCase):
+    """
+    The async read views must answer exactly as the DRF views they stand
+    in for under ASGI.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+        self.host = User.objects.create_user(
+            username="kay", email="kay@example.com", password="pw", name="Kay")
+        self.player = User.objects.create_user(
+            username="jo", email="jo@example.com", password="pw")
+        self.soccer = Sport.objects.create(name="Soccer")
+        self.host.favorite_sports.add(self.soccer)
+        start = timezone.now() + timedelta(days=1)
+        self.games = []
+        for i in range(3):
+            game = Game.objects.create(
+                name=f"game {i}", creator=self.host, sport=self.soccer, location="Field",
+                start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 2),
+                capacity=10)
+            Participant.objects.create(game=game, user=self.player)
+            Comment.objects.create(game=game, author=self.player, text=f"on game {i}")
+            self.games.append(game)
+
+    def call(self, view, url, kwargs=None, headers=None):
+        request = self.factory.get(url, headers=headers)
+        return async_to_sync(view)(request, **(kwargs or {}))
+
+    def assertSameAnswer(self, view, name, kwargs=None, query=''):
+        url = reverse(name, kwargs=kwargs) + query
+        expected = self.client.get(url)
+        response = self.call(view, url, kwargs)
+        self.assertEqual(response.status_code, expected.status_code, url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), json.loads(expected.content), url)
+        return response
+
+    def test_answers_match_the_drf_views(self):
+        game = self.games[0].pk
+        cases = [
+            (views.agame_list, 'game_list', None, ''),
+            (views.agame_list, 'game_list', None, '?view=summary&state=Open'),
+            (views.agame_list, 'game_list', None, '?include_comments=false&page_size=2'),
+            (views.agame_list, 'game_list', None, '?view=bogus'),
+            (views.agame_detail, 'game_detail', {'pk': game}, ''),
+            (views.agame_detail, 'game_detail', {'pk': 0}, ''),
+            (views.agame_comments, 'game-comments', {'game_pk': game}, '?limit=1'),
+            (views.agame_comments, 'game-comments', {'game_pk': game}, '?after=x'),
+            (views.agame_comments, 'game-comments', {'game_pk': 0}, ''),
+            (views.asport_list, 'sport_list', None, ''),
+            (views.apublic_profile, 'public_profile', {'id': self.host.pk}, ''),
+            (views.apublic_profile, 'public_profile', {'id': 0}, ''),
+        ]
+        for view, name, kwargs, query in cases:
+            with self.subTest(name=name, kwargs=kwargs, query=query):
+                self.assertSameAnswer(view, name, kwargs, query)
+
+    def test_pages_follow_the_cursor(self):
+        url = reverse('game_list') + '?view=summary&page_size=2'
+        first = json.loads(self.call(views.agame_list, url).content)
+        self.assertEqual([g['name'] for g in first['results']], ["game 0", "game 1"])
+        second = json.loads(self.call(views.agame_list, first['next']).content)
+        self.assertEqual([g['name'] for g in second['results']], ["game 2"])
+
+    def test_conditional_get(self):
+        kwargs = {'pk': self.games[0].pk}
+        url = reverse('game_detail', kwargs=kwargs)
+        response = self.call(views.agame_detail, url, kwargs)
+        self.assertEqual(response['ETag'], self.client.get(url)['ETag'])
+        response = self.call(views.agame_detail, url, kwargs,
+                             headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tokens(self):
+        token = Token.objects.create(user=self.player)
+        url = reverse('sport_list')
+        response = self.call(views.asport_list, url,
+                             headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.call(views.asport_list, url, headers={'Authorization': 'Token nope'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_everything_else_goes_to_the_drf_view(self):
+        # The browsable API and DRF errors...
+        response = self.call(views.asport_list, reverse('sport_list'),
+                             headers={'Accept': 'text/html'})
+        self.assertEqual(response.accepted_renderer.format, 'api')
+        response = self.call(views.agame_list, reverse('game_list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, {'detail': 'Invalid cursor'})
+
+        # ...and writes.
+        token = Token.objects.create(user=self.player)
+        kwargs = {'game_pk': self.games[0].pk}
+        request = self.factory.post(
+            reverse('game-comments', kwargs=kwargs), {'text': "see you there"},
+            content_type='application/json', headers={'Authorization': f'Token {token.key}'})
+        response = async_to_sync(views.agame_comments)(request, **kwargs)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.filter(game=self.games[0]).count(), 2)
@@ -0,0 +1,128 @@
+# scheduler/tests/test_authentication.py
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..authentication import LRUCache, token_cache
+from ..cas import login_user
+
+User = get_user_model()
+
+
+class LRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = LRUCache(2, 10, clock=lambda: self.now)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+        self.assertEqual((stats['hits'], stats['misses']), (3, 1))
+        self.assertEqual(stats['hit_rate'], 0.75)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.now = 9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_discard_where(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.discard_where(lambda value: value == 2)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='ada', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('profile_detail'))
+        token_queries = [q['sql'] for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+        return response, token_queries
+
+    def test_repeat_requests_skip_the_token_lookup(self):
+        response, token_queries = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+        response, token_queries = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.user.pk)
+        self.assertEqual(token_queries, [])
+
+    def test_deleted_token_is_forgotten(self):
+        self.profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        response, _ = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_refused(self):
+        self.profile()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response, _ = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_is_refused(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(days=31))
+        response, _ = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(response.data['detail']), 'Token has expired.')
+
+    def test_rotate(self):
+        self.profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('token_rotate'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_key = response.data['token']
+        self.assertNotEqual(new_key, self.token.key)
+        self.assertIsNotNone(response.data['expires'])
+
+        response, _ = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new_key}')
+        response, _ = self.profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_stats_are_staff_only(self):
+        response = self.client.get(reverse('token_cache_stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        token_cache.clear()
+        response = self.client.get(reverse('token_cache_stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['size'], 1)
+
+    def test_cas_login_replaces_an_expired_token(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(days=31))
+        _, key, created = login_user('ada')
+        self.assertFalse(created)
+        self.assertNotEqual(key, self.token.key)
+        self.assertEqual(Token.objects.get(user=self.user).key, key)
@@ -0,0 +1,149 @@
+# scheduler/tests/test_cache.py
+
+import shutil
+import tempfile
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from .. import views
+from ..cache import acache_response, get_versions, response_key
+from ..models import Sport, Game
+
+User = get_user_model()
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'scheduler-tests',
+}}
+
+
+@override_settings(CACHES=LOCMEM)
+class ResponseCacheTests(TestCase):
+    """
+    Tests for the cached read endpoints and their invalidation.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.host = User.objects.create_user(
+            username="host", email="host@example.com", password="pw")
+        self.player = User.objects.create_user(
+            username="player", email="player@example.com", password="pw")
+        self.sport = Sport.objects.create(name="Frisbee")
+        self.game = Game.objects.create(
+            name="Ultimate",
+            creator=self.host,
+            sport=self.sport,
+            location="Old Campus",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+
+    def assertCachedIdentical(self, url, queries=0):
+        miss = self.client.get(url)
+        with self.assertNumQueries(queries):
+            hit = self.client.get(url)
+        self.assertEqual(hit.status_code, status.HTTP_200_OK)
+        self.assertEqual(hit.content, miss.content)
+        return hit
+
+    def test_hits_are_byte_identical(self):
+        self.assertCachedIdentical(reverse('game_list'))
+        self.assertCachedIdentical(reverse('game_list') + '?view=summary&page_size=1')
+        # Game-scoped endpoints still look up the ETag validator.
+        self.assertCachedIdentical(reverse('game_detail', kwargs={'pk': self.game.pk}), 1)
+        self.assertCachedIdentical(reverse('game-comments', kwargs={'game_pk': self.game.pk}), 1)
+        self.assertCachedIdentical(reverse('sport_list'))
+
+    def test_query_params_are_part_of_the_key(self):
+        other = Sport.objects.create(name="Chess")
+        url = reverse('game_list')
+        self.assertEqual(len(self.client.get(url).data), 1)
+        self.assertEqual(len(self.client.get(f"{url}?sport_id={other.pk}").data), 0)
+
+    def test_join_and_comment_invalidate(self):
+        detail_url = reverse('game_detail', kwargs={'pk': self.game.pk})
+        comments_url = reverse('game-comments', kwargs={'game_pk': self.game.pk})
+        self.assertEqual(self.client.get(detail_url).data['participants'], [])
+        self.assertEqual(self.client.get(comments_url).data, [])
+
+        self.client.force_authenticate(self.player)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('join_game', kwargs={'pk': self.game.pk}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(comments_url, {"text": "in"}, format="json")
+        self.client.force_authenticate(None)
+
+        self.assertEqual(len(self.client.get(detail_url).data['participants']), 1)
+        self.assertEqual(len(self.client.get(comments_url).data), 1)
+        self.assertEqual(self.client.get(reverse('game_list')).data[0]['comment_count'], 1)
+
+    def test_sport_change_invalidates(self):
+        url = reverse('sport_list')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Sport.objects.create(name="Squash")
+        self.assertEqual(len(self.client.get(url).data), 2)
+
+    def test_sport_rename_reaches_game_detail(self):
+        url = reverse('game_detail', kwargs={'pk': self.game.pk})
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sport.name = "Futsal"
+            self.sport.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sport']['name'], "Futsal")
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_sync_and_async_views_store_the_same_entries(self):
+        url = reverse('sport_list')
+        request = AsyncRequestFactory().get(url)
+        self.client.get(url)
+        async_to_sync(views.asport_list)(request)
+        versions = get_versions(['sports'])
+        entry = cache.get(response_key('sport_list', request, versions))
+        self.assertEqual(entry[0], self.client.get(url).content)
+        self.assertEqual(cache.get(response_key('asport_list', request, versions)), entry)
+        # The browsable API is rendered afresh, not served from the entry.
+        html = self.client.get(url, HTTP_ACCEPT='text/html')
+        self.assertEqual(html['Content-Type'], 'text/html; charset=utf-8')
+
+    def test_async_views_cache_gets_only(self):
+        calls = []
+
+        @acache_response('sports')
+        async def view(request):
+            calls.append(request.method)
+            return HttpResponse(b'{}', content_type='application/json')
+
+        factory = AsyncRequestFactory()
+        for request in (factory.get('/'), factory.get('/'), factory.post('/'), factory.head('/')):
+            response = async_to_sync(view)(request)
+            self.assertEqual(response.content, b'{}')
+        self.assertEqual(calls, ['GET', 'POST', 'HEAD'])
+
+    def test_file_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }}
+        with self.settings(CACHES=caches):
+            url = reverse('game_detail', kwargs={'pk': self.game.pk})
+            self.assertCachedIdentical(url, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.game.status = 'cancelled'
+                self.game.save()
+            self.assertEqual(self.client.get(url).data['status'], 'cancelled')
@@ -0,0 +1,182 @@
+# scheduler/tests/test_cas.py
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cas import CASUnavailable, CircuitBreaker
+from .test_cache import LOCMEM
+
+User = get_user_model()
+
+SUCCESS = """<cas:serviceResponse xmlns:cas="http://www.yale.edu/tp/cas">
+  <cas:authenticationSuccess><cas:user>{}</cas:user></cas:authenticationSuccess>
+</cas:serviceResponse>"""
+FAILURE = """<cas:serviceResponse xmlns:cas="http://www.yale.edu/tp/cas">
+  <cas:authenticationFailure code="INVALID_TICKET">Ticket not recognized</cas:authenticationFailure>
+</cas:serviceResponse>"""
+
+
+class StubCASHandler(BaseHTTPRequestHandler):
+    """
+    /serviceValidate for tickets named after what they do: ST-user-<name>
+    succeeds for <name>, ST-slow sleeps past the read timeout, ST-error
+    answers 500, anything else is rejected.
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, Nagle's
+    # algorithm stalls every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        ticket = parse_qs(urlparse(self.path).query).get('ticket', [''])[0]
+        self.server.requests.append(ticket)
+        self.server.clients.add(self.client_address)
+        if ticket == 'ST-slow':
+            time.sleep(0.5)
+        if ticket == 'ST-error':
+            code, body = 500, 'oops'
+        elif ticket.startswith('ST-user-'):
+            code, body = 200, SUCCESS.format(ticket[len('ST-user-'):])
+        else:
+            code, body = 200, FAILURE
+        payload = body.encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except BrokenPipeError:
+            pass  # the client gave up on ST-slow
+
+    def log_message(self, *args):
+        pass
+
+
+class CASLoginTests(TestCase):
+    """
+    Tests for /cas-login/ against a local stub CAS server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubCASHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = override_settings(
+            CAS_BASE_URL=f"http://127.0.0.1:{cls.server.server_port}",
+            CAS_READ_TIMEOUT=0.2, CAS_BREAKER_FAILURES=2, CAS_BREAKER_RESET=30,
+            CACHES=LOCMEM,
+        )
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.requests = []
+        self.server.clients = set()
+        # A fresh client (pool and breaker) per test.
+        self.enterContext(override_settings(CAS_POOL_SIZE=10))
+
+    def login(self, ticket):
+        return self.client.get(reverse('cas_login'), {'ticket': ticket})
+
+    def test_redirects_to_cas_without_a_ticket(self):
+        response = self.client.get(reverse('cas_login'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/login?service=", response['Location'])
+
+    def test_first_and_repeat_logins(self):
+        response = self.login('ST-user-ada')
+        self.assertEqual(response.status_code, 302)
+        user = User.objects.get(username='ada')
+        token = user.auth_token.key
+        self.assertEqual(response['Location'], f"http://localhost:3000/profile/setup?token={token}")
+        self.assertEqual(self.client.session['_auth_user_id'], str(user.pk))
+
+        user.name, user.email = "Ada", "ada@example.com"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.login('ST-user-ada')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login('ST-user-ada')
+        self.assertEqual(response['Location'], f"http://localhost:3000/games?token={token}")
+        # The cached user and token: neither table is read.
+        self.assertFalse(any('FROM "users"' in q['sql'] or 'authtoken_token' in q['sql']
+                             for q in ctx.captured_queries), ctx.captured_queries)
+        # One pooled connection served every validation.
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_token_change_refreshes_the_cache(self):
+        self.login('ST-user-ada')
+        user = User.objects.get(username='ada')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.auth_token.delete()
+        response = self.login('ST-user-ada')
+        self.assertIn(f"token={User.objects.get(pk=user.pk).auth_token.key}", response['Location'])
+
+    def test_rejected_ticket(self):
+        for _ in range(3):
+            self.assertEqual(self.login('ST-forged').status_code, 401)
+        # Rejections are answers, not failures: the breaker stays closed.
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_breaker_fails_fast_while_cas_is_down(self):
+        self.assertEqual(self.login('ST-slow').status_code, 500)
+        self.assertEqual(self.login('ST-error').status_code, 500)
+        started = time.monotonic()
+        response = self.login('ST-user-ada')
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(self.server.requests, ['ST-slow', 'ST-error'])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.breaker = CircuitBreaker(2, 10, clock=lambda: self.now)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.failed()
+        self.breaker.succeeded()
+        self.breaker.failed()
+        self.breaker.before_call()
+        self.breaker.failed()
+        with self.assertRaises(CASUnavailable) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 10)
+
+    def test_half_open_trial(self):
+        self.breaker.failed()
+        self.breaker.failed()
+        self.now = 10
+        self.breaker.before_call()          # the trial goes through
+        with self.assertRaises(CASUnavailable):
+            self.breaker.before_call()      # others still fail fast
+        self.breaker.failed()               # trial failed: open again
+        self.now = 15
+        with self.assertRaises(CASUnavailable):
+            self.breaker.before_call()
+        self.now = 20
+        self.breaker.before_call()
+        self.breaker.succeeded()
+        self.breaker.before_call()
+        self.breaker.before_call()
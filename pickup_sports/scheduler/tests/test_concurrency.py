@@ -0,0 +1,80 @@
+# scheduler/tests/test_concurrency.py
+
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from ..models import Sport, Game, Participant
+
+User = get_user_model()
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentJoinTests(TransactionTestCase):
+    """
+    Fire parallel joins at one game and check it is never overbooked.
+    Needs a database with real row locks (Postgres), so SQLite skips it.
+    """
+
+    CAPACITY = 3
+    JOINERS = 12
+
+    def setUp(self):
+        creator = User.objects.create_user(
+            username="host", email="host@example.com", password="pw")
+        self.users = [
+            User.objects.create_user(
+                username=f"p{i}", email=f"p{i}@example.com", password="pw")
+            for i in range(self.JOINERS)
+        ]
+        self.game = Game.objects.create(
+            name="Popular Run",
+            creator=creator,
+            sport=Sport.objects.create(name="Basketball"),
+            location="Payne Whitney",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+            capacity=self.CAPACITY,
+        )
+
+    def _fire(self, users):
+        url = reverse('join_game', kwargs={'pk': self.game.pk})
+        barrier = threading.Barrier(len(users))
+        codes = []
+        lock = threading.Lock()
+
+        def join(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                code = client.post(url).status_code
+            finally:
+                connection.close()
+            with lock:
+                codes.append(code)
+
+        threads = [threading.Thread(target=join, args=(u,)) for u in users]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return codes
+
+    def test_parallel_joins_never_overbook(self):
+        codes = self._fire(self.users)
+        self.assertEqual(codes.count(status.HTTP_200_OK), self.CAPACITY)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), self.JOINERS - self.CAPACITY)
+        self.assertEqual(Participant.objects.filter(game=self.game).count(), self.CAPACITY)
+
+    def test_parallel_duplicate_joins(self):
+        codes = self._fire([self.users[0]] * 6)
+        self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+        self.assertEqual(Participant.objects.filter(game=self.game).count(), 1)
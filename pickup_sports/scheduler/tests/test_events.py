@@ -0,0 +1,126 @@
+# scheduler/tests/test_events.py
+
+import asyncio
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from unittest import skipUnless
+
+from ..events import FEED_CHANNEL, InProcessBroker, PostgresBroker, game_channel
+from ..models import Sport, Game
+
+User = get_user_model()
+
+
+class BrokerTests(TestCase):
+    """
+    Tests for the in-process broker.
+    """
+
+    async def test_publish_from_another_thread(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe('games')
+        thread = threading.Thread(
+            target=broker.publish, args=('games', {'type': 'game.created', 'game': 1}))
+        thread.start()
+        thread.join()
+        self.assertEqual(await subscription.get(timeout=1), {'type': 'game.created', 'game': 1})
+        self.assertIsNone(await subscription.get(timeout=0.01))
+        subscription.close()
+        self.assertEqual(broker._subscriptions, {})
+
+    async def test_slow_reader_keeps_newest_events(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe('games')
+        for i in range(150):
+            broker.publish('games', i)
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), 100)
+        self.assertEqual(await subscription.get(), 50)
+
+
+@override_settings(SERVER_INTERFACE='asgi')
+class StreamTests(TestCase):
+    """
+    Tests for the event stream views and the events published by writes.
+    """
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="kim", email="kim@example.com", password="pw")
+        self.game = Game.objects.create(
+            name="Lacrosse",
+            creator=self.host,
+            sport=Sport.objects.create(name="Lacrosse"),
+            location="Reese Stadium",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+
+    async def test_game_stream(self):
+        broker = InProcessBroker()
+        with mock.patch('scheduler.views.get_broker', return_value=broker):
+            response = await self.async_client.get(
+                reverse('game_events', kwargs={'pk': self.game.pk}))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+            next_chunk = asyncio.ensure_future(anext(chunks))
+            await asyncio.sleep(0)
+            broker.publish(game_channel(self.game.pk), {'type': 'comment.created', 'game': self.game.pk})
+            self.assertEqual(
+                await next_chunk,
+                b'event: comment.created\ndata: {"type": "comment.created", "game": %d}\n\n' % self.game.pk,
+            )
+            await chunks.aclose()
+
+    async def test_missing_game_stream(self):
+        response = await self.async_client.get(reverse('game_events', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SERVER_INTERFACE='wsgi')
+    async def test_refused_under_wsgi(self):
+        for url in (reverse('games_feed_events'),
+                    reverse('game_events', kwargs={'pk': self.game.pk})):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 501)
+            self.assertFalse(response.streaming)
+
+    def test_join_publishes_on_commit(self):
+        player = User.objects.create_user(
+            username="lee", email="lee@example.com", password="pw")
+        client = APIClient()
+        client.force_authenticate(player)
+        broker = mock.Mock()
+        with mock.patch('scheduler.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post(reverse('join_game', kwargs={'pk': self.game.pk}))
+        event = {'type': 'participant.joined', 'game': self.game.pk}
+        broker.publish.assert_any_call(game_channel(self.game.pk), event)
+        broker.publish.assert_any_call(FEED_CHANNEL, event)
+
+
+@skipUnless(connection.vendor == 'postgresql', "LISTEN/NOTIFY needs Postgres")
+class PostgresBrokerTests(TransactionTestCase):
+
+    async def test_round_trip(self):
+        broker = PostgresBroker()
+        subscription = broker.subscribe('games')
+        # Give the listener a moment to issue LISTEN.
+        for _ in range(50):
+            await asyncio.sleep(0.05)
+            await sync_to_async(broker.publish)('games', {'type': 'game.created', 'game': 7})
+            event = await subscription.get(timeout=0.05)
+            if event is not None:
+                break
+        self.assertEqual(event, {'type': 'game.created', 'game': 7})
+        subscription.close()
+        broker._listener.cancel()
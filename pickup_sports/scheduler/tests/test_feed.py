@@ -0,0 +1,108 @@
+# scheduler/tests/test_feed.py
+
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..feed import DEFAULT_WEIGHTS, SKILL_LEVELS, score_games
+from ..models import Game, Participant, Sport
+from .test_cache import LOCMEM
+
+User = get_user_model()
+
+
+class ScoreTests(SimpleTestCase):
+    """
+    Tests for the vectorized scoring pass.
+    """
+
+    def test_each_signal_moves_the_score(self):
+        now = timezone.now()
+        soon, later = now + timedelta(hours=2), now + timedelta(days=6)
+        base = (1, 'intermediate', 0, None, later)
+        rows = [
+            base,
+            (2, 'intermediate', 0, None, later),   # favorite sport
+            (1, 'advanced', 0, None, later),       # the user's usual level
+            (1, 'intermediate', 9, 10, later),     # nearly full
+            (1, 'intermediate', 0, None, soon),    # starts soon
+        ]
+        skills = np.array([0.0, 0.2, 0.8, 0.0])
+        scores = score_games(rows, {2}, skills, now, DEFAULT_WEIGHTS)
+        self.assertTrue(all(scores[i] > scores[0] for i in range(1, 5)), scores)
+        self.assertAlmostEqual(scores[1] - scores[0], DEFAULT_WEIGHTS['sport'])
+
+    def test_no_history_scores_levels_alike(self):
+        now = timezone.now()
+        rows = [(1, level, 0, None, now) for level in SKILL_LEVELS]
+        scores = score_games(rows, set(), None, now, DEFAULT_WEIGHTS)
+        self.assertEqual(len(set(scores.tolist())), 1)
+
+
+@override_settings(CACHES=LOCMEM)
+class FeedTests(TestCase):
+    """
+    Tests for GET /api/games/for-you/.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="jo", email="jo@example.com", password="pw")
+        self.host = User.objects.create_user(
+            username="kay", email="kay@example.com", password="pw")
+        self.client.force_authenticate(self.user)
+        self.soccer = Sport.objects.create(name="Soccer")
+        self.chess = Sport.objects.create(name="Chess")
+        self.start = timezone.now() + timedelta(days=2)
+
+    def game(self, name, sport, **fields):
+        values = dict(
+            name=name, creator=self.host, sport=sport, location="Field",
+            start_time=self.start, end_time=self.start + timedelta(hours=2))
+        values.update(fields)
+        return Game.objects.create(**values)
+
+    def feed(self):
+        response = self.client.get(reverse('game_feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [g['name'] for g in response.data]
+
+    def test_ranking_and_exclusions(self):
+        self.user.favorite_sports.add(self.soccer)
+        self.game("chess", self.chess)
+        self.game("soccer", self.soccer)
+        self.game("full", self.soccer, capacity=1, participant_count=1)
+        self.game("cancelled", self.soccer, status='cancelled')
+        self.game("mine", self.soccer, creator=self.user)
+        joined = self.game("joined", self.soccer)
+        Participant.objects.create(game=joined, user=self.user)
+        self.game("far off", self.soccer, start_time=self.start + timedelta(days=30),
+                  end_time=self.start + timedelta(days=30, hours=1))
+        self.assertEqual(self.feed(), ["soccer", "chess"])
+
+    def test_cached_until_profile_or_games_change(self):
+        self.game("chess", self.chess)
+        self.game("soccer", self.soccer, start_time=self.start + timedelta(hours=1),
+                  end_time=self.start + timedelta(hours=2))
+        self.assertEqual(self.feed(), ["chess", "soccer"])
+        with self.assertNumQueries(1):
+            # The ranking comes from the cache; only the games are loaded.
+            self.client.get(reverse('game_feed'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('profile_update'),
+                              {'favorite_sports': [self.soccer.pk]}, format='json')
+        self.assertEqual(self.feed(), ["soccer", "chess"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game("new soccer", self.soccer, start_time=self.start - timedelta(hours=1))
+        self.assertEqual(self.feed(), ["new soccer", "soccer", "chess"])
@@ -0,0 +1,104 @@
+# scheduler/tests/test_geo.py
+
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import geo
+from ..models import Game, Sport
+
+User = get_user_model()
+
+NEW_HAVEN = (41.3083, -72.9279)
+
+
+class GeohashTests(SimpleTestCase):
+    """
+    Tests for the geohash helpers behind ?near=.
+    """
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(42.6, -5.6, 5), 'ezs42')
+
+    def test_cells_cover_every_point_in_range(self):
+        rng = random.Random(1)
+        for lat, lng, radius in [(*NEW_HAVEN, 1), (*NEW_HAVEN, 40), (0.0, 179.99, 10),
+                                 (89.9, 0.0, 20), (-33.87, 151.21, 0.2)]:
+            cells = geo.covering_cells(lat, lng, radius)
+            self.assertLessEqual(len(cells), geo.MAX_CELLS)
+            for _ in range(500):
+                plat = lat + rng.uniform(-1, 1) * radius / geo.KM_PER_DEGREE
+                plng = lng + rng.uniform(-1, 1) * radius / geo.KM_PER_DEGREE * 3
+                plat = max(min(plat, 90.0), -90.0)
+                plng = (plng + 180) % 360 - 180
+                if geo.haversine_km(lat, lng, plat, plng) <= radius:
+                    point = geo.encode(plat, plng)
+                    self.assertTrue(any(point.startswith(c) for c in cells),
+                                    (lat, lng, radius, plat, plng))
+
+
+class NearFilterTests(TestCase):
+    """
+    Tests for ?near= and ?radius= on GET /api/games/.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="gus", email="gus@example.com", password="pw")
+        self.sport = Sport.objects.create(name="Frisbee")
+        rng = random.Random(2)
+        self.points = {}
+        for i in range(150):
+            lat = NEW_HAVEN[0] + rng.uniform(-0.2, 0.2)
+            lng = NEW_HAVEN[1] + rng.uniform(-0.25, 0.25)
+            game = self.make_game(f"Game {i}", lat, lng)
+            self.points[game.pk] = (lat, lng)
+        self.make_game("Nowhere", None, None)
+
+    def make_game(self, name, lat, lng):
+        start = timezone.now() + timedelta(hours=1)
+        return Game.objects.create(
+            name=name, creator=self.user, sport=self.sport, location="Green",
+            latitude=lat, longitude=lng,
+            start_time=start, end_time=start + timedelta(hours=1))
+
+    def test_matches_exact_distance(self):
+        for radius in (1, 5, 12):
+            response = self.client.get(
+                reverse('game_list'), {'near': '%f,%f' % NEW_HAVEN, 'radius': radius})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            expected = {pk for pk, point in self.points.items()
+                        if geo.haversine_km(*NEW_HAVEN, *point) <= radius}
+            self.assertEqual({g['id'] for g in response.data}, expected)
+
+    def test_geohash_follows_coordinates(self):
+        game = Game.objects.get(name="Game 0")
+        self.assertEqual(game.geohash, geo.encode(game.latitude, game.longitude))
+        game.latitude = game.longitude = None
+        game.save()
+        self.assertIsNone(Game.objects.get(pk=game.pk).geohash)
+
+    def test_coordinates_come_in_pairs(self):
+        self.client.force_authenticate(self.user)
+        start = timezone.now() + timedelta(hours=1)
+        response = self.client.post(reverse('game_create'), {
+            'name': "Half", 'sport_id': self.sport.id, 'location': "Green",
+            'latitude': 41.3, 'start_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('latitude', response.data)
+
+    def test_invalid_params(self):
+        for params in ({'near': 'here'}, {'near': '91,0'}, {'near': '41,-72', 'radius': 0},
+                       {'near': '41,-72', 'radius': 500}):
+            response = self.client.get(reverse('game_list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,5 @@
+import random
+
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -5,7 +7,10 @@ from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from datetime import timedelta
-from ..models import Sport, Game, Participant
+from django.core.management import call_command
+from io import StringIO
+from ..models import Sport, Game, Participant, Comment
+from ..schedule import find_overlaps
 
 User = get_user_model()
 
@@ -39,3 +44,144 @@ class GameModelTests(TestCase):
         game.end_time = timezone.now() - timedelta(minutes=5)
         game.save()
         self.assertEqual(game.current_state(), "Completed")
+
+    def test_state_annotation_matches_current_state(self):
+        now = timezone.now()
+        windows = {
+            "Open": (now + timedelta(hours=1), now + timedelta(hours=2)),
+            "In_progress": (now - timedelta(hours=1), now + timedelta(hours=1)),
+            "Completed": (now - timedelta(hours=2), now - timedelta(hours=1)),
+        }
+        for state, (start, end) in windows.items():
+            for status in ('open', 'cancelled'):
+                Game.objects.create(
+                    name=state, creator=self.user, sport=self.sport, location="Field",
+                    start_time=start, end_time=end, status=status)
+        games = list(Game.objects.with_state(now))
+        self.assertEqual(len(games), 6)
+        for game in games:
+            self.assertEqual(game.state, game.current_state(now))
+            self.assertEqual(
+                list(Game.objects.filter(pk=game.pk).in_states([game.state], now)), [game])
+
+
+class GameCounterTests(TestCase):
+    """
+    Tests for the stored participant_count / comment_count columns.
+    """
+
+    def setUp(self):
+        self.sport = Sport.objects.create(name="Soccer")
+        self.user = User.objects.create_user(username="alice", password="pw")
+        start = timezone.now() + timedelta(hours=1)
+        self.game = Game.objects.create(
+            name="Counted Game",
+            creator=self.user,
+            sport=self.sport,
+            location="Field",
+            start_time=start,
+            end_time=start + timedelta(hours=2),
+            capacity=2,
+        )
+
+    def test_is_full_reads_counter(self):
+        self.assertFalse(self.game.is_full)
+        self.game.participant_count = 2
+        with self.assertNumQueries(0):
+            self.assertTrue(self.game.is_full)
+        # No capacity, or capacity 0, is unlimited, as with_space() has it.
+        for capacity in (None, 0):
+            self.game.capacity = capacity
+            Game.objects.filter(pk=self.game.pk).update(capacity=capacity, participant_count=2)
+            self.assertFalse(self.game.is_full)
+            self.assertTrue(Game.objects.filter(pk=self.game.pk).with_space().exists())
+
+    def test_saves_keep_counters_changed_since_load(self):
+        stale = Game.objects.get(pk=self.game.pk)
+        # A join and a comment land between loading the game and saving it.
+        Game.objects.filter(pk=self.game.pk).update(participant_count=1, comment_count=1)
+
+        stale.name = "Renamed Game"
+        stale.save()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.name, "Renamed Game")
+        self.assertEqual((self.game.participant_count, self.game.comment_count), (1, 1))
+
+        # The same through the update and cancel endpoints.
+        Game.objects.filter(pk=self.game.pk).update(participant_count=2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            "name": "Edited Game", "sport_id": self.sport.id, "location": "Field",
+            "start_time": stale.start_time.isoformat(), "end_time": stale.end_time.isoformat(),
+            "capacity": 2,
+        }
+        response = client.put(reverse('game_update', kwargs={'pk': self.game.pk}), payload,
+                              format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Game.objects.filter(pk=self.game.pk).update(comment_count=3)
+        response = client.post(reverse('cancel_game', kwargs={'pk': self.game.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.name, self.game.status), ("Edited Game", "cancelled"))
+        self.assertEqual((self.game.participant_count, self.game.comment_count), (2, 3))
+
+    def test_deleting_a_user_releases_their_seat(self):
+        self.game.capacity = 1
+        self.game.save()
+        player = User.objects.create_user(
+            username="bob", email="bob@example.com", password="pw")
+        client = APIClient()
+        client.force_authenticate(player)
+        join_url = reverse('join_game', kwargs={'pk': self.game.pk})
+        self.assertEqual(client.post(join_url).status_code, status.HTTP_200_OK)
+        client.post(reverse('game-comments', kwargs={'game_pk': self.game.pk}),
+                    {"text": "in"}, format="json")
+
+        player.delete()
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.participant_count, self.game.comment_count), (0, 0))
+
+        # Deletes of rows the counters never saw leave them at zero.
+        Comment.objects.create(game=self.game, author=self.user, text="hi").delete()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.comment_count, 0)
+
+        other = User.objects.create_user(
+            username="cy", email="cy@example.com", password="pw")
+        client.force_authenticate(other)
+        self.assertEqual(client.post(join_url).status_code, status.HTTP_200_OK)
+
+    def test_repair_game_counts(self):
+        other = User.objects.create_user(
+            username="bob", email="bob@example.com", password="pw")
+        # Rows added behind the counters' back, e.g. through the admin.
+        Participant.objects.create(user=other, game=self.game)
+        Comment.objects.create(game=self.game, author=other, text="hi")
+
+        call_command('repair_game_counts', stdout=StringIO())
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.participant_count, 1)
+        self.assertEqual(self.game.comment_count, 1)
+
+
+class OverlapSweepTests(TestCase):
+    """
+    Tests for the sort-and-sweep overlap finder.
+    """
+
+    def test_matches_pairwise_comparison(self):
+        rng = random.Random(3)
+        intervals = []
+        for key in range(300):
+            start = rng.randint(0, 5000)
+            intervals.append((key, start, start + rng.randint(1, 120)))
+        expected = {
+            tuple(sorted((a[0], b[0])))
+            for i, a in enumerate(intervals) for b in intervals[i + 1:]
+            if a[1] < b[2] and b[1] < a[2]
+        }
+        found = [(a, b) for a, b, _, _ in find_overlaps(intervals)]
+        self.assertEqual(len(found), len(expected))
+        self.assertEqual({tuple(sorted(pair)) for pair in found}, expected)
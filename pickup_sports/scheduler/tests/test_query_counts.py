@@ -0,0 +1,106 @@
+# scheduler/tests/test_query_counts.py
+
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from ..models import Sport, Game, Participant, Comment
+
+User = get_user_model()
+
+
+class QueryBudgetTests(TestCase):
+    """
+    The game-returning endpoints must be served by a fixed number of
+    queries, no matter how many games, participants or comments exist.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.creator = User.objects.create_user(
+            username="host", email="host@example.com", password="pw")
+        self.players = [
+            User.objects.create_user(
+                username=f"player{i}", email=f"player{i}@example.com", password="pw")
+            for i in range(4)
+        ]
+        self.sport = Sport.objects.create(name="Basketball")
+
+    def _seed(self, count, start):
+        for i in range(count):
+            game = Game.objects.create(
+                name=f"Game {i}",
+                creator=self.creator,
+                sport=self.sport,
+                location="Gym",
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1),
+            )
+            for player in self.players:
+                Participant.objects.create(user=player, game=game)
+                Comment.objects.create(game=game, author=player, text="in")
+        Game.objects.sync_counts()
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        self.assertLessEqual(
+            len(ctx.captured_queries), limit,
+            "%d queries executed, at most %d expected:\n%s" % (
+                len(ctx.captured_queries), limit,
+                "\n".join(q['sql'] for q in ctx.captured_queries)),
+        )
+
+    def test_game_list_query_budget(self):
+        self._seed(10, timezone.now() + timedelta(hours=1))
+        with self.assertMaxQueries(3):
+            response = self.client.get(reverse('game_list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 10)
+
+    def test_game_list_summary_query_budget(self):
+        self._seed(10, timezone.now() + timedelta(hours=1))
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('game_list') + '?view=summary')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data[0]
+        self.assertEqual(first['participant_count'], 4)
+        self.assertEqual(first['comment_count'], 4)
+        self.assertNotIn('participants', first)
+        self.assertNotIn('comments', first)
+
+    def test_game_detail_query_budget(self):
+        self._seed(1, timezone.now() + timedelta(hours=1))
+        game = Game.objects.get()
+        # validator lookup, game with creator/sport, participants, comments
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('game_detail', kwargs={'pk': game.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['participants']), 4)
+
+    def test_user_games_query_budget(self):
+        self._seed(10, timezone.now() + timedelta(hours=1))
+        url = reverse('user-games', kwargs={'user_id': self.players[0].pk})
+        with self.assertMaxQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 10)
+
+    def test_my_archived_games_query_budget(self):
+        self._seed(10, timezone.now() - timedelta(days=2))
+        self.client.force_authenticate(self.creator)
+        # force_authenticate skips the token lookup, so only the view's own
+        # queries are counted here.
+        with self.assertMaxQueries(3):
+            response = self.client.get(reverse('my_archived_games'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 10)
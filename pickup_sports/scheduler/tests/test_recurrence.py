@@ -0,0 +1,248 @@
+# scheduler/tests/test_recurrence.py
+
+import datetime
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Game, GameSeries, Participant, Sport
+from ..recurrence import FOLLOWING, ONE, materialize, update_series
+
+User = get_user_model()
+
+MONDAY = datetime.date(2030, 10, 28)
+TUESDAY, THURSDAY = 1, 3
+
+
+class SeriesTestCase(TestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host", email="host@example.com", password="pw")
+        self.sport = Sport.objects.create(name="Ultimate")
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def make_series(self, weeks=4, **fields):
+        """
+        A Tue/Thu 6pm series over ``weeks`` weeks from MONDAY, fully
+        materialized.
+        """
+        values = dict(
+            creator=self.host, sport=self.sport, name="Weekly ultimate",
+            location="Cross Campus", weekdays=(1 << TUESDAY) | (1 << THURSDAY),
+            start_time=datetime.time(18), duration=timedelta(hours=2),
+            timezone='America/New_York', starts_on=MONDAY,
+            until=MONDAY + timedelta(weeks=weeks, days=-1),
+        )
+        values.update(fields)
+        series = GameSeries.objects.create(**values)
+        materialize([series], until=MONDAY + timedelta(weeks=weeks), today=MONDAY)
+        return series
+
+    def games(self, series):
+        return list(Game.objects.filter(series=series).order_by('occurrence_date'))
+
+
+class MaterializeTests(SeriesTestCase):
+    """
+    Tests for turning series into games.
+    """
+
+    def test_occurrences_keep_local_time_across_dst(self):
+        series = self.make_series()
+        games = self.games(series)
+        self.assertEqual(len(games), 8)
+        self.assertEqual({g.occurrence_date.weekday() for g in games}, {TUESDAY, THURSDAY})
+        # 6pm EDT before November 3rd 2030, 6pm EST after.
+        self.assertEqual(games[0].start_time.astimezone(datetime.timezone.utc).hour, 22)
+        self.assertEqual(games[-1].start_time.astimezone(datetime.timezone.utc).hour, 23)
+        self.assertEqual(games[0].end_time - games[0].start_time, timedelta(hours=2))
+        self.assertEqual(series.materialized_until, MONDAY + timedelta(weeks=4))
+
+    def test_materializing_again_adds_nothing(self):
+        series = self.make_series()
+        series.materialized_until = None
+        materialize([series], until=MONDAY + timedelta(weeks=4), today=MONDAY)
+        self.assertEqual(len(self.games(series)), 8)
+
+    def test_many_series_take_a_fixed_number_of_queries(self):
+        many = GameSeries.objects.bulk_create(
+            GameSeries(creator=self.host, sport=self.sport, location=f"Field {i}",
+                       weekdays=(1 << TUESDAY) | (1 << THURSDAY),
+                       start_time=datetime.time(18), duration=timedelta(hours=1),
+                       starts_on=MONDAY)
+            for i in range(200)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            created = materialize(many, until=MONDAY + timedelta(days=6), today=MONDAY)
+        self.assertEqual(created, 400)
+        # Batched INSERTs (how many rows fit in one depends on the backend)
+        # and a single UPDATE of the series, never a statement per game.
+        statements = [q['sql'].split()[0] for q in queries.captured_queries]
+        self.assertEqual(statements.count('UPDATE'), 1)
+        self.assertNotIn('SELECT', statements)
+        self.assertLess(len(statements), 20)
+        self.assertEqual(Game.objects.count(), 400)
+
+    @override_settings(SERIES_MATERIALIZE_DAYS=14)
+    def test_command_rolls_the_window(self):
+        today = timezone.localdate()
+        series = GameSeries.objects.create(
+            creator=self.host, sport=self.sport, location="Track",
+            weekdays=0b1111111, start_time=datetime.time(7),
+            duration=timedelta(hours=1), starts_on=today,
+            materialized_until=today + timedelta(days=6))
+        out = StringIO()
+        call_command('materialize_series', stdout=out)
+        self.assertIn("Materialized 8 game(s) for 1 series", out.getvalue())
+        series.refresh_from_db()
+        self.assertEqual(series.materialized_until, today + timedelta(days=14))
+        call_command('materialize_series', stdout=out)
+        self.assertIn("Materialized 0 game(s) for 0 series", out.getvalue())
+
+
+class SeriesEditTests(SeriesTestCase):
+    """
+    Tests for editing and cancelling a whole series, one occurrence, or an
+    occurrence and the ones after it.
+    """
+
+    def test_create_endpoint(self):
+        starts_on = timezone.localdate() + timedelta(days=1)
+        response = self.client.post(reverse('series_create'), {
+            'name': "Pickup", 'sport_id': self.sport.id, 'location': "Payne Whitney",
+            'weekdays': [TUESDAY, THURSDAY], 'start_time': "18:00", 'duration': "01:30:00",
+            'timezone': "America/New_York", 'starts_on': starts_on.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['weekdays'], [TUESDAY, THURSDAY])
+        games = Game.objects.filter(series_id=response.data['id'])
+        self.assertTrue(games.exists())
+        self.assertTrue(all(g.creator == self.host for g in games))
+        detail = self.client.get(reverse('game_detail', kwargs={'pk': games[0].pk}))
+        self.assertEqual(detail.data['series'], response.data['id'])
+
+    def test_create_validation(self):
+        response = self.client.post(reverse('series_create'), {
+            'sport_id': self.sport.id, 'location': "Gym", 'weekdays': [7],
+            'start_time': "18:00", 'duration': "01:00:00", 'timezone': "Mars/Base",
+            'starts_on': "2030-10-28", 'until': "2030-10-01",
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'weekdays', 'timezone'})
+
+    def test_edit_all(self):
+        series = self.make_series()
+        response = self.client.patch(
+            reverse('series_update', kwargs={'pk': series.pk}),
+            {'location': "Old Campus", 'start_time': "19:00"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for game in self.games(series):
+            self.assertEqual(game.location, "Old Campus")
+            # 7pm EDT / EST
+            self.assertIn(game.start_time.astimezone(datetime.timezone.utc).hour, (23, 0))
+
+    def test_edit_one_detaches_it(self):
+        series = self.make_series()
+        first, second = self.games(series)[:2]
+        response = self.client.patch(
+            reverse('series_update', kwargs={'pk': series.pk}),
+            {'scope': ONE, 'occurrence': first.pk, 'location': "Gym"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        self.assertEqual(first.location, "Gym")
+        self.assertTrue(first.detached)
+        self.assertEqual(GameSeries.objects.get(pk=series.pk).location, "Cross Campus")
+
+        update_series(GameSeries.objects.get(pk=series.pk), {'location': "Field"})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.location, second.location), ("Gym", "Field"))
+
+    def test_edit_following_splits_the_series(self):
+        series = self.make_series()
+        games = self.games(series)
+        Participant.objects.create(game=games[4], user=User.objects.create_user(
+            username="pat", email="pat@example.com", password="pw"))
+        response = self.client.patch(
+            reverse('series_update', kwargs={'pk': series.pk}),
+            {'scope': FOLLOWING, 'occurrence': games[4].pk, 'name': "Late season"},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tail = GameSeries.objects.get(pk=response.data['id'])
+        self.assertNotEqual(tail.pk, series.pk)
+        self.assertEqual(tail.starts_on, games[4].occurrence_date)
+        series.refresh_from_db()
+        self.assertEqual(series.until, games[4].occurrence_date - timedelta(days=1))
+        self.assertEqual([g.name for g in self.games(series)], ["Weekly ultimate"] * 4)
+        moved = self.games(tail)
+        self.assertEqual([g.pk for g in moved], [g.pk for g in games[4:]])
+        self.assertEqual({g.name for g in moved}, {"Late season"})
+        self.assertEqual(moved[0].participant_set.count(), 1)
+
+    def test_weekday_change_cancels_and_adds(self):
+        series = self.make_series(weeks=1)
+        update_series(series, {'weekdays': (1 << TUESDAY) | (1 << 4)})
+        games = self.games(series)
+        self.assertEqual(
+            [(g.occurrence_date.weekday(), g.status) for g in games],
+            [(TUESDAY, 'open'), (THURSDAY, 'cancelled'), (4, 'open')],
+        )
+
+    def test_cancel_following(self):
+        series = self.make_series()
+        games = self.games(series)
+        response = self.client.post(
+            reverse('series_cancel', kwargs={'pk': series.pk}),
+            {'scope': FOLLOWING, 'occurrence': games[6].pk}, format='json')
+        self.assertEqual(response.data['cancelled'], 2)
+        self.assertEqual(
+            [g.status for g in self.games(series)], ['open'] * 6 + ['cancelled'] * 2)
+        series.refresh_from_db()
+        self.assertEqual(series.until, games[6].occurrence_date - timedelta(days=1))
+
+    def test_cancel_all(self):
+        series = self.make_series()
+        response = self.client.post(reverse('series_cancel', kwargs={'pk': series.pk}))
+        self.assertEqual(response.data['cancelled'], 8)
+        self.assertFalse(Game.objects.filter(series=series, status='open').exists())
+        series.refresh_from_db()
+        self.assertEqual(materialize([series], until=MONDAY + timedelta(weeks=8)), 0)
+
+    def test_only_the_creator_may_change_a_series(self):
+        series = self.make_series()
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="pw")
+        self.client.force_authenticate(other)
+        response = self.client.post(reverse('series_cancel', kwargs={'pk': series.pk}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.patch(
+            reverse('series_update', kwargs={'pk': series.pk}), {'name': "Mine"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_scope_needs_an_occurrence_of_the_series(self):
+        series = self.make_series()
+        response = self.client.post(
+            reverse('series_cancel', kwargs={'pk': series.pk}), {'scope': ONE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bodies_that_are_not_objects_are_refused(self):
+        series = self.make_series()
+        for body in (['all'], "all"):
+            response = self.client.post(
+                reverse('series_cancel', kwargs={'pk': series.pk}), body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.patch(
+                reverse('series_update', kwargs={'pk': series.pk}), body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(series.occurrences.filter(status='cancelled').exists())
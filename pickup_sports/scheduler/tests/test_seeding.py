@@ -0,0 +1,78 @@
+# scheduler/tests/test_seeding.py
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .. import seeding
+from ..management.commands.bench_endpoints import unbenchmarked
+from ..models import Comment, Game, Participant, Sport
+from ..search import search_users
+
+User = get_user_model()
+
+
+class SeedTests(TestCase):
+    def seed(self, **kwargs):
+        return seeding.seed(**{'users': 30, 'games': 60, 'batch_size': 25, **kwargs})
+
+    def test_rows_are_consistent(self):
+        counts = self.seed()
+        self.assertEqual(counts['users'], User.objects.count())
+        self.assertEqual(counts['sports'], len(seeding.SPORTS))
+        self.assertEqual(counts['games'], 60)
+        self.assertEqual(counts['participants'], Participant.objects.count())
+        self.assertEqual(counts['comments'], Comment.objects.count())
+
+        games = Game.objects.annotate(
+            members=Count('participant_set', distinct=True), posts=Count('comments', distinct=True))
+        self.assertFalse(games.exclude(participant_count=F('members')).exists())
+        self.assertFalse(games.exclude(comment_count=F('posts')).exists())
+        self.assertFalse(games.filter(participant_count__gt=F('capacity')).exists())
+        self.assertFalse(Participant.objects.filter(user=F('game__creator')).exists())
+        self.assertFalse(Game.objects.filter(latitude__isnull=False, geohash__isnull=True).exists())
+        self.assertTrue(search_users(User.objects.all(), 'seed-1', 5))
+
+    def test_same_seed_same_dataset(self):
+        def snapshot():
+            return list(Game.objects.order_by('name').values_list(
+                'name', 'sport__name', 'creator__username', 'start_time', 'capacity',
+                'participant_count', 'comment_count'))
+
+        now = timezone.now()
+        self.seed(now=now)
+        first = snapshot()
+        seeding.unseed()
+        self.assertFalse(Game.objects.exists())
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Sport.objects.exists())
+        self.seed(now=now)
+        self.assertEqual(snapshot(), first)
+
+
+class SeedCommandTests(TestCase):
+    def test_seed_replace_remove(self):
+        options = {'users': 10, 'games': 20, 'stdout': StringIO()}
+        call_command('seed', **options)
+        first = list(Game.objects.order_by('pk').values_list('name', flat=True))
+        self.assertEqual(len(first), 20)
+        with self.assertRaises(CommandError):
+            call_command('seed', **options)
+
+        call_command('seed', replace=True, **options)
+        self.assertEqual(list(Game.objects.order_by('pk').values_list('name', flat=True)), first)
+        call_command('seed', prefix='other', **options)
+        self.assertEqual(Game.objects.count(), 40)
+
+        call_command('seed', remove=True, **options)
+        self.assertEqual(Game.objects.count(), 20)
+        self.assertFalse(User.objects.filter(username__startswith='seed-').exists())
+
+
+class BenchEndpointsTests(SimpleTestCase):
+    def test_every_endpoint_is_benchmarked(self):
+        self.assertEqual(unbenchmarked(), [])
@@ -0,0 +1,97 @@
+# scheduler/tests/test_timing.py
+
+import json
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .. import views
+from ..models import Comment, Game, Participant, Sport
+from ..timing import RequestTimingMiddleware
+
+User = get_user_model()
+
+
+def server_timing(response):
+    """
+    {metric: (duration in ms, description)} from the Server-Timing header.
+    """
+    metrics = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        metrics[name] = (float(params['dur']), params.get('desc'))
+    return metrics
+
+
+class RequestTimingTests(TestCase):
+    """
+    Tests for the Server-Timing header and the per-request log line.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.host = User.objects.create_user(
+            username="kay", email="kay@example.com", password="pw")
+        sport = Sport.objects.create(name="Soccer")
+        start = timezone.now() + timedelta(days=1)
+        self.game = Game.objects.create(
+            name="Pickup", creator=self.host, sport=sport, location="Field",
+            start_time=start, end_time=start + timedelta(hours=2))
+        Participant.objects.create(game=self.game, user=self.host)
+        Comment.objects.create(game=self.game, author=self.host, text="Bring water")
+        self.url = reverse('game_detail', kwargs={'pk': self.game.pk})
+
+    def test_header_breaks_the_request_down(self):
+        with CaptureQueriesContext(connection) as ctx, \
+                self.assertLogs('scheduler.timing', 'INFO') as logs:
+            response = self.client.get(self.url)
+        metrics = server_timing(response)
+        self.assertEqual(metrics['db'][1], f'"{len(ctx.captured_queries)} queries"')
+        self.assertGreater(metrics['serialize'][0], 0)
+        self.assertGreater(metrics['render'][0], 0)
+        self.assertGreaterEqual(
+            metrics['total'][0], metrics['db'][0] + metrics['serialize'][0] + metrics['render'][0])
+
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'api/games/<int:pk>/')
+        self.assertEqual(record['queries'], len(ctx.captured_queries))
+        self.assertFalse(record['over_budget'])
+        self.assertNotIn('sql', record)
+
+    @override_settings(REQUEST_QUERY_BUDGET=1, REQUEST_QUERY_SAMPLE_RATE=1)
+    def test_over_budget_requests_log_their_queries(self):
+        with CaptureQueriesContext(connection) as ctx, \
+                self.assertLogs('scheduler.timing', 'WARNING') as logs:
+            self.client.get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record['over_budget'])
+        self.assertEqual(len(record['sql']), len(ctx.captured_queries))
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in record['sql']))
+
+    @override_settings(REQUEST_QUERY_BUDGET=1, REQUEST_QUERY_SAMPLE_RATE=0)
+    def test_unsampled_requests_keep_no_queries(self):
+        with self.assertLogs('scheduler.timing', 'WARNING') as logs:
+            self.client.get(self.url)
+        self.assertNotIn('sql', json.loads(logs.records[0].getMessage()))
+
+    def test_async_views(self):
+        async def view(request):
+            return await views.agame_detail(request, pk=self.game.pk)
+
+        middleware = RequestTimingMiddleware(view)
+        request = AsyncRequestFactory().get(self.url)
+        with CaptureQueriesContext(connection) as ctx, self.assertLogs('scheduler.timing', 'INFO'):
+            response = async_to_sync(middleware)(request)
+        metrics = server_timing(response)
+        self.assertEqual(metrics['db'][1], f'"{len(ctx.captured_queries)} queries"')
+        self.assertGreater(metrics['serialize'][0], 0)
+        self.assertGreater(metrics['render'][0], 0)
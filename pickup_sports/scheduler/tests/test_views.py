@@ -1,14 +1,21 @@
 # scheduler/tests/test_views.py
 
-from django.test import TestCase
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import parse_http_date
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from ..models import Sport, Game, Participant
+from ..cache import bump
+from ..models import Sport, Game, Participant, Comment
+from .test_cache import LOCMEM
 
 User = get_user_model()
 
@@ -94,12 +101,87 @@ class GameAPITests(TestCase):
         resp2 = self.client.post(join_url)
         self.assertEqual(resp2.status_code, status.HTTP_400_BAD_REQUEST)
 
+        game.refresh_from_db()
+        self.assertEqual(game.participant_count, 1)
+
         # Leave
         leave_url = reverse('leave-game', kwargs={'pk': game.pk})
         resp3 = self.client.post(leave_url)
         self.assertEqual(resp3.status_code, status.HTTP_200_OK)
         self.assertFalse(Participant.objects.filter(
             user=other, game=game).exists())
+        game.refresh_from_db()
+        self.assertEqual(game.participant_count, 0)
+
+        # Leave again → 400, counter untouched
+        resp4 = self.client.post(leave_url)
+        self.assertEqual(resp4.status_code, status.HTTP_400_BAD_REQUEST)
+        game.refresh_from_db()
+        self.assertEqual(game.participant_count, 0)
+
+    def test_join_full_game_and_comment_count(self):
+        """
+        Joining a full game is refused; posting a comment bumps comment_count.
+        """
+        game = Game.objects.create(
+            name="Tiny Game",
+            creator=self.user,
+            sport=self.sport,
+            location="Court",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+            capacity=1,
+        )
+        first = User.objects.create_user(
+            username="fay", email="fay@example.com", password="pw")
+        second = User.objects.create_user(
+            username="gus", email="gus@example.com", password="pw")
+        join_url = reverse('join_game', kwargs={'pk': game.pk})
+
+        self.client.force_authenticate(first)
+        self.assertEqual(self.client.post(join_url).status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(second)
+        resp = self.client.post(join_url)
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resp.data["error"], "Game at capacity.")
+        self.assertFalse(Participant.objects.filter(user=second, game=game).exists())
+
+        self.client.force_authenticate(first)
+        comments_url = reverse('game-comments', kwargs={'game_pk': game.pk})
+        resp = self.client.post(comments_url, {"text": "see you there"}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        game.refresh_from_db()
+        self.assertEqual((game.participant_count, game.comment_count), (1, 1))
+
+    def test_join_leave_and_comment_write_the_game_once(self):
+        """
+        The counter UPDATE also sets updated_at; nothing writes the row again.
+        """
+        game = Game.objects.create(
+            name="Lunch Run",
+            creator=self.user,
+            sport=self.sport,
+            location="Track",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+        other = User.objects.create_user(
+            username="hal", email="hal@example.com", password="pw")
+        self.client.force_authenticate(other)
+        requests = [
+            (reverse('join_game', kwargs={'pk': game.pk}), {}),
+            (reverse('game-comments', kwargs={'game_pk': game.pk}), {"text": "on my way"}),
+            (reverse('leave-game', kwargs={'pk': game.pk}), {}),
+        ]
+        for url, payload in requests:
+            before = Game.objects.get(pk=game.pk).updated_at
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(url, payload, format="json")
+            self.assertLess(response.status_code, 300)
+            updates = [q['sql'] for q in ctx.captured_queries
+                       if q['sql'].startswith('UPDATE "scheduler_game"')]
+            self.assertEqual(len(updates), 1, updates)
+            self.assertGreater(Game.objects.get(pk=game.pk).updated_at, before)
 
     def test_cancel_and_delete_permissions(self):
         """
@@ -133,3 +215,534 @@ class GameAPITests(TestCase):
         delete_url = reverse('game_delete', kwargs={'pk': game.pk})
         resp_delete = self.client.delete(delete_url)
         self.assertEqual(resp_delete.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GamePaginationTests(TestCase):
+    """
+    Tests for cursor pagination on GET /api/games/.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="erin", email="erin@example.com", password="pw")
+        self.sport = Sport.objects.create(name="Tennis")
+        start = timezone.now() + timedelta(hours=1)
+        # Two games share every start time so the id tie-breaker matters.
+        self.games = [
+            Game.objects.create(
+                name=f"Game {i}",
+                creator=self.user,
+                sport=self.sport,
+                location="Courts",
+                start_time=start + timedelta(hours=i // 2),
+                end_time=start + timedelta(hours=i // 2 + 1),
+            )
+            for i in range(7)
+        ]
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(reverse('game_list'))
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_walk_forward_and_back(self):
+        url = reverse('game_list') + '?page_size=3'
+        seen = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            seen.extend(g['id'] for g in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [g.id for g in self.games])
+        self.assertIsNone(pages[0]['previous'])
+
+        back = self.client.get(pages[-1]['previous'])
+        self.assertEqual(
+            [g['id'] for g in back.data['results']],
+            [g['id'] for g in pages[-2]['results']],
+        )
+
+    def test_page_size_is_capped(self):
+        with self.settings(GAME_PAGE_SIZE_MAX=2):
+            response = self.client.get(reverse('game_list') + '?page_size=50')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('game_list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GameStateFilterTests(TestCase):
+    """
+    Tests for ?state= and ?has_space= on GET /api/games/.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="fay", email="fay@example.com", password="pw")
+        self.players = [
+            User.objects.create_user(
+                username=f"q{i}", email=f"q{i}@example.com", password="pw")
+            for i in range(2)
+        ]
+        sport = Sport.objects.create(name="Squash")
+        now = timezone.now()
+
+        def game(name, start, end, capacity=None, status='open'):
+            return Game.objects.create(
+                name=name, creator=self.user, sport=sport, location="Courts",
+                start_time=now + start, end_time=now + end,
+                capacity=capacity, status=status)
+        self.upcoming = game("upcoming", timedelta(hours=1), timedelta(hours=2))
+        self.full = game("full", timedelta(hours=1), timedelta(hours=2), capacity=2)
+        self.playing = game("playing", -timedelta(hours=1), timedelta(hours=1), capacity=5)
+        self.cancelled = game("cancelled", timedelta(hours=3), timedelta(hours=4),
+                              status='cancelled')
+        for player in self.players:
+            Participant.objects.create(game=self.full, user=player)
+        Game.objects.sync_counts()
+
+    def names(self, **params):
+        response = self.client.get(reverse('game_list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(g['name'] for g in response.data)
+
+    def test_state_filter(self):
+        self.assertEqual(self.names(state='in_progress'), ["playing"])
+        self.assertEqual(self.names(state='Open'), ["full", "upcoming"])
+        self.assertEqual(self.names(state='open,cancelled'), ["cancelled", "full", "upcoming"])
+
+    def test_has_space_filter(self):
+        self.assertEqual(self.names(has_space='true'), ["playing", "upcoming"])
+        self.assertEqual(self.names(has_space='false'), ["cancelled", "full"])
+        self.assertEqual(self.names(state='open', has_space='true'), ["upcoming"])
+
+    def test_state_is_reported_by_the_database(self):
+        response = self.client.get(reverse('game_list'), {'view': 'summary'})
+        states = {g['name']: g['current_state'] for g in response.data}
+        self.assertEqual(states, {
+            "upcoming": "Open", "full": "Open", "playing": "In_progress",
+            "cancelled": "cancelled",
+        })
+
+    def test_invalid_filters(self):
+        for params in ({'state': 'sleeping'}, {'has_space': 'maybe'}):
+            response = self.client.get(reverse('game_list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Tests for ETag / If-None-Match on the game detail and comments endpoints.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.host = User.objects.create_user(
+            username="hank", email="hank@example.com", password="pw")
+        self.game = Game.objects.create(
+            name="Squash Ladder",
+            creator=self.host,
+            sport=Sport.objects.create(name="Squash"),
+            location="Payne Whitney",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+        self.detail_url = reverse('game_detail', kwargs={'pk': self.game.pk})
+        self.comments_url = reverse('game-comments', kwargs={'game_pk': self.game.pk})
+
+    def test_not_modified_skips_the_view(self):
+        first = self.client.get(self.detail_url)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_and_comments_have_distinct_etags(self):
+        detail = self.client.get(self.detail_url)
+        comments = self.client.get(self.comments_url)
+        self.assertNotEqual(detail['ETag'], comments['ETag'])
+
+    def test_join_and_comment_change_the_etag(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        comments_etag = self.client.get(self.comments_url)['ETag']
+
+        player = User.objects.create_user(
+            username="ivy", email="ivy@example.com", password="pw")
+        self.client.force_authenticate(player)
+        self.client.post(reverse('join_game', kwargs={'pk': self.game.pk}))
+        self.client.post(self.comments_url, {"text": "hi"}, format="json")
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['participants']), 1)
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_user_edits_change_the_etag(self):
+        player = User.objects.create_user(
+            username="jan", email="jan@example.com", password="pw")
+        Participant.objects.create(game=self.game, user=player)
+        other = Game.objects.create(
+            name="Other", creator=self.host, sport=self.game.sport, location="Gym",
+            start_time=self.game.start_time, end_time=self.game.end_time)
+        etag = self.client.get(self.detail_url)['ETag']
+        updated_at = Game.objects.get(pk=other.pk).updated_at
+        # The validators come from the database alone, not a cache version
+        # that each worker may hold differently.
+        with override_settings(CACHES=LOCMEM):
+            bump('users')
+            self.assertEqual(self.client.get(self.detail_url)['ETag'], etag)
+
+        player.name = "Jan"
+        player.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['participants'][0]['user']['name'], "Jan")
+        self.assertEqual(Game.objects.get(pk=other.pk).updated_at, updated_at)
+
+    @override_settings(CACHES=LOCMEM)
+    def test_starting_changes_the_etag(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first.data['current_state'], "Open")
+        started = self.game.start_time + timedelta(minutes=1)
+        with mock.patch('django.utils.timezone.now', return_value=started):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['current_state'], "In_progress")
+            self.assertGreater(parse_http_date(response['Last-Modified']),
+                               parse_http_date(first['Last-Modified']))
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_game_still_404s(self):
+        response = self.client.get(reverse('game_detail', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CommentFetchTests(TestCase):
+    """
+    Tests for ?after= / ?limit= on the comments endpoint and for leaving
+    comments out of the embedded game payload.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.host = User.objects.create_user(
+            username="jo", email="jo@example.com", password="pw")
+        self.game = Game.objects.create(
+            name="Chess Club",
+            creator=self.host,
+            sport=Sport.objects.create(name="Chess"),
+            location="Bass Library",
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+        self.comments = [
+            Comment.objects.create(game=self.game, author=self.host, text=f"msg {i}")
+            for i in range(5)
+        ]
+        self.url = reverse('game-comments', kwargs={'game_pk': self.game.pk})
+
+    def test_after_and_limit(self):
+        response = self.client.get(self.url, {'after': self.comments[1].id, 'limit': 2})
+        self.assertEqual(
+            [c['id'] for c in response.data],
+            [self.comments[2].id, self.comments[3].id],
+        )
+        response = self.client.get(self.url, {'after': self.comments[-1].id})
+        self.assertEqual(response.data, [])
+
+    def test_bad_after(self):
+        response = self.client.get(self.url, {'after': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_without_comments(self):
+        url = reverse('game_detail', kwargs={'pk': self.game.pk})
+        self.assertEqual(len(self.client.get(url).data['comments']), 5)
+        response = self.client.get(url, {'include_comments': 'false'})
+        self.assertNotIn('comments', response.data)
+        response = self.client.get(reverse('game_list'), {'include_comments': 'false'})
+        self.assertNotIn('comments', response.data[0])
+
+
+class UserSearchTests(TestCase):
+    """
+    Tests for GET /api/users/?search=.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create_user(
+            username="asmith", email="alice@yale.edu", password="pw", name="Alice Smith")
+        self.alicia = User.objects.create_user(
+            username="alicia", email="ak@yale.edu", password="pw", name="Alicia Keys")
+        self.bob = User.objects.create_user(
+            username="bob", email="bob@yale.edu", password="pw", name="Robert Alison")
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('user-list'), {'search': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [u['id'] for u in response.data]
+
+    def test_ranked_prefix_matches(self):
+        # username match first, then name-word matches
+        self.assertEqual(self.search('ali'), [self.alicia.id, self.alice.id, self.bob.id])
+        self.assertEqual(self.search('alice'), [self.alice.id])
+        self.assertEqual(self.search('alice smi'), [self.alice.id])
+        self.assertEqual(self.search('bob@'), [self.bob.id])
+        self.assertEqual(self.search('zzz'), [])
+
+    def test_limit_and_profile_update(self):
+        self.assertEqual(len(self.search('ali', limit=1)), 1)
+        self.client.force_authenticate(self.bob)
+        self.client.patch(reverse('profile_update'), {'name': 'Bobby Tables'}, format='json')
+        self.assertEqual(self.search('tables'), [self.bob.id])
+        self.assertEqual(self.search('alison'), [])
+
+
+class ScheduleTests(TestCase):
+    """
+    Tests for GET /api/schedule/ and the union-based user_games.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.sport = Sport.objects.create(name="Soccer")
+        self.ann = User.objects.create_user(
+            username="ann", email="ann@example.com", password="pw")
+        self.ben = User.objects.create_user(
+            username="ben", email="ben@example.com", password="pw")
+        now = timezone.now()
+
+        def game(creator, hours):
+            return Game.objects.create(
+                name=f"{creator.username} {hours}",
+                creator=creator,
+                sport=self.sport,
+                location="Field",
+                start_time=now + timedelta(hours=hours),
+                end_time=now + timedelta(hours=hours + 1),
+            )
+
+        self.ann_future = [game(self.ann, h) for h in (1, 2, 3)]
+        self.ann_past = game(self.ann, -5)
+        self.ben_future = game(self.ben, 4)
+        Participant.objects.create(user=self.ann, game=self.ben_future)
+
+    def test_multi_user_schedule(self):
+        response = self.client.get(
+            reverse('user-schedule'), {'user_ids': f"{self.ann.id},{self.ben.id}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ann = response.data[str(self.ann.id)]
+        self.assertEqual(
+            [g['id'] for g in ann['upcoming']['results']],
+            [g.id for g in self.ann_future] + [self.ben_future.id],
+        )
+        self.assertEqual([g['id'] for g in ann['past']['results']], [self.ann_past.id])
+        ben = response.data[str(self.ben.id)]
+        self.assertEqual([g['id'] for g in ben['upcoming']['results']], [self.ben_future.id])
+
+    def test_schedule_cursor(self):
+        url = reverse('user-schedule')
+        first = self.client.get(url, {'user_ids': self.ann.id, 'when': 'upcoming', 'page_size': 3})
+        page = first.data[str(self.ann.id)]['upcoming']
+        self.assertEqual(len(page['results']), 3)
+        second = self.client.get(url, {
+            'user_ids': self.ann.id, 'when': 'upcoming', 'page_size': 3, 'cursor': page['next']})
+        page = second.data[str(self.ann.id)]['upcoming']
+        self.assertEqual([g['id'] for g in page['results']], [self.ben_future.id])
+        self.assertIsNone(page['next'])
+
+    def test_schedule_validation(self):
+        url = reverse('user-schedule')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'user_ids': 'x'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'user_ids': '1,2', 'cursor': 'abc'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_user_games_union(self):
+        response = self.client.get(reverse('user-games', kwargs={'user_id': self.ann.id}))
+        self.assertEqual(len(response.data), 5)
+
+
+class BulkParticipantsTests(TestCase):
+    """
+    Tests for the bulk participants endpoint.
+    """
+
+    def setUp(self):
+        self.host = User.objects.create_user(
+            username="host", email="host@example.com", password="pw")
+        self.players = [
+            User.objects.create_user(
+                username=f"p{i}", email=f"p{i}@example.com", password="pw")
+            for i in range(4)
+        ]
+        sport = Sport.objects.create(name="Volleyball")
+
+        def game(capacity=None, creator=self.host):
+            return Game.objects.create(
+                name="Volleyball", creator=creator, sport=sport, location="Gym",
+                start_time=timezone.now() + timedelta(hours=1),
+                end_time=timezone.now() + timedelta(hours=2),
+                capacity=capacity,
+            )
+        self.game = game()
+        self.small_game = game(capacity=2)
+        self.other_game = game(creator=self.players[0])
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+        self.url = reverse('bulk_participants')
+
+    def post(self, *operations):
+        return self.client.post(self.url, {'operations': list(operations)}, format='json')
+
+    def results(self, response):
+        return {(r['game'], r['user']): r['result'] for r in response.data['results']}
+
+    def test_bulk_add_and_remove(self):
+        Participant.objects.create(game=self.game, user=self.players[3])
+        Game.objects.sync_counts()
+        ids = [p.id for p in self.players]
+        response = self.post(
+            {'game': self.game.id, 'action': 'add', 'users': ids[:3]},
+            {'game': self.game.id, 'action': 'remove', 'users': [ids[3], ids[3]]},
+            {'game': self.small_game.id, 'action': 'add', 'users': ids},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = self.results(response)
+        self.assertEqual(results[(self.game.id, ids[3])], 'left')
+        self.assertEqual(
+            [results[(self.small_game.id, u)] for u in ids],
+            ['joined', 'joined', 'full', 'full'],
+        )
+        self.assertEqual(len(response.data['results']), 8)
+        self.game.refresh_from_db()
+        self.small_game.refresh_from_db()
+        self.assertEqual(self.game.participant_count, 3)
+        self.assertEqual(self.small_game.participant_count, 2)
+        self.assertEqual(
+            set(self.game.participant_set.values_list('user_id', flat=True)), set(ids[:3]))
+
+    def test_per_item_errors(self):
+        response = self.post(
+            {'game': self.other_game.id, 'action': 'add', 'users': [self.players[1].id]},
+            {'game': 999999, 'action': 'add', 'users': [self.players[1].id]},
+            {'game': self.game.id, 'action': 'add', 'users': [999999, self.host.id]},
+            {'game': self.game.id, 'action': 'remove', 'users': [self.players[2].id]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['result'] for r in response.data['results']],
+            ['forbidden', 'game_not_found', 'user_not_found', 'creator', 'not_joined'],
+        )
+        self.assertFalse(Participant.objects.exists())
+
+    def test_validation(self):
+        self.assertEqual(self.post().status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post({'game': self.game.id, 'action': 'kick', 'users': [1]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(None)
+        self.assertIn(self.post().status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_query_count_does_not_grow_with_users(self):
+        extra = User.objects.bulk_create(
+            User(username=f"x{i}", email=f"x{i}@example.com") for i in range(30))
+        # lock games, users, participations, insert, counter update, savepoints
+        with self.assertNumQueries(7):
+            self.post({'game': self.game.id, 'action': 'add', 'users': [u.id for u in extra]})
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.participant_count, 30)
+
+
+class ConflictTests(TestCase):
+    """
+    Tests for schedule conflict detection on join/create and the
+    conflicts report.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="hal", email="hal@example.com", password="pw")
+        self.host = User.objects.create_user(
+            username="ida", email="ida@example.com", password="pw")
+        self.client.force_authenticate(self.user)
+        self.sport = Sport.objects.create(name="Rugby")
+        self.base = timezone.now() + timedelta(days=1)
+
+    def game(self, start, hours=2, creator=None, **fields):
+        return Game.objects.create(
+            name="Rugby", creator=creator or self.host, sport=self.sport, location="Field",
+            start_time=self.base + timedelta(hours=start),
+            end_time=self.base + timedelta(hours=start + hours), **fields)
+
+    def test_join_reports_conflicts(self):
+        mine = self.game(0, creator=self.user)
+        joined = self.game(10)
+        Participant.objects.create(game=joined, user=self.user)
+        self.game(1, status='cancelled', creator=self.user)
+        overlapping = self.game(1, hours=10)
+        response = self.client.post(reverse('join_game', kwargs={'pk': overlapping.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['conflicts'], [mine.pk, joined.pk])
+
+        back_to_back = self.game(2)
+        response = self.client.post(reverse('join_game', kwargs={'pk': back_to_back.pk}),
+                                    {'on_conflict': 'reject'})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [overlapping.pk])
+        self.assertFalse(Participant.objects.filter(game=back_to_back).exists())
+
+        # A body that isn't a JSON object carries no on_conflict.
+        response = self.client.post(reverse('join_game', kwargs={'pk': back_to_back.pk}),
+                                    ['reject'], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['conflicts'], [overlapping.pk])
+
+    def test_touching_games_do_not_conflict(self):
+        self.game(0, creator=self.user)
+        later = self.game(2)
+        response = self.client.post(reverse('join_game', kwargs={'pk': later.pk}),
+                                    {'on_conflict': 'reject'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['conflicts'], [])
+
+    def test_create_reports_conflicts(self):
+        mine = self.game(0, creator=self.user)
+        data = {
+            'name': "Overlap", 'sport_id': self.sport.id, 'location': "Field",
+            'start_time': (self.base + timedelta(hours=1)).isoformat(),
+            'end_time': (self.base + timedelta(hours=3)).isoformat(),
+        }
+        response = self.client.post(reverse('game_create'), {**data, 'on_conflict': 'reject'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post(reverse('game_create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['conflicts'], [mine.pk])
+
+    def test_conflicts_report(self):
+        a = self.game(0, hours=4, creator=self.user)
+        b = self.game(1)
+        c = self.game(3, hours=3)
+        d = self.game(8)
+        for game in (b, c, d):
+            Participant.objects.create(game=game, user=self.user)
+        response = self.client.get(reverse('profile_conflicts'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pairs = {tuple(conflict['games']) for conflict in response.data['conflicts']}
+        self.assertEqual(pairs, {(a.pk, b.pk), (a.pk, c.pk)})
+        window = next(x for x in response.data['conflicts'] if x['games'] == [a.pk, c.pk])
+        self.assertEqual((window['start'], window['end']), (c.start_time, a.end_time))
+        self.assertEqual({g['id'] for g in response.data['games']}, {a.pk, b.pk, c.pk})
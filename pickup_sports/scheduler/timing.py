@@ -0,0 +1,173 @@
+"""
+Where a request's time goes: the database, serializers and rendering.
+
+RequestTimingMiddleware adds a Server-Timing header to every response,
+
+    Server-Timing: db;dur=12.4;desc="9 queries", serialize;dur=30.1,
+                   render;dur=4.2, total;dur=51.0
+
+and logs the same numbers as one JSON line on the 'scheduler.timing'
+logger: at INFO normally, at WARNING when the request ran more than
+REQUEST_QUERY_BUDGET queries or took longer than REQUEST_TIME_BUDGET_MS.
+A REQUEST_QUERY_SAMPLE_RATE fraction of requests also keeps its SQL, which
+goes into the warning if that request turns out to be over budget.
+
+- db is measured by query_timer, an execute wrapper on every database
+  connection (see scheduler/signals.py), so it includes the queries the
+  async views run on worker threads.
+- serialize is the time in the outermost to_representation() of the
+  serializers in scheduler/serializers.py, less the queries it triggers.
+- render is the time in TimedJSONRenderer.
+
+Each request's numbers live on one RequestTimings found through a context
+variable; outside a request the hooks cost one lookup of it.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Queries kept per sampled request.
+MAX_SAMPLED_QUERIES = 200
+
+current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+
+    def __init__(self, keep_queries=False):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = self.serialize = self.render = 0.0
+        self.sql = [] if keep_queries else None
+        self.serializing = False
+
+    def header(self, total):
+        return (f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'serialize;dur={self.serialize * 1000:.1f}, '
+                f'render;dur={self.render * 1000:.1f}, total;dur={total * 1000:.1f}')
+
+
+def query_timer(execute, sql, params, many, context):
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings.queries += 1
+        timings.db += elapsed
+        if timings.sql is not None and len(timings.sql) < MAX_SAMPLED_QUERIES:
+            timings.sql.append((elapsed, sql))
+
+
+def install_query_timer(connection):
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+class TimedSerializerMixin:
+    """
+    Count the outermost serializer's to_representation() as serialize time.
+    Nested serializers and list items run inside it and aren't counted
+    again.
+    """
+
+    def to_representation(self, instance):
+        timings = current.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+        timings.serializing = True
+        started, db = time.perf_counter(), timings.db
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializing = False
+            timings.serialize += time.perf_counter() - started - (timings.db - db)
+
+
+class TimedJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        timings = current.get()
+        if timings is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            timings.render += time.perf_counter() - started
+
+
+class RequestTimingMiddleware:
+    """
+    Put first in MIDDLEWARE, so total covers the whole request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = self.start()
+        token = current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = self.start()
+        token = current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timings)
+
+    def start(self):
+        rate = getattr(settings, 'REQUEST_QUERY_SAMPLE_RATE', 0)
+        return RequestTimings(keep_queries=rate > 0 and random.random() < rate)
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        response.headers['Server-Timing'] = timings.header(total)
+
+        over_budget = (
+            timings.queries > getattr(settings, 'REQUEST_QUERY_BUDGET', 20)
+            or total * 1000 > getattr(settings, 'REQUEST_TIME_BUDGET_MS', 500))
+        level = logging.WARNING if over_budget else logging.INFO
+        if logger.isEnabledFor(level):
+            match = request.resolver_match
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'route': match.route if match else None,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'db_ms': round(timings.db * 1000, 1),
+                'queries': timings.queries,
+                'serialize_ms': round(timings.serialize * 1000, 1),
+                'render_ms': round(timings.render * 1000, 1),
+                'over_budget': over_budget,
+            }
+            if over_budget and timings.sql is not None:
+                record['sql'] = [{'ms': round(elapsed * 1000, 2), 'sql': sql}
+                                 for elapsed, sql in timings.sql]
+            logger.log(level, json.dumps(record))
+        return response
@@ -1,24 +1,48 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from .views import user_list, user_games
 
+
+def read_view(view, async_view):
+    """
+    The native async version of a read endpoint if settings.ASYNC_READ_VIEWS
+    is on, the DRF view otherwise. Only turn it on under ASGI: under WSGI
+    every async view would need an event loop of its own.
+    """
+    return async_view if getattr(settings, 'ASYNC_READ_VIEWS', False) else view
+
+
 urlpatterns = [
+    path('auth/token/rotate/', views.token_rotate, name='token_rotate'),
+    path('auth/token-cache/', views.token_cache_stats, name='token_cache_stats'),
     path('profile/', views.profile_detail, name='profile_detail'),
     path('profile/update/', views.profile_update, name='profile_update'),
-    path('profile/<int:id>/', views.public_profile, name='public_profile'),
-    path('games/', views.game_list, name='game_list'),
+    path('profile/conflicts/', views.profile_conflicts, name='profile_conflicts'),
+    path('profile/<int:id>/', read_view(views.public_profile, views.apublic_profile), name='public_profile'),
+    path('games/', read_view(views.game_list, views.agame_list), name='game_list'),
     path('games/create/', views.game_create, name='game_create'),
-    path('games/<int:pk>/', views.game_detail, name='game_detail'),
+    path('games/events/', views.games_feed_events, name='games_feed_events'),
+    path('games/for-you/', views.game_feed, name='game_feed'),
+    path('games/<int:pk>/', read_view(views.game_detail, views.agame_detail), name='game_detail'),
+    path('games/<int:pk>/events/', views.game_events, name='game_events'),
     path('games/<int:pk>/cancel/', views.cancel_game, name='cancel_game'),
     path('games/<int:pk>/update/', views.game_update, name='game_update'),
     path('games/<int:pk>/delete/', views.game_delete, name='game_delete'),
     path('games/<int:pk>/join/', views.join_game, name='join_game'),
-    path('sports/', views.sport_list, name='sport_list'),
+    path('games/bulk/participants/', views.bulk_participants, name='bulk_participants'),
+    path('series/create/', views.series_create, name='series_create'),
+    path('series/<int:pk>/', views.series_detail, name='series_detail'),
+    path('series/<int:pk>/update/', views.series_update, name='series_update'),
+    path('series/<int:pk>/cancel/', views.series_cancel, name='series_cancel'),
+    path('sports/', read_view(views.sport_list, views.asport_list), name='sport_list'),
     path('my-archived-games/', views.my_archived_games, name='my_archived_games'),
     path('games/<int:pk>/leave/', views.leave_game, name='leave-game'),
     path(
-      'games/<int:game_pk>/comments/', views.game_comments,name='game-comments'
+      'games/<int:game_pk>/comments/',
+      read_view(views.game_comments, views.agame_comments), name='game-comments'
     ),
     path('users/', user_list, name='user-list'),
     path('users/<int:user_id>/games/', user_games, name='user-games'),
+    path('schedule/', views.user_schedule, name='user-schedule'),
 ]
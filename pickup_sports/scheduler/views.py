@@ -1,38 +1,183 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from rest_framework import status, viewsets, permissions
 from django.contrib.auth import authenticate
-from rest_framework.permissions import IsAuthenticated, AllowAny,IsAuthenticatedOrReadOnly
-from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny,IsAuthenticatedOrReadOnly
 
-from .models import Game, Participant, Sport, Comment
-from .serializers import GameSerializer, SportSerializer, ParticipantSerializer, CustomUserProfileUpdateSerializer, UserProfileSerializer, CommentSerializer
-from django.contrib.auth import login, logout, get_user_model
+from .models import JOINABLE, CommentHistory, Game, GameHistory, GameSeries, Participant, Sport
+from .serializers import BulkParticipantsSerializer, GameSerializer, GameSeriesSerializer, GameSummarySerializer, SportSerializer, ParticipantSerializer, CustomUserProfileUpdateSerializer, UserProfileSerializer, CommentSerializer
+from .pagination import GameCursorPagination
+from .bulk import apply_participant_operations
+from .recurrence import ALL, SCOPES, cancel_series, create_series, update_series
+from .signals import bulk_participant_changes, touched_on_commit
+from .cache import acache_response, cache_response
+from .conditional import agame_conditional, game_conditional
+from .events import FEED_CHANNEL, game_channel, get_broker
+from .feed import get_feed
+from .authentication import CachedTokenAuthentication, rotate_token, token_cache, token_expires
+from .cas import CASError, CASUnavailable, get_client as get_cas_client, login_user as login_cas_user
+from .search import search_users
+from .timing import TimedJSONRenderer
+from .schedule import (PAST, UPCOMING, conflicting_games, decode_cursor, find_overlaps,
+                       schedule_page, user_game_ids)
+from django.contrib.auth import alogin, logout, get_user_model
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect
 from urllib.parse import urlencode
 from django.conf import settings
-import requests
-import xml.etree.ElementTree as ET
-from django.http import HttpResponse
-import random
-import string
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+import functools
+import json
 from django.utils import timezone
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import F
 
 
-def make_random_password(length=8):
-    """Generate a random password with the given length."""
-    characters = string.ascii_letters + string.digits + string.punctuation
-    return ''.join(random.choice(characters) for i in range(length))
+def game_list_response(request, games, now=None):
+    """
+    Serialize a list of games for one of the list endpoints.
+
+    ?view=summary returns the lightweight GameSummarySerializer shape with
+    stored headcounts; 'full' returns the full nested GameSerializer.
+    The full shape honours ?include_comments=false.
+    The result is a cursor-paginated page when the client asks for one
+    (?cursor= or ?page_size=), or a plain list otherwise.
+    current_state is computed by the database as of ``now``.
+    """
+    games, serializer_class, error = game_list_shape(request, games, now)
+    if error:
+        return error
+
+    paginator = GameCursorPagination()
+    page = paginator.paginate_queryset(games, request)
+    if page is not None:
+        serializer = serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    serializer = serializer_class(games, many=True)
+    return Response(serializer.data)
+
+
+def game_list_shape(request, games, now=None):
+    """
+    The queryset and serializer class for ?view= (see game_list_response).
+    Returns (games, serializer class, error response).
+    """
+    games = games.with_state(now or timezone.now())
+    view = request.query_params.get('view', 'full')
+    if view == 'summary':
+        games = games.select_related('creator', 'sport')
+        serializer_class = GameSummarySerializer
+    elif view == 'full':
+        include_comments = wants_comments(request)
+        games = games.with_related(comments=include_comments)
+        serializer_class = functools.partial(
+            GameSerializer, context={'include_comments': include_comments})
+    else:
+        return None, None, Response({"error": "view must be 'full' or 'summary'."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    return games, serializer_class, None
+
+
+def state_filters(request, games, now):
+    """
+    Apply ?state= (comma-separated current_state values, any case) and
+    ?has_space=true|false to ``games``. Returns (games, error response).
+    Both become plain column conditions that the start/end time indexes
+    (partial on open games, and on open games with room) can serve.
+    """
+    states = request.query_params.get('state')
+    if states:
+        by_name = {state.lower(): state for state in Game.STATES}
+        try:
+            games = games.in_states(
+                {by_name[state.strip().lower()] for state in states.split(',')}, now)
+        except KeyError:
+            return None, Response(
+                {"error": f"state must be one of {', '.join(Game.STATES)}."},
+                status=status.HTTP_400_BAD_REQUEST)
+
+    has_space = request.query_params.get('has_space')
+    if has_space is not None:
+        if has_space.lower() not in ('true', '1', 'yes', 'false', '0', 'no'):
+            return None, Response({"error": "has_space must be true or false."},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        # "Has space" means another player could join: open and not full.
+        if has_space.lower() in ('true', '1', 'yes'):
+            games = games.filter(JOINABLE)
+        else:
+            games = games.exclude(JOINABLE)
+    return games, None
+
+
+def near_filter(request, games):
+    """
+    Apply ?near=lat,lng and ?radius= (km, default NEAR_DEFAULT_RADIUS_KM,
+    at most NEAR_MAX_RADIUS_KM) to ``games``. Returns (games, error
+    response).
+    """
+    near = request.query_params.get('near')
+    if near is None:
+        return games, None
+    max_radius = getattr(settings, 'NEAR_MAX_RADIUS_KM', 50)
+    try:
+        lat, lng = (float(x) for x in near.split(','))
+        radius = float(request.query_params.get(
+            'radius', getattr(settings, 'NEAR_DEFAULT_RADIUS_KM', 5)))
+    except ValueError:
+        return None, Response({"error": "near must be 'lat,lng' and radius a number of km."},
+                              status=status.HTTP_400_BAD_REQUEST)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None, Response({"error": "near is out of range."},
+                              status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < radius <= max_radius:
+        return None, Response({"error": f"radius must be between 0 and {max_radius} km."},
+                              status=status.HTTP_400_BAD_REQUEST)
+    return games.near(lat, lng, radius), None
+
+
+def check_conflicts(request, start_time, end_time, exclude=None):
+    """
+    Ids of the caller's games that overlap [start_time, end_time), and a
+    409 response if there are any and the client sent on_conflict=reject.
+    By default conflicts are only reported back.
+    """
+    conflicts = list(conflicting_games(request.user.pk, start_time, end_time, exclude)
+                     .order_by('start_time', 'id').values_list('pk', flat=True))
+    # join_game takes any body, which need not be a JSON object.
+    data = request.data if isinstance(request.data, dict) else {}
+    on_conflict = data.get('on_conflict', request.query_params.get('on_conflict'))
+    if conflicts and on_conflict == 'reject':
+        return conflicts, Response(
+            {"error": "This game overlaps games already on your schedule.",
+             "conflicts": conflicts},
+            status=status.HTTP_409_CONFLICT)
+    return conflicts, None
+
+
+def wants_comments(request):
+    """
+    ?include_comments=false leaves the embedded comments out of the full
+    game shape; clients then fetch them from /games/<pk>/comments/.
+    """
+    value = request.query_params.get('include_comments', 'true')
+    return value.lower() not in ('false', '0', 'no')
 
 
 CAS_SERVER_URL = "https://secure6.its.yale.edu/cas/"
 FRONTEND_URL_AFTER_LOGIN = "http://localhost:3000/games"
 
 #API endpoints for CAS authentication
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def cas_login(request):
+# A plain async view rather than @api_view: under ASGI, waiting on CAS
+# (see scheduler/cas.py) holds no worker thread.
+@require_GET
+async def cas_login(request):
     service_url = request.build_absolute_uri(request.path)
     ticket = request.GET.get('ticket')
 
@@ -40,44 +185,48 @@ def cas_login(request):
         cas_login_url = f"{settings.CAS_BASE_URL}/login?service={service_url}"
         return redirect(cas_login_url)
 
-    validate_url = f"{settings.CAS_BASE_URL}/serviceValidate"
-    params = {'ticket': ticket, 'service': service_url}
     try:
-        response = requests.get(validate_url, params=params, timeout=5)
-        response.raise_for_status()
-    except requests.RequestException:
-        return HttpResponse("Error contacting CAS server.", status=500)
-
-    try:
-        root = ET.fromstring(response.text)
-    except ET.ParseError:
+        username = await get_cas_client().avalidate(ticket, service_url)
+    except CASUnavailable as exc:
+        if exc.retry_after is None:
+            return HttpResponse("Error contacting CAS server.", status=500)
+        response = HttpResponse("CAS is not responding, try again shortly.", status=503)
+        response['Retry-After'] = str(exc.retry_after)
+        return response
+    except CASError:
         return HttpResponse("Invalid response from CAS server.", status=500)
 
-    ns = {'cas': 'http://www.yale.edu/tp/cas'}
-    auth_success = root.find('cas:authenticationSuccess', ns)
-    if auth_success is not None:
-        username_el = auth_success.find('cas:user', ns)
-        if username_el is None or not username_el.text:
-            return HttpResponse("CAS authentication succeeded but no user data found.", status=400)
-        username = username_el.text.strip()
-
-        User = get_user_model()
-        user, created = User.objects.get_or_create(
-            username=username,
-            defaults={
-                'email': '',
-                'password': make_random_password(),
-            }
-        )
-        login(request, user, backend='django_cas_ng.backends.CASBackend')
-        token, _ = Token.objects.get_or_create(user=user)
+    if username is None:
+        return HttpResponse("CAS authentication failed.", status=401)
+    if not username:
+        return HttpResponse("CAS authentication succeeded but no user data found.", status=400)
 
-        if created or not user.email or not user.name:
-            return redirect(f"http://localhost:3000/profile/setup?token={token.key}")
-        else:
-            return redirect(f"{FRONTEND_URL_AFTER_LOGIN}?token={token.key}")
+    user, token_key, created = await sync_to_async(login_cas_user)(username)
+    await alogin(request, user, backend='django_cas_ng.backends.CASBackend')
+
+    if created or not user.email or not user.name:
+        return redirect(f"http://localhost:3000/profile/setup?token={token_key}")
     else:
-        return HttpResponse("CAS authentication failed.", status=401)
+        return redirect(f"{FRONTEND_URL_AFTER_LOGIN}?token={token_key}")
+
+
+# API for replacing the caller's API token
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def token_rotate(request):
+    """
+    POST /api/auth/token/rotate/
+    Issue a new token for the caller. The old one stops working at once.
+    """
+    token = rotate_token(request.user)
+    return Response({"token": token.key, "expires": token_expires(token)})
+
+
+# Token authentication cache metrics, for the worker that answers
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def token_cache_stats(request):
+    return Response(token_cache.stats())
 
 
 #API endpoint for logging out of CAS
@@ -133,6 +282,40 @@ def profile_update(request):
 
 
 
+# API for finding overlapping games on the user's schedule
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_conflicts(request):
+    """
+    GET /api/profile/conflicts/[?include_past=true]
+    Every pair of the caller's open games (created or joined) whose times
+    overlap, with the overlapping window, plus the games involved as
+    summary games. Upcoming games only unless include_past is set, which
+    covers archived games too.
+    """
+    now = timezone.now()
+    include_past = request.query_params.get('include_past', '').lower() in ('true', '1', 'yes')
+    # Upcoming games are never archived, so only the past needs history.
+    model = GameHistory if include_past else Game
+    games = model.objects.filter(pk__in=user_game_ids(request.user.pk, history=include_past)) \
+        .exclude(status='cancelled')
+    if not include_past:
+        games = games.filter(end_time__gte=now)
+
+    overlaps = list(find_overlaps(games.order_by().values_list('id', 'start_time', 'end_time')))
+    involved = {pk for first, second, _, _ in overlaps for pk in (first, second)}
+    summaries = GameSummarySerializer(
+        model.objects.filter(pk__in=involved).with_state(now).select_related('creator', 'sport'),
+        many=True).data
+    return Response({
+        "conflicts": [
+            {"games": [first, second], "start": start, "end": end}
+            for first, second, start, end in overlaps
+        ],
+        "games": summaries,
+    })
+
+
 # API for leaving a game
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -147,21 +330,27 @@ def leave_game(request, pk):
         return Response({"error": "Game not found"}, status=status.HTTP_404_NOT_FOUND)
 
     # Block the creator
-    if game.creator == request.user:
+    if game.creator_id == request.user.id:
         return Response(
             {"error": "Creators can’t leave their own game. You can cancel or delete it instead."},
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Block if they never joined
-    if not Participant.objects.filter(user=request.user, game=game).exists():
-        return Response(
-            {"error": "You haven’t joined this game."},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    # The counter UPDATE also sets updated_at, so the per-row receivers
+    # are muted rather than writing the game a second time.
+    with transaction.atomic(), bulk_participant_changes():
+        deleted, _ = Participant.objects.filter(user=request.user, game=game).delete()
+
+        # Block if they never joined
+        if not deleted:
+            return Response(
+                {"error": "You haven’t joined this game."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    # Otherwise remove the participation
-    Participant.objects.filter(user=request.user, game=game).delete()
+        Game.objects.filter(pk=game.pk, participant_count__gt=0).update(
+            participant_count=F('participant_count') - 1, updated_at=timezone.now())
+        touched_on_commit([game.pk], 'participant.left')
     return Response({"message": "Left the game."}, status=status.HTTP_200_OK)
 
 
@@ -169,8 +358,24 @@ def leave_game(request, pk):
 # API for getting the list of games
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cache_response('games', 'users')
 def game_list(request):
+    """
+    Upcoming and in-progress games. Filters: ?sport_id=, ?start_date=,
+    ?state= and ?has_space= (see state_filters), ?near= and ?radius=
+    (see near_filter).
+    """
     now = timezone.now()
+    games, error = upcoming_games(request, now)
+    if error:
+        return error
+    return game_list_response(request, games, now)
+
+
+def upcoming_games(request, now):
+    """
+    game_list's games. Returns (games, error response).
+    """
     games = Game.objects.filter(end_time__gte=now)
     sport_id = request.query_params.get('sport_id')
     start_date = request.query_params.get('start_date')
@@ -178,19 +383,47 @@ def game_list(request):
         games = games.filter(sport_id=sport_id)
     if start_date:
         games = games.filter(start_time__gte=start_date)
-    serializer = GameSerializer(games, many=True)
-    return Response(serializer.data)
+    games, error = state_filters(request, games, now)
+    if error:
+        return None, error
+    return near_filter(request, games)
 
 
 
+# API for the personalized game feed
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def game_feed(request):
+    """
+    GET /api/games/for-you/
+    Upcoming joinable games ranked for the caller by favorite sports,
+    skill history, how full they are and how soon they start; see
+    scheduler/feed.py. Returns summary games, best first.
+    """
+    now = timezone.now()
+    ids = get_feed(request.user, now)
+    # The ranking may be a few minutes old; drop games that have filled up,
+    # been cancelled or ended since.
+    games = Game.objects.filter(JOINABLE, pk__in=ids, end_time__gte=now).order_by() \
+        .with_state(now).select_related('creator', 'sport')
+    by_id = {game.pk: game for game in games}
+    ranked = [by_id[pk] for pk in ids if pk in by_id]
+    return Response(GameSummarySerializer(ranked, many=True).data)
+
+
 # API for creating a game
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def game_create(request):
     serializer = GameSerializer(data=request.data)
     if serializer.is_valid():
+        conflicts, error = check_conflicts(
+            request, serializer.validated_data['start_time'], serializer.validated_data['end_time'])
+        if error:
+            return error
         serializer.save(creator=request.user)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({**serializer.data, "conflicts": conflicts},
+                        status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -205,19 +438,24 @@ def cancel_game(request, pk):
     if game.creator != request.user:
         return Response({"error": "You are not authorized to cancel this game."}, status=status.HTTP_403_FORBIDDEN)
     game.status = 'cancelled'
-    game.save()
+    game.save(update_fields=['status', 'updated_at'])
     return Response({"message": "Game cancelled. It will remain cancelled until the scheduled end time."}, status=status.HTTP_200_OK)
 
 
 # API for getting game details
+@game_conditional
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cache_response('game:{pk}', 'users', 'sports')
 def game_detail(request, pk):
+    include_comments = wants_comments(request)
     try:
-        game = Game.objects.get(pk=pk)
-    except Game.DoesNotExist:
+        # Archived games stay viewable.
+        game = GameHistory.objects.with_related(comments=include_comments) \
+            .with_state(timezone.now()).get(pk=pk)
+    except GameHistory.DoesNotExist:
         return Response({"error": "Game not found"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = GameSerializer(game)
+    serializer = GameSerializer(game, context={'include_comments': include_comments})
     return Response(serializer.data)
 
 
@@ -233,7 +471,8 @@ def game_update(request, pk):
         return Response({"error": "You are not authorized to update this game"}, status=status.HTTP_403_FORBIDDEN)
     serializer = GameSerializer(game, data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        # An occurrence edited on its own no longer follows series edits.
+        serializer.save(detached=game.detached or game.series_id is not None)
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -257,41 +496,188 @@ def game_delete(request, pk):
 @permission_classes([IsAuthenticated])
 def my_archived_games(request):
     now = timezone.now()
-    games = Game.objects.filter(creator=request.user, end_time__lte=now)
-    serializer = GameSerializer(games, many=True)
-    return Response(serializer.data)
+    games = GameHistory.objects.filter(creator=request.user, end_time__lte=now)
+    return game_list_response(request, games, now)
+
+
+def series_scope(request, series):
+    """
+    Read ?scope= (or the body's 'scope') and the occurrence it refers to.
+    Returns (scope, occurrence, error response or None).
+    """
+    # As in check_conflicts, the body need not be a JSON object; here a
+    # stray one is refused rather than read as "cancel everything".
+    if not isinstance(request.data, dict):
+        return None, None, Response({"error": "The body must be a JSON object."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    scope = request.data.get('scope', request.query_params.get('scope', ALL))
+    if scope not in SCOPES:
+        return None, None, Response({"error": "scope must be 'one', 'following' or 'all'."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    if scope == ALL:
+        return scope, None, None
+    try:
+        occurrence = series.occurrences.get(pk=request.data.get('occurrence'))
+    except (Game.DoesNotExist, ValueError, TypeError):
+        return None, None, Response({"error": "occurrence must be a game in this series."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    return scope, occurrence, None
+
+
+def get_own_series(request, pk):
+    """
+    Return (series, None) or (None, error response) for a series the
+    caller created.
+    """
+    try:
+        series = GameSeries.objects.get(pk=pk)
+    except GameSeries.DoesNotExist:
+        return None, Response({"error": "Series not found"}, status=status.HTTP_404_NOT_FOUND)
+    if series.creator_id != request.user.pk:
+        return None, Response({"error": "You are not authorized to change this series"},
+                              status=status.HTTP_403_FORBIDDEN)
+    return series, None
+
+
+# API for creating a recurring game series
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def series_create(request):
+    """
+    POST /api/series/create/
+    Creates the series and its games for the next SERIES_MATERIALIZE_DAYS.
+    """
+    serializer = GameSeriesSerializer(data=request.data)
+    if serializer.is_valid():
+        series = create_series(creator=request.user, **serializer.validated_data)
+        return Response(GameSeriesSerializer(series).data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# API for getting a series
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def series_detail(request, pk):
+    try:
+        series = GameSeries.objects.select_related('creator', 'sport').get(pk=pk)
+    except GameSeries.DoesNotExist:
+        return Response({"error": "Series not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(GameSeriesSerializer(series).data)
+
+
+# API for updating a series
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def series_update(request, pk):
+    """
+    PATCH /api/series/<pk>/update/
+    Body: series fields, plus scope ('all' upcoming games, the default;
+    'following', or 'one') and, for the latter two, the occurrence game id.
+    'following' splits the series; the response is the series that now
+    holds the edited games.
+    """
+    series, error = get_own_series(request, pk)
+    if error:
+        return error
+    scope, occurrence, error = series_scope(request, series)
+    if error:
+        return error
+    serializer = GameSeriesSerializer(series, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    series = update_series(series, serializer.validated_data, scope, occurrence)
+    return Response(GameSeriesSerializer(series).data)
+
+
+# API for cancelling a series
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def series_cancel(request, pk):
+    """
+    POST /api/series/<pk>/cancel/
+    Body: scope and occurrence as for series_update. Cancelled games stay
+    listed as cancelled; the series stops producing new ones past that point.
+    """
+    series, error = get_own_series(request, pk)
+    if error:
+        return error
+    scope, occurrence, error = series_scope(request, series)
+    if error:
+        return error
+    cancelled = cancel_series(series, scope, occurrence)
+    return Response({"message": f"{cancelled} game(s) cancelled.", "cancelled": cancelled},
+                    status=status.HTTP_200_OK)
 
 
 # API for joining a game
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def join_game(request, pk):
+    """
+    POST /api/games/<pk>/join/
+    The seat is claimed with a guarded UPDATE on participant_count, which
+    row-locks the game and re-checks capacity, so concurrent joins can
+    never overbook it.
+    """
     try:
         game = Game.objects.get(pk=pk)
     except Game.DoesNotExist:
         return Response({"error": "Game not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if game.creator == request.user:
+    if game.creator_id == request.user.id:
         return Response(
             {"error": "Creators cannot join their own game."},
             status=status.HTTP_403_FORBIDDEN
         )
 
-    if game.participant_set.filter(user=request.user).exists():
-        return Response({"error": "You have already joined this game"}, status=status.HTTP_400_BAD_REQUEST)
-    if game.capacity and game.participants.count() >= game.capacity:
-        return Response(
-        {"error": "Game at capacity."},
-        status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    Participant.objects.create(user=request.user, game=game)
-    return Response({"message": "Successfully joined the game"}, status=status.HTTP_200_OK)
+    conflicts, error = check_conflicts(request, game.start_time, game.end_time, exclude=game.pk)
+    if error:
+        return error
+
+    # As in leave_game, the guarded UPDATE sets updated_at too.
+    with transaction.atomic(), bulk_participant_changes():
+        # The (user, game) unique constraint catches duplicate joins.
+        try:
+            with transaction.atomic():
+                Participant.objects.create(user=request.user, game=game)
+        except IntegrityError:
+            return Response({"error": "You have already joined this game"}, status=status.HTTP_400_BAD_REQUEST)
+
+        claimed = Game.objects.filter(pk=game.pk).with_space() \
+            .update(participant_count=F('participant_count') + 1, updated_at=timezone.now())
+        if not claimed:
+            transaction.set_rollback(True)
+            return Response(
+            {"error": "Game at capacity."},
+            status=status.HTTP_400_BAD_REQUEST
+            )
+        touched_on_commit([game.pk], 'participant.joined')
+    return Response({"message": "Successfully joined the game", "conflicts": conflicts},
+                    status=status.HTTP_200_OK)
+
+
+# API for adding/removing many participants at once
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_participants(request):
+    """
+    POST /api/games/bulk/participants/
+    {"operations": [{"game": 1, "action": "add", "users": [2, 3]}, ...]}
+    Runs every change in one transaction, only on games the caller created,
+    and reports a result per (game, user) pair.
+    """
+    serializer = BulkParticipantsSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    results = apply_participant_operations(
+        request.user, serializer.validated_data['operations'])
+    return Response({"results": results}, status=status.HTTP_200_OK)
 
 
 # API for getting the list of sports
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cache_response('sports')
 def sport_list(request):
     sports = Sport.objects.all()
     serializer = SportSerializer(sports, many=True)
@@ -299,22 +685,30 @@ def sport_list(request):
 
 
 
+@game_conditional
 @api_view(['GET','POST'])
 @permission_classes([IsAuthenticatedOrReadOnly])
+@cache_response('game:{game_pk}', 'users')
 def game_comments(request, game_pk):
     """
         API for getting and posting comments for a game
     """
+    if request.method == 'GET':
+        # Archived games' comments stay readable.
+        if not GameHistory.objects.filter(pk=game_pk).exists():
+            return Response({"error": "Game not found."},
+                            status=status.HTTP_404_NOT_FOUND)
+        qs, error = comment_page(request, game_pk)
+        if error:
+            return error
+        serializer = CommentSerializer(qs, many=True)
+        return Response(serializer.data)
+
     try:
         game = Game.objects.get(pk=game_pk)
     except Game.DoesNotExist:
         return Response({"error": "Game not found."},
                         status=status.HTTP_404_NOT_FOUND)
-
-    if request.method == 'GET':
-        qs = Comment.objects.filter(game=game).order_by('created')
-        serializer = CommentSerializer(qs, many=True)
-        return Response(serializer.data)
     user = request.user
     is_creator   = (game.creator == user)
     is_participant = Participant.objects.filter(game=game, user=user).exists()
@@ -328,28 +722,60 @@ def game_comments(request, game_pk):
     data['game'] = game_pk
     serializer = CommentSerializer(data=data, context={'request': request})
     if serializer.is_valid():
-        serializer.save(author=request.user)
+        with transaction.atomic(), bulk_participant_changes():
+            serializer.save(author=request.user)
+            Game.objects.filter(pk=game.pk).update(
+                comment_count=F('comment_count') + 1, updated_at=timezone.now())
+            touched_on_commit([game.pk], 'comment.created')
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def comment_page(request, game_pk):
+    """
+    The comments game_comments returns. Returns (comments, error response).
+    """
+    # ?after=<id> returns only comments newer than the given one, and
+    # ?limit=<n> caps the page; clients page forward by passing the
+    # last id they have as the next ?after=.
+    try:
+        after = int(request.query_params.get('after', 0))
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return None, Response({"error": "after and limit must be integers."},
+                              status=status.HTTP_400_BAD_REQUEST)
+    qs = CommentHistory.objects.filter(game_id=game_pk).select_related('author') \
+        .order_by('created', 'id')
+    if after:
+        qs = qs.filter(id__gt=after)
+    if limit is not None:
+        max_limit = getattr(settings, 'COMMENT_PAGE_SIZE_MAX', 100)
+        qs = qs[:max(1, min(limit, max_limit))]
+    return qs, None
+
+
 User = get_user_model()
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticatedOrReadOnly])
 def user_list(request):
     """
-    Return users whose name, username or email contains q.
+    Return users whose username, name words or email start with each term
+    of ?search=, best matches first, capped at USER_SEARCH_LIMIT (or a
+    smaller ?limit=).
     """
     q = request.query_params.get('search', '').strip()
     if not q:
         return Response([], status=200)
-    qs = User.objects.filter(
-        Q(username__icontains=q) |
-        Q(email__icontains=q) |
-        Q(name__icontains=q)
-    )
-    serializer = UserProfileSerializer(qs, many=True)
+    max_limit = getattr(settings, 'USER_SEARCH_LIMIT', 20)
+    try:
+        limit = min(int(request.query_params.get('limit', max_limit)), max_limit)
+    except ValueError:
+        limit = max_limit
+    users = search_users(
+        User.objects.prefetch_related('favorite_sports'), q, max(limit, 1))
+    serializer = UserProfileSerializer(users, many=True)
     return Response(serializer.data)
 
 
@@ -360,9 +786,247 @@ def user_games(request, user_id):
     """
     Return all games where user is creator or participant.
     """
-    games = Game.objects.filter(
-        Q(creator__id=user_id) |
-        Q(participants__user__id=user_id)
-    ).distinct()
-    serializer = GameSerializer(games, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    games = GameHistory.objects.filter(pk__in=user_game_ids(user_id, history=True))
+    return game_list_response(request, games)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def user_schedule(request):
+    """
+    GET /api/schedule/?user_ids=1,2,3
+    Return each user's upcoming games (soonest first) and past games (most
+    recent first) as summary games, one page of each. To continue a list,
+    pass a single user id with ?when=upcoming|past and that list's cursor.
+    """
+    try:
+        user_ids = list(dict.fromkeys(
+            int(x) for x in request.query_params.get('user_ids', '').split(',') if x.strip()))
+    except ValueError:
+        return Response({"error": "user_ids must be a comma-separated list of ids."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    max_users = getattr(settings, 'SCHEDULE_MAX_USERS', 10)
+    if not user_ids or len(user_ids) > max_users:
+        return Response({"error": f"Pass between 1 and {max_users} user_ids."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    when = request.query_params.get('when')
+    if when not in (None, UPCOMING, PAST):
+        return Response({"error": "when must be 'upcoming' or 'past'."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    position = None
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        if when is None or len(user_ids) != 1:
+            return Response({"error": "cursor needs a single user id and when."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            position = decode_cursor(cursor)
+        except ValueError:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+
+    limit = GameCursorPagination().get_page_size(request)
+    now = timezone.now()
+    pages = {
+        (user_id, bucket): schedule_page(user_id, bucket, now, limit, position)
+        for user_id in user_ids
+        for bucket in ([when] if when else [UPCOMING, PAST])
+    }
+
+    # Load and serialize every game once, however many schedules it is on.
+    game_ids = {pk for ids, _ in pages.values() for pk in ids}
+    games = GameHistory.objects.filter(pk__in=game_ids).with_state(now) \
+        .select_related('creator', 'sport')
+    serialized = {g['id']: g for g in GameSummarySerializer(games, many=True).data}
+
+    data = {}
+    for (user_id, bucket), (ids, next_cursor) in pages.items():
+        data.setdefault(str(user_id), {})[bucket] = {
+            'results': [serialized[pk] for pk in ids if pk in serialized],
+            'next': next_cursor,
+        }
+    return Response(data)
+
+
+# Native async versions of the public read endpoints, served in place of
+# the DRF views under ASGI (see scheduler/urls.py). They read through the
+# async ORM and render JSON on the event loop. Anything they don't answer
+# themselves goes to the DRF view; see async_read_view.
+
+def renders_json(request):
+    """
+    Whether content negotiation picks the JSON renderer for ``request``
+    rather than, say, the browsable API.
+    """
+    renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, _ = DefaultContentNegotiation().select_renderer(request, renderers)
+    except NotAcceptable:
+        return False
+    return isinstance(renderer, JSONRenderer)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    response = HttpResponse(TimedJSONRenderer().render(data), content_type='application/json',
+                            status=status)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def async_read_view(sync_view):
+    """
+    Make the decorated coroutine the async version of the DRF view
+    ``sync_view``. It gets a DRF Request, as the sync view does, for GET
+    and HEAD requests that want JSON and are anonymous or carry a valid
+    token. Other methods, the browsable API, bad tokens and DRF errors
+    (such as an invalid cursor) go to ``sync_view``, so they are answered
+    exactly as before.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            drf_request = Request(request)
+            if request.method in ('GET', 'HEAD') and renders_json(drf_request):
+                try:
+                    credentials = await CachedTokenAuthentication().aauthenticate(request)
+                    if credentials is not None:
+                        drf_request.user, drf_request.auth = credentials
+                    return await view(drf_request, *args, **kwargs)
+                except APIException:
+                    pass
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+async def agame_list_response(request, games, now=None):
+    """
+    game_list_response for the async views.
+    """
+    games, serializer_class, error = game_list_shape(request, games, now)
+    if error:
+        return json_response(error.data, status=error.status_code)
+
+    paginator = GameCursorPagination()
+    page = await paginator.apaginate_queryset(games, request)
+    if page is not None:
+        serializer = serializer_class(page, many=True)
+        return json_response(paginator.get_paginated_response(serializer.data).data)
+    serializer = serializer_class([game async for game in games], many=True)
+    return json_response(serializer.data)
+
+
+@async_read_view(game_list)
+@acache_response('games', 'users')
+async def agame_list(request):
+    now = timezone.now()
+    games, error = upcoming_games(request, now)
+    if error:
+        return json_response(error.data, status=error.status_code)
+    return await agame_list_response(request, games, now)
+
+
+@async_read_view(game_detail)
+@agame_conditional
+@acache_response('game:{pk}', 'users', 'sports')
+async def agame_detail(request, pk):
+    include_comments = wants_comments(request)
+    try:
+        game = await GameHistory.objects.with_related(comments=include_comments) \
+            .with_state(timezone.now()).aget(pk=pk)
+    except GameHistory.DoesNotExist:
+        return json_response({"error": "Game not found"}, status=status.HTTP_404_NOT_FOUND)
+    serializer = GameSerializer(game, context={'include_comments': include_comments})
+    return json_response(serializer.data)
+
+
+@async_read_view(game_comments)
+@agame_conditional
+@acache_response('game:{game_pk}', 'users')
+async def agame_comments(request, game_pk):
+    if not await GameHistory.objects.filter(pk=game_pk).aexists():
+        return json_response({"error": "Game not found."}, status=status.HTTP_404_NOT_FOUND)
+    qs, error = comment_page(request, game_pk)
+    if error:
+        return json_response(error.data, status=error.status_code)
+    serializer = CommentSerializer([comment async for comment in qs], many=True)
+    return json_response(serializer.data)
+
+
+@async_read_view(sport_list)
+@acache_response('sports')
+async def asport_list(request):
+    serializer = SportSerializer([sport async for sport in Sport.objects.all()], many=True)
+    return json_response(serializer.data)
+
+
+@async_read_view(public_profile)
+async def apublic_profile(request, id):
+    try:
+        user = await User.objects.prefetch_related('favorite_sports').aget(pk=id)
+    except User.DoesNotExist:
+        return json_response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(UserProfileSerializer(user).data)
+
+
+# Server-sent event streams. These are async views: under ASGI each open
+# stream is an idle coroutine rather than a worker thread. Under WSGI a
+# never-ending stream is collected into a list before anything is sent,
+# tying up a worker for good, so there they are refused; see asgi_only.
+
+def asgi_only(view):
+    """
+    Answer 501 unless settings.SERVER_INTERFACE is 'asgi'.
+    """
+    @functools.wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        if getattr(settings, 'SERVER_INTERFACE', 'wsgi') != 'asgi':
+            return JsonResponse({"error": "Event streams need the ASGI server."},
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+        return await view(request, *args, **kwargs)
+    return wrapped
+
+
+async def event_stream(channels):
+    heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+    subscription = get_broker().subscribe(*channels)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            event = await subscription.get(timeout=heartbeat)
+            if event is None:
+                # Keeps proxies from closing an idle connection.
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
+
+
+def event_stream_response(channels):
+    response = StreamingHttpResponse(event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+@asgi_only
+async def game_events(request, pk):
+    """
+    GET /api/games/<pk>/events/
+    Stream join, leave, comment, update and delete events for one game.
+    """
+    if not await Game.objects.filter(pk=pk).aexists():
+        return JsonResponse({"error": "Game not found"}, status=status.HTTP_404_NOT_FOUND)
+    return event_stream_response([game_channel(pk)])
+
+
+@require_GET
+@asgi_only
+async def games_feed_events(request):
+    """
+    GET /api/games/events/
+    Stream events for every game.
+    """
+    return event_stream_response([FEED_CHANNEL])